@@ -0,0 +1,125 @@
+"""
+벤치마크용 가짜 OpenAI 서버 (chat.completions 만 흉내냄).
+
+실제 OpenAI 를 호출하지 않고 지연 시간/스트리밍/에러를 재현합니다.
+앱 서버는 OPENAI_BASE_URL 만 바꿔서 그대로 붙습니다.
+
+    uvicorn bench.fake_openai:app --port 9000 --workers 1
+    OPENAI_BASE_URL=http://127.0.0.1:9000/v1 uvicorn main:app --port 8000
+
+환경변수
+    FAKE_LLM_LATENCY      첫 응답까지 평균 지연(초, 기본 0.8)
+    FAKE_LLM_JITTER       지연 편차 비율 (기본 0.3 -> ±30%)
+    FAKE_LLM_TOKEN_DELAY  스트리밍 조각 사이 간격(초, 기본 0.02)
+    FAKE_LLM_REPLY_CHARS  챗봇 답변 길이(문자, 기본 300)
+    FAKE_LLM_ERROR_RATE   429/500 에러 비율 (기본 0, 재시도 경로 확인용)
+"""
+import os
+import re
+import json
+import time
+import uuid
+import random
+import asyncio
+import zlib
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+FAKE_LLM_LATENCY = float(os.getenv("FAKE_LLM_LATENCY", "0.8"))
+FAKE_LLM_JITTER = float(os.getenv("FAKE_LLM_JITTER", "0.3"))
+FAKE_LLM_TOKEN_DELAY = float(os.getenv("FAKE_LLM_TOKEN_DELAY", "0.02"))
+FAKE_LLM_REPLY_CHARS = int(os.getenv("FAKE_LLM_REPLY_CHARS", "300"))
+FAKE_LLM_ERROR_RATE = float(os.getenv("FAKE_LLM_ERROR_RATE", "0"))
+
+# routers/transactions.py 의 분류 기준과 같은 값이어야 분류 캐시에 저장됩니다.
+CATEGORIES = ["식비", "교통", "쇼핑", "의료/건강", "문화/여가", "공과금/고정비", "이체", "편의점/마트", "기타"]
+REPLY_TEXT = "이번 달은 식비 비중이 지난달보다 조금 높아요. 배달 대신 장보기를 한두 번 섞으면 목표 금액 안에서 충분히 관리할 수 있습니다. "
+
+app = FastAPI(title="Fake OpenAI (bench)")
+stats = {"requests": 0, "streams": 0, "errors": 0}
+
+
+def _category_for(text):
+    # 같은 소비처는 항상 같은 카테고리 (캐시 적중률이 실행마다 달라지지 않도록)
+    return CATEGORIES[zlib.crc32(text.encode("utf-8")) % len(CATEGORIES)]
+
+
+def _answer(body):
+    prompt = body["messages"][-1]["content"]
+    json_mode = (body.get("response_format") or {}).get("type") == "json_object"
+
+    if json_mode and "[소비처 목록]" in prompt:
+        items = re.findall(r'^\s*(\d+)\. "(.*)"\s*$', prompt, re.MULTILINE)
+        return json.dumps({num: _category_for(content) for num, content in items}, ensure_ascii=False)
+    if json_mode and "section_past_comparison" in prompt:
+        return json.dumps({
+            "section_past_comparison": "지난달보다 식비가 12% 늘었고 교통비는 비슷했습니다.",
+            "section_cluster_info": "비슷한 소비 규모의 사용자 그룹에 속해 있습니다.",
+            "section_group_comparison": "그룹 평균보다 쇼핑 지출이 다소 많습니다.",
+        }, ensure_ascii=False)
+    if json_mode:
+        return "{}"
+    return (REPLY_TEXT * (FAKE_LLM_REPLY_CHARS // len(REPLY_TEXT) + 1))[:FAKE_LLM_REPLY_CHARS]
+
+
+def _usage(body, text):
+    prompt_chars = sum(len(m.get("content") or "") for m in body["messages"])
+    prompt_tokens, completion_tokens = prompt_chars // 2, max(1, len(text) // 2)
+    return {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens}
+
+
+async def _sleep_latency():
+    await asyncio.sleep(max(0.0, FAKE_LLM_LATENCY * (1 + random.uniform(-FAKE_LLM_JITTER, FAKE_LLM_JITTER))))
+
+
+@app.post("/v1/chat/completions")
+async def chat_completions(request: Request):
+    body = await request.json()
+    stats["requests"] += 1
+    await _sleep_latency()
+
+    if FAKE_LLM_ERROR_RATE and random.random() < FAKE_LLM_ERROR_RATE:
+        stats["errors"] += 1
+        status = random.choice([429, 500])
+        return JSONResponse({"error": {"message": "fake error", "type": "server_error"}}, status_code=status)
+
+    text = _answer(body)
+    completion_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+    created = int(time.time())
+    model = body.get("model", "gpt-4o")
+
+    if not body.get("stream"):
+        return {
+            "id": completion_id, "object": "chat.completion", "created": created, "model": model,
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}],
+            "usage": _usage(body, text),
+        }
+
+    stats["streams"] += 1
+    include_usage = (body.get("stream_options") or {}).get("include_usage")
+
+    async def events():
+        def chunk(delta, finish_reason=None):
+            data = {"id": completion_id, "object": "chat.completion.chunk", "created": created, "model": model,
+                    "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}]}
+            return f"data: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+        yield chunk({"role": "assistant", "content": ""})
+        for i in range(0, len(text), 4):  # 한글 기준 대략 4자 = 1~2토큰
+            yield chunk({"content": text[i:i + 4]})
+            await asyncio.sleep(FAKE_LLM_TOKEN_DELAY)
+        yield chunk({}, "stop")
+        if include_usage:
+            data = {"id": completion_id, "object": "chat.completion.chunk", "created": created, "model": model,
+                    "choices": [], "usage": _usage(body, text)}
+            yield f"data: {json.dumps(data)}\n\n"
+        yield "data: [DONE]\n\n"
+
+    return StreamingResponse(events(), media_type="text/event-stream")
+
+
+@app.get("/stats")
+def get_stats():
+    return stats
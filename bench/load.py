@@ -0,0 +1,141 @@
+"""
+비동기 부하 발생기. 엔드포인트별로 차례대로 부하를 주고 p50/p95/p99 지연 시간과 RPS 를 출력합니다.
+
+    python -m bench.load --endpoints chat,report,transaction --concurrency 32 --duration 30
+    python -m bench.load --endpoints chat --stream --concurrency 64 --requests 2000 --json out.json
+
+리포트는 사용자별로 한 번 생성된 뒤에는 캐시에서 나오므로, 생성 경로를 재려면
+매 실행 전에 analysis_reports 를 비우거나 --users 를 요청 수보다 크게 잡으세요.
+"""
+import json
+import time
+import random
+import asyncio
+import argparse
+
+import httpx
+
+MESSAGES = ["이번 달 식비 괜찮아?", "지난달이랑 비교해줘", "어디서 줄이면 좋을까?", "목표 금액 맞출 수 있을까?"]
+MERCHANTS = ["스타벅스 강남점", "배달의민족", "카카오T 택시", "쿠팡", "CU 역삼지점", "넷플릭스", "새로운가게 1호점"]
+
+
+def _request_for(endpoint, rng, users, stream):
+    user_id = rng.randint(1, users)
+    if endpoint == "chat":
+        return "/api/chat", {"user_id": user_id, "message": rng.choice(MESSAGES),
+                             "target_budget": 1000000, "stream": stream}
+    if endpoint == "report":
+        return "/api/analysis/report", {"user_id": user_id}
+    if endpoint == "report-fast":
+        return "/api/analysis/report?mode=fast", {"user_id": user_id}
+    if endpoint == "transaction":
+        return "/api/transaction", {"user_id": user_id, "amount": rng.randrange(1000, 100000, 100),
+                                    "content": rng.choice(MERCHANTS)}
+    raise ValueError(f"알 수 없는 엔드포인트: {endpoint}")
+
+
+def percentile(sorted_values, p):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(round(p / 100 * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+async def run_endpoint(client, endpoint, args):
+    rng = random.Random(args.seed)
+    latencies, first_bytes = [], []
+    errors = {}
+    sent = 0
+    started = time.monotonic()
+    deadline = started + args.duration if args.duration else None
+
+    def next_request():
+        nonlocal sent
+        if (deadline and time.monotonic() >= deadline) or (not deadline and sent >= args.requests):
+            return None
+        sent += 1
+        return _request_for(endpoint, rng, args.users, args.stream)
+
+    async def worker():
+        while True:
+            request = next_request()
+            if request is None:
+                return
+            path, body = request
+            t0 = time.monotonic()
+            try:
+                async with client.stream("POST", path, json=body) as response:
+                    first = None
+                    async for _ in response.aiter_bytes():
+                        if first is None:
+                            first = time.monotonic() - t0
+                    status = response.status_code
+            except httpx.HTTPError as e:
+                errors[type(e).__name__] = errors.get(type(e).__name__, 0) + 1
+                continue
+            elapsed = time.monotonic() - t0
+            if status >= 400:
+                errors[str(status)] = errors.get(str(status), 0) + 1
+                continue
+            latencies.append(elapsed)
+            first_bytes.append(first if first is not None else elapsed)
+
+    await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+    wall = time.monotonic() - started
+    latencies.sort()
+    first_bytes.sort()
+    return {
+        "endpoint": endpoint,
+        "requests": sent,
+        "ok": len(latencies),
+        "errors": errors,
+        "rps": round(len(latencies) / wall, 2) if wall else 0.0,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 1),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 1),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 1),
+        "max_ms": round((latencies[-1] if latencies else 0) * 1000, 1),
+        "ttfb_p50_ms": round(percentile(first_bytes, 50) * 1000, 1),
+        "wall_seconds": round(wall, 1),
+    }
+
+
+def print_table(results):
+    header = f"{'endpoint':<12} {'ok':>7} {'err':>5} {'rps':>8} {'p50':>8} {'p95':>8} {'p99':>8} {'max':>8} {'ttfb50':>8}"
+    print(header)
+    print("-" * len(header))
+    for r in results:
+        print(f"{r['endpoint']:<12} {r['ok']:>7} {sum(r['errors'].values()):>5} {r['rps']:>8} "
+              f"{r['p50_ms']:>8} {r['p95_ms']:>8} {r['p99_ms']:>8} {r['max_ms']:>8} {r['ttfb_p50_ms']:>8}")
+        if r["errors"]:
+            print(f"{'':<12} errors: {r['errors']}")
+
+
+async def main(args):
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=args.timeout, limits=limits) as client:
+        results = []
+        for endpoint in args.endpoints.split(","):
+            print(f"🚚 [load] {endpoint} (concurrency={args.concurrency}, "
+                  f"{f'{args.duration}s' if args.duration else f'{args.requests}건'})")
+            results.append(await run_endpoint(client, endpoint.strip(), args))
+    print()
+    print_table(results)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"args": vars(args), "results": results}, f, ensure_ascii=False, indent=2)
+        print(f"📝 결과 저장: {args.json}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="FinMate API 부하 테스트")
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--endpoints", default="chat,report,transaction", help="chat, report, report-fast, transaction")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--requests", type=int, default=500, help="엔드포인트별 요청 수 (--duration 이 없을 때)")
+    parser.add_argument("--duration", type=float, default=0, help="엔드포인트별 실행 시간(초)")
+    parser.add_argument("--users", type=int, default=1000, help="요청에 쓸 user_id 범위 (seed 의 --users 와 맞추세요)")
+    parser.add_argument("--stream", action="store_true", help="챗봇을 SSE 스트리밍으로 호출")
+    parser.add_argument("--timeout", type=float, default=120)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--json", help="결과를 JSON 으로 저장할 경로 (실행 간 비교용)")
+    asyncio.run(main(parser.parse_args()))
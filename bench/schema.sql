@@ -0,0 +1,40 @@
+-- 벤치마크용 기본 테이블. 운영 스키마 중 앱 코드가 실제로 읽고 쓰는 컬럼만 담았습니다.
+-- 나머지 테이블(롤업/캐시/작업 이력 등)은 이후 migrate.py 가 migrations/ 로 만듭니다.
+CREATE TABLE IF NOT EXISTS clusters (
+    id         INT    NOT NULL PRIMARY KEY,
+    min_amount BIGINT NOT NULL DEFAULT 0,
+    max_amount BIGINT NOT NULL DEFAULT 0
+) DEFAULT CHARSET = utf8mb4;
+
+CREATE TABLE IF NOT EXISTS users (
+    id         INT NOT NULL PRIMARY KEY,
+    cluster_id INT NULL
+) DEFAULT CHARSET = utf8mb4;
+
+CREATE TABLE IF NOT EXISTS transactions (
+    id               BIGINT        NOT NULL AUTO_INCREMENT PRIMARY KEY,
+    user_id          INT           NOT NULL,
+    amount           DECIMAL(15,2) NOT NULL,
+    original_content VARCHAR(255)  NOT NULL,
+    category         VARCHAR(50)   NULL,
+    transacted_at    DATETIME      NOT NULL,
+    type             VARCHAR(20)   NOT NULL
+) DEFAULT CHARSET = utf8mb4;
+
+CREATE TABLE IF NOT EXISTS chat_messages (
+    id         BIGINT      NOT NULL AUTO_INCREMENT PRIMARY KEY,
+    user_id    INT         NOT NULL,
+    sender     VARCHAR(10) NOT NULL,
+    content    TEXT        NOT NULL,
+    created_at DATETIME    NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    KEY idx_chat_messages_user_time (user_id, created_at)
+) DEFAULT CHARSET = utf8mb4;
+
+CREATE TABLE IF NOT EXISTS analysis_reports (
+    id             BIGINT     NOT NULL AUTO_INCREMENT PRIMARY KEY,
+    user_id        INT        NOT NULL,
+    report_month   CHAR(7)    NOT NULL,
+    raw_json       MEDIUMTEXT NULL,
+    formatted_text MEDIUMTEXT NULL,
+    created_at     DATETIME   NOT NULL DEFAULT CURRENT_TIMESTAMP
+) DEFAULT CHARSET = utf8mb4;
@@ -0,0 +1,149 @@
+"""
+벤치마크용 DB 픽스처 생성기.
+
+사용자 N명 × 최근 M개월 소비 내역을 고정 시드로 만들어 넣고,
+롤업 / 그룹(클러스터) / 그룹 평균까지 운영과 같은 코드로 채워 둡니다.
+같은 인자로 다시 돌리면 같은 데이터가 만들어집니다.
+
+    python -m bench.seed --users 1000 --months 6 --reset
+    python -m bench.seed --users 10000 --months 12 --per-month 40 --warm-cache --reset
+
+--reset 은 테이블을 지우므로 DB 이름에 'bench' 가 들어간 경우에만 동작합니다.
+"""
+import os
+import sys
+import random
+import argparse
+import datetime
+
+import migrate
+import rollup
+from database import DB_CONFIG, db_connection
+from category_cache import category_cache
+from routers import clustering
+
+SCHEMA_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "schema.sql")
+BASE_TABLES = ["analysis_reports", "chat_messages", "transactions", "users", "clusters"]
+INSERT_CHUNK = 5000
+
+# (소비처, 카테고리, 평균 금액) - 실제 가맹점 이름처럼 지점명/법인 표기가 섞이도록 변형해서 씁니다.
+MERCHANTS = [
+    ("스타벅스", "식비", 6500), ("배달의민족", "식비", 24000), ("김밥천국", "식비", 8000),
+    ("맥도날드", "식비", 9000), ("파리바게뜨", "식비", 7000), ("교촌치킨", "식비", 22000),
+    ("카카오T 택시", "교통", 12000), ("서울교통공사", "교통", 1500), ("GS칼텍스", "교통", 60000),
+    ("쿠팡", "쇼핑", 35000), ("무신사", "쇼핑", 70000), ("올리브영", "쇼핑", 25000),
+    ("연세이비인후과", "의료/건강", 15000), ("온누리약국", "의료/건강", 8000), ("스포애니", "의료/건강", 60000),
+    ("CGV", "문화/여가", 15000), ("넷플릭스", "문화/여가", 13500), ("야놀자", "문화/여가", 120000),
+    ("SK텔레콤", "공과금/고정비", 65000), ("한국전력공사", "공과금/고정비", 40000),
+    ("토스 송금", "이체", 30000), ("CU", "편의점/마트", 5000), ("이마트", "편의점/마트", 80000),
+    ("GS25", "편의점/마트", 4500),
+]
+BRANCHES = ["", " 강남점", " 홍대점", " 역삼지점", " 2호점", "(주)"]
+
+
+def _month_starts(months, today=None):
+    """이번 달 포함 최근 months 개월의 1일 (오래된 달부터)"""
+    first = (today or datetime.date.today()).replace(day=1)
+    starts = []
+    for _ in range(months):
+        starts.append(first)
+        first = (first - datetime.timedelta(days=1)).replace(day=1)
+    return starts[::-1]
+
+
+def generate_user(rng, user_id, month_starts, per_month, today):
+    """사용자 1명의 거래 행들. 사용자마다 소비 규모(배율)와 선호 가맹점이 다릅니다."""
+    scale = rng.lognormvariate(0, 0.6)
+    favorites = rng.sample(MERCHANTS, k=8)
+    rows = []
+    for start in month_starts:
+        days = ((start + datetime.timedelta(days=32)).replace(day=1) - start).days
+        if start.year == today.year and start.month == today.month:
+            days = today.day  # 이번 달은 오늘까지만
+        count = max(1, int(rng.gauss(per_month, per_month * 0.3) * days / 30))
+        for _ in range(count):
+            name, category, mean = rng.choice(favorites) if rng.random() < 0.8 else rng.choice(MERCHANTS)
+            amount = max(1000, round(rng.gauss(mean, mean * 0.3) * scale, -2))
+            at = datetime.datetime.combine(start, datetime.time()) + datetime.timedelta(
+                days=rng.randrange(days), seconds=rng.randrange(86400))
+            rows.append((user_id, amount, name + rng.choice(BRANCHES), category,
+                         at.strftime("%Y-%m-%d %H:%M:%S"), "WITHDRAW"))
+    return rows
+
+
+def reset(conn):
+    if "bench" not in (DB_CONFIG["db"] or ""):
+        sys.exit(f"❌ --reset 은 벤치마크 전용 DB 에서만 사용할 수 있습니다. (현재 DB={DB_CONFIG['db']})")
+    with conn.cursor() as cursor:
+        cursor.execute("SHOW TABLES")
+        tables = [list(row.values())[0] for row in cursor.fetchall()]
+        for table in tables:
+            cursor.execute(f"DROP TABLE `{table}`")
+    conn.commit()
+    print(f"🧹 [seed] 테이블 {len(tables)}개 삭제")
+
+
+def create_schema(conn):
+    with open(SCHEMA_PATH, encoding="utf-8") as f:
+        statements = migrate._split_statements(f.read())
+    with conn.cursor() as cursor:
+        for stmt in statements:
+            cursor.execute(stmt)
+    conn.commit()
+    migrate.migrate(conn)
+
+
+def seed(conn, users, months, per_month, seed_value, today=None):
+    today = today or datetime.date.today()
+    rng = random.Random(seed_value)
+    month_starts = _month_starts(months, today)
+    insert_sql = """
+        INSERT INTO transactions (user_id, amount, original_content, category, transacted_at, type)
+        VALUES (%s, %s, %s, %s, %s, %s)
+    """
+    total = 0
+    with conn.cursor() as cursor:
+        cursor.executemany("INSERT IGNORE INTO users (id) VALUES (%s)", [(uid,) for uid in range(1, users + 1)])
+        conn.commit()
+
+        buffer = []
+        for user_id in range(1, users + 1):
+            buffer.extend(generate_user(rng, user_id, month_starts, per_month, today))
+            if len(buffer) >= INSERT_CHUNK or user_id == users:
+                cursor.executemany(insert_sql, buffer)
+                rollup.apply_transactions(cursor, [(r[0], r[1], r[3], r[4]) for r in buffer])
+                conn.commit()
+                total += len(buffer)
+                buffer = []
+                print(f"  ... {user_id}/{users}명, 거래 {total}건")
+    return total
+
+
+def warm_category_cache(conn):
+    with conn.cursor() as cursor:
+        for name, category, _ in MERCHANTS:
+            for branch in BRANCHES:
+                category_cache.put(name + branch, category, cursor)
+    conn.commit()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="벤치마크용 DB 픽스처 생성")
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--months", type=int, default=6)
+    parser.add_argument("--per-month", type=int, default=30, help="사용자 1명의 월평균 거래 수")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--reset", action="store_true", help="기존 테이블을 모두 지우고 새로 생성")
+    parser.add_argument("--warm-cache", action="store_true", help="가맹점 분류 캐시를 미리 채움 (LLM 호출 없는 경로 측정용)")
+    args = parser.parse_args()
+
+    with db_connection() as conn:
+        if args.reset:
+            reset(conn)
+        create_schema(conn)
+        total = seed(conn, args.users, args.months, args.per_month, args.seed)
+        if args.warm_cache:
+            warm_category_cache(conn)
+        clustering.logic_clustering(conn)
+        rollup.rebuild_cluster_averages(conn, rollup.previous_month_key())
+    print(f"✅ [seed] 사용자 {args.users}명 × {args.months}개월, 거래 {total}건 생성 완료")
@@ -0,0 +1,115 @@
+"""
+콜드 스타트 벤치마크.
+
+서버 프로세스를 새로 띄워서 (1) 첫 `GET /` 성공, (2) 첫 `POST /api/chat` 성공까지 걸린 시간을 잽니다.
+여러 번 반복해 중앙값을 내고, 예산(ms)을 넘으면 종료 코드 1 로 끝나므로 배포 전 점검에 쓸 수 있습니다.
+/api/chat 은 DB 와 (가짜) OpenAI 서버가 떠 있어야 합니다. (bench/README.md 참고)
+
+    python -m bench.startup --runs 5 --budget-root-ms 3000 --budget-chat-ms 6000
+    python -m bench.startup --importtime        # import 가 오래 걸리는 모듈 상위 목록
+"""
+import os
+import re
+import sys
+import time
+import argparse
+import statistics
+import subprocess
+
+import httpx
+
+BASE_ENV = {"ENABLE_SCHEDULER": "false"}  # 스케줄러는 별도 실행기가 담당하는 배포 형태 기준
+
+
+def _wait_for(client, method, path, deadline, **kwargs):
+    while time.perf_counter() < deadline:
+        try:
+            response = client.request(method, path, **kwargs)
+            if response.status_code < 400:
+                return True
+        except httpx.TransportError:
+            pass  # 아직 포트가 열리지 않음
+        time.sleep(0.02)
+    return False
+
+
+def measure_once(args):
+    env = {**os.environ, **BASE_ENV}
+    command = [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(args.port)]
+    started = time.perf_counter()
+    process = subprocess.Popen(command, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    result = {"root_ms": None, "chat_ms": None}
+    try:
+        deadline = started + args.timeout
+        with httpx.Client(base_url=f"http://127.0.0.1:{args.port}", timeout=args.timeout) as client:
+            if not _wait_for(client, "GET", "/", deadline):
+                return result
+            result["root_ms"] = round((time.perf_counter() - started) * 1000)
+            if args.skip_chat:
+                return result
+            body = {"user_id": args.user_id, "message": "이번 달 소비 어때?", "target_budget": 1000000}
+            if _wait_for(client, "POST", "/api/chat", deadline, json=body):
+                result["chat_ms"] = round((time.perf_counter() - started) * 1000)
+    finally:
+        process.terminate()
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+    return result
+
+
+def import_profile(top=15):
+    """python -X importtime 결과에서 누적 시간이 긴 모듈 상위 top 개 (µs)"""
+    completed = subprocess.run([sys.executable, "-X", "importtime", "-c", "import main"],
+                               capture_output=True, text=True, env={**os.environ, **BASE_ENV})
+    rows = []
+    for line in completed.stderr.splitlines():
+        match = re.match(r"import time:\s+(\d+) \|\s+(\d+) \| (\s*)(\S+)", line)
+        if match:
+            rows.append((int(match.group(2)), len(match.group(3)) // 2, match.group(4)))
+    total = max((cumulative for cumulative, _, name in rows if name == "main"), default=0)
+    print(f"📦 import main: {total / 1000:.0f}ms")
+    for cumulative, depth, name in sorted(rows, reverse=True)[:top]:
+        print(f"  {cumulative / 1000:>8.1f}ms  {'  ' * min(depth, 4)}{name}")
+
+
+def _median(values):
+    values = [v for v in values if v is not None]
+    return round(statistics.median(values)) if values else None
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="콜드 스타트 측정")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--user-id", type=int, default=1)
+    parser.add_argument("--timeout", type=float, default=60)
+    parser.add_argument("--skip-chat", action="store_true", help="첫 / 응답까지만 측정 (DB/LLM 없이)")
+    parser.add_argument("--budget-root-ms", type=int, default=0, help="첫 / 응답 예산 (0: 검사 안 함)")
+    parser.add_argument("--budget-chat-ms", type=int, default=0, help="첫 /api/chat 응답 예산 (0: 검사 안 함)")
+    parser.add_argument("--importtime", action="store_true", help="import 시간 상위 모듈만 출력")
+    args = parser.parse_args()
+
+    if args.importtime:
+        import_profile()
+        sys.exit(0)
+
+    runs = []
+    for i in range(args.runs):
+        result = measure_once(args)
+        runs.append(result)
+        print(f"  run {i + 1}: 첫 / {result['root_ms']}ms, 첫 /api/chat {result['chat_ms']}ms")
+
+    root_ms = _median([r["root_ms"] for r in runs])
+    chat_ms = _median([r["chat_ms"] for r in runs])
+    print(f"⏱️ 중앙값: 첫 / {root_ms}ms, 첫 /api/chat {chat_ms}ms")
+
+    failed = []
+    if args.budget_root_ms and (root_ms is None or root_ms > args.budget_root_ms):
+        failed.append(f"첫 / {root_ms}ms > {args.budget_root_ms}ms")
+    if args.budget_chat_ms and not args.skip_chat and (chat_ms is None or chat_ms > args.budget_chat_ms):
+        failed.append(f"첫 /api/chat {chat_ms}ms > {args.budget_chat_ms}ms")
+    if failed:
+        print("❌ 콜드 스타트 예산 초과: " + ", ".join(failed))
+        sys.exit(1)
@@ -0,0 +1,215 @@
+"""
+소비 내역 비동기 분류 큐.
+
+캐시/로컬 모델로 바로 분류되지 않은 소비 내역은 카테고리 '미분류'(category_source='pending')로 먼저 저장하고,
+요청은 LLM 을 기다리지 않고 바로 응답합니다. 백그라운드 워커들이 이 큐에서 소비처를 꺼내
+(중복 제거 + 배치 프롬프트로) 분류한 뒤, 해당 행들의 카테고리를 채우고 롤업을 '미분류' -> 카테고리로 옮깁니다.
+
+- 큐는 소비처(원문) 단위로 중복을 제거합니다. 같은 소비처의 대기 행은 UPDATE 한 번에 함께 채워집니다.
+- LLM 이 실패하면(fallback) 시간 간격을 늘려가며 재시도하고, CATEGORIZE_MAX_ATTEMPTS 번 실패하면 메모리 재시도만 멈춥니다.
+  행은 대기 상태로 남아 스윕이 다시 가져가므로, LLM 장애가 길어져도 '기타'로 잘못 확정되지 않고 복구 후 분류됩니다.
+- 큐는 메모리에만 있으므로, 서버 재시작/큐 초과로 빠진 대기 행은 주기적인 DB 스윕이 다시 큐에 넣습니다.
+  스윕은 큐에 들어간 지 CATEGORIZE_SWEEP_MIN_AGE 초가 지난 행만 가져가고(category_queued_at),
+  가져가면서 그 시각을 갱신하므로 다른 인스턴스가 방금 넣은 행이나 처리 중인 행을 중복으로 분류하지 않습니다.
+  (대기 행 UPDATE 는 category_source='pending' 조건으로만 하므로 겹치더라도 결과는 안전합니다)
+- 대기 중인 금액도 롤업에는 '미분류'로 들어가 있으므로 월별 합계는 항상 맞고, 카테고리만 잠시 뒤에 확정됩니다.
+  '미분류'는 그룹 평균(cluster_month_averages)에서는 빠지고, 리포트는 대기 행이 남아 있는 동안 저장하지 않습니다.
+"""
+import os
+import asyncio
+from collections import OrderedDict
+
+import env  # noqa: F401  (.env 로드)
+import metrics
+import rollup
+from database import run_with_db
+from chat_session import session_cache
+
+PENDING_CATEGORY = rollup.PENDING_CATEGORY
+PENDING_SOURCE = "pending"
+
+CATEGORIZE_WORKERS = int(os.getenv("CATEGORIZE_WORKERS", "4"))                  # 동시에 분류하는 배치 수
+CATEGORIZE_BATCH = int(os.getenv("CATEGORIZE_BATCH", "50"))                     # 워커 1회당 소비처 수
+CATEGORIZE_QUEUE_MAX = int(os.getenv("CATEGORIZE_QUEUE_MAX", "100000"))         # 넘치면 버리고 스윕이 다시 주워옴
+CATEGORIZE_MAX_ATTEMPTS = int(os.getenv("CATEGORIZE_MAX_ATTEMPTS", "5"))        # LLM 실패 시 재시도 횟수 (넘으면 스윕에 맡김)
+CATEGORIZE_RETRY_SECONDS = float(os.getenv("CATEGORIZE_RETRY_SECONDS", "30"))   # 재시도 대기 (시도마다 2배)
+CATEGORIZE_SWEEP_SECONDS = float(os.getenv("CATEGORIZE_SWEEP_SECONDS", "60"))   # DB 에 남은 대기 행 확인 주기
+CATEGORIZE_SWEEP_LIMIT = int(os.getenv("CATEGORIZE_SWEEP_LIMIT", "5000"))       # 스윕 1회당 대기 행 수
+CATEGORIZE_SWEEP_MIN_AGE = int(os.getenv("CATEGORIZE_SWEEP_MIN_AGE", "300"))    # 큐에 들어간 지 이 시간(초)이 지난 대기 행만 스윕
+
+
+# ---------------------------------------------------------
+# 🗄️ DB 헬퍼 (run_with_db 로 스레드풀에서 실행)
+# ---------------------------------------------------------
+@metrics.instrument()
+def claim_pending_contents(conn, min_age=CATEGORIZE_SWEEP_MIN_AGE, limit=CATEGORIZE_SWEEP_LIMIT):
+    """
+    큐에 들어간 지 min_age 초가 지나도록 분류되지 않은 대기 행의 소비처 목록을 가져옵니다.
+    가져간 행은 category_queued_at 을 지금으로 갱신해, 다른 인스턴스의 스윕이 min_age 동안 다시 가져가지 않게 합니다.
+    """
+    with conn.cursor() as cursor:
+        cursor.execute("""
+            SELECT id, original_content
+            FROM transactions
+            WHERE category_source = %s AND category_queued_at < NOW() - INTERVAL %s SECOND
+            LIMIT %s
+            FOR UPDATE SKIP LOCKED
+        """, (PENDING_SOURCE, min_age, limit))
+        rows = cursor.fetchall()
+        if rows:
+            placeholders = ", ".join(["%s"] * len(rows))
+            cursor.execute(
+                f"UPDATE transactions SET category_queued_at = NOW() WHERE id IN ({placeholders})",
+                [row['id'] for row in rows]
+            )
+    conn.commit()
+    return list(dict.fromkeys(row['original_content'] for row in rows))
+
+
+@metrics.instrument()
+def resolve_pending(conn, categories):
+    """
+    categories: {소비처: (카테고리, 출처)}. 해당 소비처의 대기 행에 카테고리를 채우고 롤업을 옮깁니다.
+    (채운 행 수, 채운 행이 있는 사용자 id 집합) 반환.
+    """
+    contents = list(categories)
+    placeholders = ", ".join(["%s"] * len(contents))
+    with conn.cursor() as cursor:
+        # 다른 인스턴스가 같은 행을 동시에 채우지 않도록 잠그고, 아직 대기 중인 행만 가져옵니다.
+        cursor.execute(f"""
+            SELECT id, user_id, amount, original_content, transacted_at
+            FROM transactions
+            WHERE category_source = %s AND original_content IN ({placeholders})
+            FOR UPDATE
+        """, (PENDING_SOURCE, *contents))
+        rows = cursor.fetchall()
+        if rows:
+            cursor.executemany(
+                "UPDATE transactions SET category = %s, category_source = %s WHERE id = %s",
+                [(*categories[row['original_content']], row['id']) for row in rows]
+            )
+            rollup.move_transactions(cursor, [
+                (row['user_id'], row['amount'], PENDING_CATEGORY, categories[row['original_content']][0], row['transacted_at'])
+                for row in rows
+            ])
+    conn.commit()
+    return len(rows), {row['user_id'] for row in rows}
+
+
+# ---------------------------------------------------------
+# 🧵 분류 큐 + 워커
+# ---------------------------------------------------------
+class CategorizeQueue:
+    def __init__(self, classify, workers=CATEGORIZE_WORKERS, batch=CATEGORIZE_BATCH, max_queue=CATEGORIZE_QUEUE_MAX):
+        self._classify = classify        # async (소비처 목록) -> {소비처: (카테고리, 출처)}
+        self._workers = workers
+        self._batch = batch
+        self._max_queue = max_queue
+        self._queue = OrderedDict()      # 소비처 -> 지금까지 실패한 횟수
+        self._inflight = set()           # 워커가 분류 중인 소비처
+        self._retrying = set()           # 재시도 대기 중인 소비처
+        self._resubmit = set()           # 분류 중에 같은 소비처의 행이 또 들어온 경우 (끝나고 한 번 더)
+        self._wakeup = None
+        self._tasks = []
+        self._stats = {"submitted": 0, "deduped": 0, "dropped": 0, "batches": 0,
+                       "resolved_rows": 0, "retries": 0, "gave_up": 0, "errors": 0}
+
+    def start(self):
+        """이벤트 루프 안에서 호출 (lifespan). 워커들과 DB 스윕을 시작합니다."""
+        if self._tasks:
+            return
+        self._wakeup = asyncio.Event()
+        self._tasks = [asyncio.create_task(self._work()) for _ in range(self._workers)]
+        self._tasks.append(asyncio.create_task(self._sweep()))
+
+    async def stop(self):
+        # 남은 소비처는 DB 에 대기 행으로 남아 있으므로 다음 기동 시 스윕이 다시 처리합니다.
+        tasks, self._tasks = self._tasks, []
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def submit(self, contents, attempts=0):
+        for content in contents:
+            if content in self._inflight:
+                self._resubmit.add(content)
+            if content in self._queue or content in self._inflight or content in self._retrying:
+                self._stats["deduped"] += 1
+                continue
+            if len(self._queue) >= self._max_queue:
+                self._stats["dropped"] += 1
+                continue
+            self._queue[content] = attempts
+            self._stats["submitted"] += 1
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    def _retry_later(self, content, attempts):
+        """
+        attempts 번 실패한 소비처를 잠시 뒤 다시 큐에 넣습니다.
+        CATEGORIZE_MAX_ATTEMPTS 번 실패했으면 대기 행으로 남겨 둡니다. (CATEGORIZE_SWEEP_MIN_AGE 뒤 스윕이 다시 가져감)
+        """
+        if attempts >= CATEGORIZE_MAX_ATTEMPTS:
+            self._stats["gave_up"] += 1
+            return
+        self._retrying.add(content)
+        self._stats["retries"] += 1
+
+        def _requeue():
+            self._retrying.discard(content)
+            self.submit([content], attempts)
+
+        asyncio.get_running_loop().call_later(CATEGORIZE_RETRY_SECONDS * 2 ** (attempts - 1), _requeue)
+
+    async def _work(self):
+        while True:
+            if not self._queue:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+            batch = dict(self._queue.popitem(last=False) for _ in range(min(self._batch, len(self._queue))))
+            self._inflight.update(batch)
+            try:
+                await self._process(batch)
+            except Exception as e:
+                self._stats["errors"] += 1
+                print(f"❌ [비동기 분류] {len(batch)}건 처리 실패, 재시도 예정: {e}")
+                for content, attempts in batch.items():
+                    self._retry_later(content, attempts + 1)
+            finally:
+                self._inflight.difference_update(batch)
+                again = self._resubmit.intersection(batch)
+                if again:
+                    # 분류 결과는 이미 캐시에 있으므로 다시 돌아도 LLM 호출 없이 끝납니다.
+                    self._resubmit.difference_update(again)
+                    self.submit(again)
+
+    async def _process(self, batch):
+        """
+        분류 결과를 대기 행에 채우고, LLM 이 답하지 못한(fallback) 소비처는 재시도를 예약합니다.
+        재시도 예약은 DB 반영이 끝난 뒤에 하므로, 도중에 실패하면 _work 가 배치 전체를 한 번씩만 다시 예약합니다.
+        """
+        self._stats["batches"] += 1
+        categories = await self._classify(list(batch))
+        resolved = {content: categories[content] for content in batch if categories[content][1] != "fallback"}
+        if resolved:
+            count, user_ids = await run_with_db(resolve_pending, resolved)
+            self._stats["resolved_rows"] += count
+            for user_id in user_ids:
+                session_cache.invalidate_summaries(user_id)  # 챗봇 요약의 '미분류' 금액을 새 카테고리로
+
+        for content, attempts in batch.items():
+            if content not in resolved:
+                self._retry_later(content, attempts + 1)  # LLM 장애/엉뚱한 답 -> 나중에 다시 ('기타'로 확정하지 않음)
+
+    async def _sweep(self):
+        while True:
+            try:
+                self.submit(await run_with_db(claim_pending_contents))
+            except Exception as e:
+                print(f"⚠️ [비동기 분류] 대기 행 확인 실패: {e}")
+            await asyncio.sleep(CATEGORIZE_SWEEP_SECONDS)
+
+    def stats(self):
+        return {**self._stats, "queued": len(self._queue), "inflight": len(self._inflight),
+                "retrying": len(self._retrying)}
@@ -0,0 +1,121 @@
+import os
+import re
+import threading
+import unicodedata
+from collections import OrderedDict
+
+import env  # noqa: F401  (.env 로드)
+
+CACHE_SIZE = int(os.getenv("CATEGORY_CACHE_SIZE", "5000"))
+
+# "스타벅스 강남역점", "GS25 역삼2호점", "(주)쿠팡" 처럼 같은 가맹점이 지점/법인 표기만 다른 경우를 하나로 묶습니다.
+_CORP_RE = re.compile(r"\(주\)|㈜|주식회사|\(유\)|유한회사")
+_PAREN_RE = re.compile(r"[\(\[\{].*?[\)\]\}]")
+_BRANCH_TOKEN_RE = re.compile(r"^\S*(점|지점|직영점|호점|센터|지사|본점)$")
+_DIGIT_RE = re.compile(r"\d+")
+_NON_WORD_RE = re.compile(r"[^\w]+")
+
+
+def normalize_merchant(content):
+    """소비처 문자열을 캐시 키로 정규화합니다. (공백/대소문자/지점명/숫자 제거)"""
+    text = unicodedata.normalize("NFKC", content or "").casefold()
+    text = _CORP_RE.sub(" ", text)
+    text = _PAREN_RE.sub(" ", text)
+
+    tokens = text.split()
+    # 첫 토큰(브랜드명)은 남기고, 뒤에 붙은 지점 표기 토큰만 제거 ("편의점" 같은 단독 상호는 유지)
+    while len(tokens) > 1 and _BRANCH_TOKEN_RE.match(tokens[-1]):
+        tokens.pop()
+
+    key = _NON_WORD_RE.sub("", _DIGIT_RE.sub("", "".join(tokens)))
+    if not key:
+        # 숫자만 있는 소비처 등은 원문 기준으로라도 묶습니다.
+        key = _NON_WORD_RE.sub("", text)
+    return key[:191]
+
+
+class CategoryCache:
+    """
+    가맹점 -> 카테고리 2단 캐시.
+    1) 프로세스 내 LRU (OrderedDict)
+    2) category_cache 테이블 (재시작/다른 인스턴스와 공유)
+    두 곳 모두 없을 때만 LLM 분류가 호출됩니다.
+    """
+
+    def __init__(self, max_size=CACHE_SIZE):
+        self._max_size = max_size
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"memory_hits": 0, "db_hits": 0, "misses": 0, "evictions": 0, "db_errors": 0}
+
+    def _remember(self, key, category):
+        with self._lock:
+            self._items[key] = category
+            self._items.move_to_end(key)
+            while len(self._items) > self._max_size:
+                self._items.popitem(last=False)
+                self._stats["evictions"] += 1
+
+    def _count(self, name):
+        with self._lock:
+            self._stats[name] += 1
+
+    def get(self, content, cursor=None):
+        key = normalize_merchant(content)
+        if not key:
+            return None
+
+        with self._lock:
+            category = self._items.get(key)
+            if category is not None:
+                self._items.move_to_end(key)
+                self._stats["memory_hits"] += 1
+                return category
+
+        if cursor is not None:
+            try:
+                cursor.execute("SELECT category FROM category_cache WHERE merchant_key = %s", (key,))
+                row = cursor.fetchone()
+                if row:
+                    cursor.execute("UPDATE category_cache SET hits = hits + 1 WHERE merchant_key = %s", (key,))
+                    self._remember(key, row['category'])
+                    self._count("db_hits")
+                    return row['category']
+            except Exception as e:
+                self._count("db_errors")
+                print(f"Category cache DB error: {e}")
+
+        self._count("misses")
+        return None
+
+    def put(self, content, category, cursor=None):
+        key = normalize_merchant(content)
+        if not key:
+            return
+        self._remember(key, category)
+
+        if cursor is not None:
+            try:
+                sql = """
+                    INSERT INTO category_cache (merchant_key, category)
+                    VALUES (%s, %s)
+                    ON DUPLICATE KEY UPDATE category = VALUES(category)
+                """
+                cursor.execute(sql, (key, category))
+            except Exception as e:
+                self._count("db_errors")
+                print(f"Category cache DB error: {e}")
+
+    def stats(self):
+        with self._lock:
+            lookups = self._stats["memory_hits"] + self._stats["db_hits"] + self._stats["misses"]
+            hits = lookups - self._stats["misses"]
+            return {
+                **self._stats,
+                "size": len(self._items),
+                "max_size": self._max_size,
+                "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+category_cache = CategoryCache()
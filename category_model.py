@@ -0,0 +1,278 @@
+"""
+가맹점 카테고리 로컬 분류기 (문자 n-gram TF-IDF + 로지스틱 회귀).
+
+transactions 에 쌓인 (소비처, LLM 이 붙인 카테고리) 쌍으로 주기적으로 학습하고,
+분류 캐시에 없는 소비처를 LLM 보다 먼저 이 모델로 분류합니다.
+확신도가 CATEGORY_MODEL_THRESHOLD 이상일 때만 모델 답을 쓰고, 나머지는 LLM 으로 넘깁니다.
+LLM 답은 transactions.category_source='llm' 으로 저장되어 다음 학습 데이터가 되며,
+모델이 스스로 붙인 답(category_source='model')은 학습에서 제외합니다.
+
+모델은 category_models 테이블에 버전별로 저장되어 모든 인스턴스가 같은 모델을 씁니다.
+오프라인 평가(가맹점 단위 holdout 정확도/커버리지/지연 시간)를 통과한 버전만 활성화됩니다.
+
+    python category_model.py train [--no-promote]   # 학습 + 평가 + (기준 통과 시) 활성화
+    python category_model.py evaluate [버전]         # 저장된 모델을 최근 데이터로 다시 평가
+    python category_model.py list                    # 버전 목록
+"""
+import io
+import os
+import sys
+import json
+import time
+import random
+import threading
+from collections import defaultdict
+
+from category_cache import normalize_merchant
+from database import db_connection
+
+CATEGORY_MODEL_THRESHOLD = float(os.getenv("CATEGORY_MODEL_THRESHOLD", "0.9"))         # 이 확신도 이상이면 LLM 생략
+CATEGORY_MODEL_MIN_ACCURACY = float(os.getenv("CATEGORY_MODEL_MIN_ACCURACY", "0.95"))  # 활성화 기준 (임계값 이상 구간 정확도)
+CATEGORY_MODEL_MAX_ROWS = int(os.getenv("CATEGORY_MODEL_MAX_ROWS", "500000"))          # 학습에 쓰는 (소비처, 카테고리) 조합 수
+CATEGORY_MODEL_REFRESH_SECONDS = float(os.getenv("CATEGORY_MODEL_REFRESH_SECONDS", "600"))  # 새 버전 확인 주기
+CATEGORY_MODEL_HOLDOUT = 0.2
+CATEGORY_MODEL_SEED = 42
+
+# 학습 데이터: LLM(또는 LLM 답을 저장한 캐시)이 붙인 카테고리만. 소스가 없는 예전 행은 LLM 분류 결과입니다.
+TRAINING_SQL = """
+    SELECT original_content, category, COUNT(*) AS n
+    FROM transactions
+    WHERE type = 'WITHDRAW' AND category IS NOT NULL
+      AND (category_source IS NULL OR category_source IN ('llm', 'cache'))
+    GROUP BY original_content, category
+    ORDER BY n DESC
+    LIMIT %s
+"""
+
+
+# ---------------------------------------------------------
+# 📚 학습 / 평가
+# ---------------------------------------------------------
+def load_training_data(conn, categories, max_rows=CATEGORY_MODEL_MAX_ROWS):
+    """
+    가맹점 키(normalize_merchant) 단위로 묶어 (키 목록, 정답 목록, 가중치 목록) 반환.
+    같은 가맹점에 카테고리가 엇갈리면 가장 많이 붙은 카테고리를 정답으로 씁니다.
+    """
+    counts = defaultdict(lambda: defaultdict(int))
+    with conn.cursor() as cursor:
+        cursor.execute(TRAINING_SQL, (max_rows,))
+        for row in cursor.fetchall():
+            key = normalize_merchant(row['original_content'])
+            if key and row['category'] in categories:
+                counts[key][row['category']] += row['n']
+
+    keys, labels, weights = [], [], []
+    for key, by_category in counts.items():
+        label, n = max(by_category.items(), key=lambda kv: kv[1])
+        keys.append(key)
+        labels.append(label)
+        weights.append(1.0 + min(n, 100) ** 0.5)  # 자주 나오는 가맹점에 가중치 (대형 가맹점이 독식하지 않게 상한)
+    return keys, labels, weights
+
+
+def build_pipeline():
+    from sklearn.pipeline import make_pipeline
+    from sklearn.feature_extraction.text import TfidfVectorizer
+    from sklearn.linear_model import LogisticRegression
+
+    return make_pipeline(
+        TfidfVectorizer(analyzer="char", ngram_range=(1, 3), sublinear_tf=True, min_df=1),
+        LogisticRegression(max_iter=1000, C=10.0),
+    )
+
+
+def evaluate(pipeline, keys, labels, threshold=CATEGORY_MODEL_THRESHOLD, latency_samples=200):
+    """
+    - accuracy: 전체 정확도
+    - coverage: 확신도가 threshold 이상이라 LLM 없이 처리되는 비율
+    - covered_accuracy: 그 구간의 정확도 (활성화 기준)
+    - latency_us_p50/p99: 소비처 1건 분류 시간(µs)
+    """
+    if not keys:
+        return {"samples": 0}
+    proba = pipeline.predict_proba(keys)
+    classes = pipeline.classes_
+    predicted = [classes[i] for i in proba.argmax(axis=1)]
+    confident = proba.max(axis=1) >= threshold
+
+    correct = [p == t for p, t in zip(predicted, labels)]
+    covered = [c for c, ok in zip(correct, confident) if ok]
+
+    timings = []
+    for key in keys[:latency_samples]:
+        started = time.perf_counter()
+        pipeline.predict_proba([key])
+        timings.append((time.perf_counter() - started) * 1e6)
+    timings.sort()
+
+    return {
+        "samples": len(keys),
+        "threshold": threshold,
+        "accuracy": round(sum(correct) / len(correct), 4),
+        "coverage": round(len(covered) / len(correct), 4),
+        "covered_accuracy": round(sum(covered) / len(covered), 4) if covered else 0.0,
+        "latency_us_p50": round(timings[len(timings) // 2], 1),
+        "latency_us_p99": round(timings[min(len(timings) - 1, int(len(timings) * 0.99))], 1),
+    }
+
+
+def train(conn, categories, promote=True):
+    """holdout 으로 평가한 뒤 전체 데이터로 다시 학습해 저장합니다. 저장한 버전 정보 반환"""
+    keys, labels, weights = load_training_data(conn, categories)
+    if len(set(labels)) < 2:
+        print("⚠️ [분류 모델] 학습할 데이터가 부족합니다.")
+        return {"version": None, "samples": len(keys)}
+
+    # 가맹점 단위로 나눠서, 처음 보는 가맹점에 대한 성능을 잽니다.
+    order = list(range(len(keys)))
+    random.Random(CATEGORY_MODEL_SEED).shuffle(order)
+    split = int(len(order) * (1 - CATEGORY_MODEL_HOLDOUT))
+    train_idx, test_idx = order[:split], order[split:]
+
+    pipeline = build_pipeline()
+    started = time.monotonic()
+    pipeline.fit([keys[i] for i in train_idx], [labels[i] for i in train_idx],
+                 logisticregression__sample_weight=[weights[i] for i in train_idx])
+    report = evaluate(pipeline, [keys[i] for i in test_idx], [labels[i] for i in test_idx])
+
+    pipeline = build_pipeline()
+    pipeline.fit(keys, labels, logisticregression__sample_weight=weights)
+    report.update({"train_samples": len(keys), "train_seconds": round(time.monotonic() - started, 1)})
+
+    active = promote and report.get("covered_accuracy", 0) >= CATEGORY_MODEL_MIN_ACCURACY
+    version = save(conn, pipeline, report, active)
+    print(f"✅ [분류 모델] v{version} 저장 ({'활성화' if active else '비활성 - 기준 미달'}) {report}")
+    return {"version": version, "active": active, **report, "rows": len(keys)}
+
+
+# ---------------------------------------------------------
+# 💾 버전 저장 / 로드
+# ---------------------------------------------------------
+def save(conn, pipeline, report, active):
+    import joblib
+    buffer = io.BytesIO()
+    joblib.dump(pipeline, buffer, compress=3)
+    with conn.cursor() as cursor:
+        cursor.execute(
+            "INSERT INTO category_models (metrics, model, active) VALUES (%s, %s, %s)",
+            (json.dumps(report), buffer.getvalue(), active)
+        )
+        version = cursor.lastrowid
+    conn.commit()
+    return version
+
+
+def load(conn, version=None):
+    """(버전, 파이프라인) 반환. version 이 없으면 가장 최근 활성 버전"""
+    with conn.cursor() as cursor:
+        if version is None:
+            cursor.execute("SELECT id, model FROM category_models WHERE active = 1 ORDER BY id DESC LIMIT 1")
+        else:
+            cursor.execute("SELECT id, model FROM category_models WHERE id = %s", (version,))
+        row = cursor.fetchone()
+    if not row:
+        return None, None
+    import joblib  # joblib/scikit-learn 은 모델을 실제로 읽을 때만 import (콜드 스타트)
+    return row['id'], joblib.load(io.BytesIO(row['model']))
+
+
+class CategoryModel:
+    """
+    서버에서 쓰는 활성 모델 홀더. refresh() 는 서버의 백그라운드 작업(main.py)이
+    CATEGORY_MODEL_REFRESH_SECONDS 마다 호출하며, 새 활성 버전이 있는지만 확인하고 바뀌었을 때만 다시 읽습니다.
+    predict() 는 CPU 작업이므로 이벤트 루프에서는 스레드풀로 호출합니다.
+    """
+
+    def __init__(self, threshold=CATEGORY_MODEL_THRESHOLD):
+        self.threshold = threshold
+        self._version = None
+        self._pipeline = None
+        self._checked_at = None
+        self._lock = threading.Lock()
+        self._stats = {"predicted": 0, "confident": 0, "errors": 0}
+
+    def refresh(self, conn, force=False):
+        with self._lock:
+            now = time.monotonic()
+            if not force and self._checked_at is not None and now - self._checked_at < CATEGORY_MODEL_REFRESH_SECONDS:
+                return
+            self._checked_at = now
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT MAX(id) AS id FROM category_models WHERE active = 1")
+                latest = cursor.fetchone()['id']
+            if latest is None or latest == self._version:
+                return
+            version, pipeline = load(conn, latest)
+            self._version, self._pipeline = version, pipeline
+            print(f"🧠 [분류 모델] v{version} 로드")
+        except Exception as e:
+            # 모델이 없거나 테이블이 없어도 LLM 분류로 계속 동작합니다.
+            print(f"⚠️ [분류 모델] 로드 실패: {e}")
+
+    def predict(self, contents):
+        """{소비처: 카테고리} - 확신도가 threshold 이상인 것만"""
+        pipeline = self._pipeline
+        if pipeline is None or not contents:
+            return {}
+        keyed = [(content, normalize_merchant(content)) for content in contents]
+        keyed = [(content, key) for content, key in keyed if key]
+        if not keyed:
+            return {}
+        try:
+            proba = pipeline.predict_proba([key for _, key in keyed])
+        except Exception as e:
+            with self._lock:
+                self._stats["errors"] += 1
+            print(f"⚠️ [분류 모델] 예측 실패: {e}")
+            return {}
+
+        result = {}
+        for (content, _), row in zip(keyed, proba):
+            best = row.argmax()
+            if row[best] >= self.threshold:
+                result[content] = pipeline.classes_[best]
+        with self._lock:
+            self._stats["predicted"] += len(keyed)
+            self._stats["confident"] += len(result)
+        return result
+
+    def stats(self):
+        with self._lock:
+            predicted = self._stats["predicted"]
+            return {**self._stats, "version": self._version or 0, "threshold": self.threshold,
+                    "confident_rate": self._stats["confident"] / predicted if predicted else 0.0}
+
+
+category_model = CategoryModel()
+
+
+def _evaluate_saved(conn, categories, version=None):
+    version, pipeline = load(conn, version)
+    if pipeline is None:
+        print("⚠️ [분류 모델] 저장된 모델이 없습니다.")
+        return
+    keys, labels, _ = load_training_data(conn, categories)
+    print(f"📊 [분류 모델] v{version}: {evaluate(pipeline, keys, labels)}")
+    print("   (학습에 쓰인 데이터가 섞여 있으므로 holdout 수치는 train 결과의 metrics 를 참고하세요)")
+
+
+if __name__ == "__main__":
+    from routers.transactions import CATEGORIES
+
+    command = sys.argv[1] if len(sys.argv) > 1 else None
+    with db_connection() as conn:
+        if command == "train":
+            train(conn, CATEGORIES, promote="--no-promote" not in sys.argv)
+        elif command == "evaluate":
+            _evaluate_saved(conn, CATEGORIES, int(sys.argv[2]) if len(sys.argv) > 2 else None)
+        elif command == "list":
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT id, active, metrics, created_at FROM category_models ORDER BY id DESC LIMIT 20")
+                for row in cursor.fetchall():
+                    metrics = json.loads(row['metrics'])
+                    print(f"v{row['id']:<4} {'*' if row['active'] else ' '} {row['created_at']} "
+                          f"acc={metrics.get('accuracy')} coverage={metrics.get('coverage')} "
+                          f"covered_acc={metrics.get('covered_accuracy')} p50={metrics.get('latency_us_p50')}µs")
+        else:
+            print("사용법: python category_model.py [train [--no-promote] | evaluate [버전] | list]")
@@ -0,0 +1,351 @@
+"""
+챗봇 세션 캐시 + 메시지 write-behind 저장.
+
+- ChatSessionCache: 사용자별 최근 대화 구간과 이번 달/지난달 소비 요약을 메모리에 보관합니다.
+  (LRU + TTL + 전체 메모리 상한). 소비 내역이 추가되면 해당 사용자의 요약만 무효화합니다.
+  대화 구간(또는 토큰 예산) 밖으로 밀려난 메시지는 개수만 세어 두었다가 롤링 요약(chat_summaries)으로 압축합니다.
+  압축할 메시지는 DB(chat_messages)에서 마지막으로 요약한 메시지 id(last_message_id) 이후부터 읽으므로,
+  세션이 만료/밀려나거나 서버가 재시작되어도 요약에서 빠지는 메시지가 없습니다.
+- ChatMessageWriter: chat_messages INSERT 를 요청 경로에서 빼내어 백그라운드 스레드가 모아서
+  executemany 로 저장합니다. 서버 종료 시 lifespan 에서 남은 메시지를 flush 합니다.
+"""
+import os
+import time
+import datetime
+import threading
+from collections import OrderedDict, deque
+
+import metrics
+from database import db_connection
+
+CHAT_HISTORY_LIMIT = int(os.getenv("CHAT_HISTORY_LIMIT", "6"))                 # 프롬프트에 넣는 최근 메시지 수
+CHAT_SESSION_TTL = float(os.getenv("CHAT_SESSION_TTL", "1800"))                # 세션 유휴 만료(초)
+CHAT_SUMMARY_TTL = float(os.getenv("CHAT_SUMMARY_TTL", "300"))                 # 소비 요약 최대 보관(초) - 다른 인스턴스의 입력 반영용
+CHAT_SESSION_MAX_USERS = int(os.getenv("CHAT_SESSION_MAX_USERS", "10000"))
+CHAT_SESSION_MAX_BYTES = int(os.getenv("CHAT_SESSION_MAX_BYTES", str(64 * 1024 * 1024)))
+CHAT_FLUSH_INTERVAL = float(os.getenv("CHAT_FLUSH_INTERVAL", "0.5"))           # write-behind flush 주기(초)
+CHAT_FLUSH_BATCH = int(os.getenv("CHAT_FLUSH_BATCH", "500"))                   # flush 1회당 최대 INSERT 행 수
+CHAT_QUEUE_MAX = int(os.getenv("CHAT_QUEUE_MAX", "100000"))                    # DB 장애 시 메모리에 쌓아둘 최대 메시지 수
+CHAT_COMPACT_MAX_MESSAGES = int(os.getenv("CHAT_COMPACT_MAX_MESSAGES", "50"))  # 요약 1회당 최대 메시지 수 (더 오래된 것은 건너뜀)
+
+_ENTRY_OVERHEAD = 512  # 세션 1개당 대략적인 고정 오버헤드(bytes)
+
+
+def _message_size(message):
+    return len(message["content"].encode("utf-8")) + 64
+
+
+# ---------------------------------------------------------
+# 🗂️ 세션 캐시
+# ---------------------------------------------------------
+class ChatSession:
+    __slots__ = ("history", "summaries", "summaries_at", "touched_at", "size",
+                 "rolling_summary", "compact_pending", "compacting")
+
+    def __init__(self, history, summaries, rolling_summary="", compact_pending=0):
+        self.history = deque(history, maxlen=CHAT_HISTORY_LIMIT)
+        self.summaries = summaries            # {(year, month): {"summary": ..., "total": ...}} 또는 None(무효화됨)
+        self.summaries_at = time.monotonic()
+        self.touched_at = time.monotonic()
+        self.rolling_summary = rolling_summary or ""
+        self.compact_pending = compact_pending  # 대화 구간 밖으로 밀려났지만 아직 롤링 요약에 반영되지 않은 메시지 수
+        self.compacting = False
+        self.size = (_ENTRY_OVERHEAD + sum(_message_size(m) for m in self.history)
+                     + len(self.rolling_summary.encode("utf-8")))
+
+    def summaries_for(self, months):
+        """요청한 달들의 요약이 유효하면 반환, 아니면 None"""
+        if self.summaries is None or time.monotonic() - self.summaries_at > CHAT_SUMMARY_TTL:
+            return None
+        if any(ym not in self.summaries for ym in months):
+            return None  # 월이 바뀐 경우
+        return self.summaries
+
+
+class ChatSessionCache:
+    def __init__(self, max_users=CHAT_SESSION_MAX_USERS, max_bytes=CHAT_SESSION_MAX_BYTES, ttl=CHAT_SESSION_TTL):
+        self._max_users = max_users
+        self._max_bytes = max_bytes
+        self._ttl = ttl
+        self._sessions = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "expired": 0, "evictions": 0, "invalidations": 0}
+
+    def _drop(self, user_id):
+        session = self._sessions.pop(user_id, None)
+        if session is not None:
+            self._bytes -= session.size
+
+    def _evict(self):
+        while self._sessions and (len(self._sessions) > self._max_users or self._bytes > self._max_bytes):
+            user_id = next(iter(self._sessions))
+            self._drop(user_id)
+            self._stats["evictions"] += 1
+
+    def get(self, user_id):
+        with self._lock:
+            session = self._sessions.get(user_id)
+            if session is None:
+                self._stats["misses"] += 1
+                return None
+            if time.monotonic() - session.touched_at > self._ttl:
+                self._drop(user_id)
+                self._stats["expired"] += 1
+                self._stats["misses"] += 1
+                return None
+            session.touched_at = time.monotonic()
+            self._sessions.move_to_end(user_id)
+            self._stats["hits"] += 1
+            return session
+
+    def put(self, user_id, session):
+        with self._lock:
+            self._drop(user_id)
+            self._sessions[user_id] = session
+            self._bytes += session.size
+            self._evict()
+
+    def append(self, user_id, role, content):
+        """세션이 캐시에 있으면 최근 대화 구간에 메시지를 덧붙입니다."""
+        message = {"role": role, "content": content}
+        with self._lock:
+            session = self._sessions.get(user_id)
+            if session is None:
+                return
+            delta = _message_size(message)
+            if len(session.history) == session.history.maxlen:
+                # 대화 구간 밖으로 밀려나는 메시지는 메모리에서 빼고 롤링 요약 대상으로 셉니다. (내용은 DB 에서 읽음)
+                session.compact_pending += 1
+                delta -= _message_size(session.history[0])
+            session.history.append(message)
+            session.size += delta
+            self._bytes += delta
+            self._evict()
+
+    def trim_messages(self, user_id, messages):
+        """
+        토큰 예산 때문에 프롬프트에서 빠진 메시지들을 대화 구간에서 빼고 롤링 요약 대상으로 셉니다.
+        개수가 아니라 그 메시지 객체들만 빼므로, 그 사이 append 로 구간이 밀렸어도 프롬프트에 남은 메시지는 건드리지 않습니다.
+        (이미 구간 밖으로 밀려난 메시지는 append 가 세어 두었으므로 건너뜀)
+        """
+        targets = {id(message) for message in messages}
+        with self._lock:
+            session = self._sessions.get(user_id)
+            if session is None:
+                return
+            kept = deque(maxlen=session.history.maxlen)
+            freed = 0
+            for message in session.history:
+                if id(message) in targets:
+                    session.compact_pending += 1
+                    freed += _message_size(message)
+                else:
+                    kept.append(message)
+            session.history = kept
+            session.size -= freed
+            self._bytes -= freed
+
+    def take_for_compaction(self, user_id, min_messages):
+        """
+        요약할 메시지가 min_messages 개 이상 밀려났으면 압축 중으로 표시하고
+        (대화 구간에 남은 메시지 수, 가져간 대기 수) 반환. 아니면 None
+        """
+        with self._lock:
+            session = self._sessions.get(user_id)
+            if session is None or session.compacting or session.compact_pending < min_messages:
+                return None
+            pending, session.compact_pending = session.compact_pending, 0
+            session.compacting = True
+            return len(session.history), pending
+
+    def finish_compaction(self, user_id, summary=None, failed_pending=0):
+        with self._lock:
+            session = self._sessions.get(user_id)
+            if session is None:
+                return
+            session.compacting = False
+            session.compact_pending += failed_pending
+            if summary is not None:
+                delta = len(summary.encode("utf-8")) - len(session.rolling_summary.encode("utf-8"))
+                session.rolling_summary = summary
+                session.size += delta
+                self._bytes += delta
+                self._evict()
+
+    def set_summaries(self, user_id, summaries):
+        with self._lock:
+            session = self._sessions.get(user_id)
+            if session is not None:
+                session.summaries = summaries
+                session.summaries_at = time.monotonic()
+
+    def invalidate_summaries(self, user_id):
+        """소비 내역이 추가되면 호출. 다음 대화에서 요약만 다시 조회합니다."""
+        with self._lock:
+            session = self._sessions.get(user_id)
+            if session is not None and session.summaries is not None:
+                session.summaries = None
+                self._stats["invalidations"] += 1
+
+    def stats(self):
+        with self._lock:
+            return {**self._stats, "sessions": len(self._sessions), "bytes": self._bytes, "max_bytes": self._max_bytes}
+
+
+# ---------------------------------------------------------
+# ✍️ 메시지 write-behind
+# ---------------------------------------------------------
+class ChatMessageWriter:
+    INSERT_SQL = "INSERT INTO chat_messages (user_id, sender, content, created_at) VALUES (%s, %s, %s, %s)"
+
+    def __init__(self, interval=CHAT_FLUSH_INTERVAL, batch=CHAT_FLUSH_BATCH, max_queue=CHAT_QUEUE_MAX):
+        self._interval = interval
+        self._batch = batch
+        self._max_queue = max_queue
+        self._queue = deque()
+        self._cond = threading.Condition()
+        self._flush_lock = threading.Lock()
+        self._thread = None
+        self._stopping = False
+        self._stats = {"enqueued": 0, "written": 0, "flushes": 0, "errors": 0, "dropped": 0}
+
+    def start(self):
+        """lifespan 에서 호출. stop() 뒤에 다시 부르면 백그라운드 스레드를 새로 띄웁니다."""
+        with self._cond:
+            self._stopping = False
+            self._start_locked()
+
+    def _start_locked(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="chat-writer", daemon=True)
+            self._thread.start()
+
+    def enqueue(self, user_id, sender, content):
+        # created_at 은 요청 시점으로 고정 (flush 시각이 아니라 대화 순서를 보존)
+        row = (user_id, sender, content, datetime.datetime.now())
+        with self._cond:
+            if len(self._queue) >= self._max_queue:
+                self._queue.popleft()
+                self._stats["dropped"] += 1
+            self._queue.append(row)
+            self._stats["enqueued"] += 1
+            stopped = self._stopping
+            if not stopped:
+                self._start_locked()  # lifespan 없이 쓰는 경우(스크립트 등) 처음 들어올 때 시작
+                if len(self._queue) >= self._batch:
+                    self._cond.notify()
+        if stopped:
+            # stop() 뒤에 들어온 메시지(종료 중에 끊긴 스트림의 답변 등)는 스레드를 다시 띄우지 않고 바로 저장합니다.
+            self.flush()
+
+    def pending_for(self, user_id):
+        """아직 DB 에 쓰이지 않은 해당 사용자 메시지 (세션을 DB 에서 다시 읽을 때 합치기 위함)"""
+        with self._cond:
+            return [row for row in self._queue if row[0] == user_id]
+
+    def flush(self):
+        """큐가 빌 때까지 batch 단위로 저장합니다. 실패하면 남은 행은 큐 앞에 되돌려 다음에 재시도합니다."""
+        with self._flush_lock:
+            while True:
+                with self._cond:
+                    if not self._queue:
+                        return
+                    rows = [self._queue.popleft() for _ in range(min(self._batch, len(self._queue)))]
+                try:
+                    with db_connection() as conn, metrics.timed("sql.flush_chat_messages"):
+                        with conn.cursor() as cursor:
+                            cursor.executemany(self.INSERT_SQL, rows)
+                        conn.commit()
+                except Exception as e:
+                    with self._cond:
+                        self._queue.extendleft(reversed(rows))
+                        self._stats["errors"] += 1
+                    print(f"❌ [채팅 저장] {len(rows)}건 저장 실패, 재시도 예정: {e}")
+                    return
+                with self._cond:
+                    self._stats["written"] += len(rows)
+                    self._stats["flushes"] += 1
+
+    def _run(self):
+        while True:
+            with self._cond:
+                if not self._stopping and len(self._queue) < self._batch:
+                    self._cond.wait(self._interval)
+                stopping = self._stopping
+            self.flush()
+            if stopping:
+                return
+
+    def stop(self):
+        """백그라운드 스레드를 멈추고 남은 메시지를 모두 저장합니다."""
+        with self._cond:
+            thread, self._thread = self._thread, None
+            self._stopping = True
+            self._cond.notify()
+        if thread is not None:
+            thread.join()
+        self.flush()
+
+    def stats(self):
+        with self._cond:
+            return {**self._stats, "pending": len(self._queue)}
+
+
+# ---------------------------------------------------------
+# 📝 롤링 요약 저장소 (chat_summaries)
+# ---------------------------------------------------------
+@metrics.instrument()
+def load_rolling_summary(cursor, user_id):
+    """(요약, 요약에 반영된 마지막 chat_messages.id) 반환. 요약이 없으면 ("", 0)"""
+    cursor.execute("SELECT summary, last_message_id FROM chat_summaries WHERE user_id = %s", (user_id,))
+    row = cursor.fetchone()
+    return (row['summary'], row['last_message_id']) if row else ("", 0)
+
+
+@metrics.instrument()
+def count_unsummarized(cursor, user_id, last_message_id, limit):
+    """요약에 반영되지 않은 메시지 수 (limit 까지만 셈)"""
+    cursor.execute("""
+        SELECT COUNT(*) AS n FROM (
+            SELECT 1 FROM chat_messages WHERE user_id = %s AND id > %s LIMIT %s
+        ) t
+    """, (user_id, last_message_id, limit))
+    return cursor.fetchone()['n']
+
+
+@metrics.instrument()
+def load_unsummarized(conn, user_id, keep, limit=CHAT_COMPACT_MAX_MESSAGES):
+    """
+    요약에 반영되지 않은 메시지 중 최근 keep 개(아직 대화 구간에 있음)를 뺀 나머지를 오래된 순으로 최대 limit 개 가져옵니다.
+    (기존 요약, [{"role", "content"}], 마지막 메시지 id) 반환. limit 보다 오래된 메시지는 요약하지 않고 건너뜁니다.
+    """
+    with conn.cursor() as cursor:
+        summary, last_message_id = load_rolling_summary(cursor, user_id)
+        cursor.execute("""
+            SELECT id, sender, content FROM chat_messages
+            WHERE user_id = %s AND id > %s
+            ORDER BY id DESC
+            LIMIT %s
+        """, (user_id, last_message_id, keep + limit))
+        rows = cursor.fetchall()[keep:][::-1]
+    messages = [{"role": "user" if row['sender'] == "USER" else "assistant", "content": row['content']} for row in rows]
+    return summary, messages, (rows[-1]['id'] if rows else last_message_id)
+
+
+@metrics.instrument()
+def save_rolling_summary(conn, user_id, summary, last_message_id):
+    # 다른 인스턴스가 더 최근 메시지까지 요약해 두었으면 덮어쓰지 않습니다. (summary 를 먼저 비교한 뒤 id 갱신)
+    sql = """
+        INSERT INTO chat_summaries (user_id, summary, last_message_id) VALUES (%s, %s, %s)
+        ON DUPLICATE KEY UPDATE
+            summary = IF(VALUES(last_message_id) > last_message_id, VALUES(summary), summary),
+            last_message_id = GREATEST(last_message_id, VALUES(last_message_id))
+    """
+    with conn.cursor() as cursor:
+        cursor.execute(sql, (user_id, summary, last_message_id))
+    conn.commit()
+
+
+session_cache = ChatSessionCache()
+message_writer = ChatMessageWriter()
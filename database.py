@@ -1,8 +1,14 @@
 import os
+import time
+import threading
+from contextlib import contextmanager
+
 import pymysql
-from dotenv import load_dotenv
+from fastapi import HTTPException
+from starlette.concurrency import run_in_threadpool
 
-load_dotenv()
+import env  # noqa: F401  (.env 로드)
+import metrics
 
 # .env 파일이나 환경변수에서 가져오거나, 직접 입력하세요.
 DB_CONFIG = {
@@ -10,18 +16,231 @@ DB_CONFIG = {
     "user": os.getenv("USER"),      # .env 파일의 변수명과 일치시켜주세요
     "password": os.getenv("PASSWORD"),
     "db": os.getenv("DB"),
-    "charset": os.getenv("CHARSET"), 
-    "cursorclass": pymysql.cursors.DictCursor
+    "charset": os.getenv("CHARSET"),
+    "cursorclass": pymysql.cursors.DictCursor,
+    "connect_timeout": int(os.getenv("DB_CONNECT_TIMEOUT", "10")),
 }
 
+# 커넥션 풀 설정 (gunicorn 스레드 수보다 약간 크게 잡습니다)
+POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "10"))        # 빈 연결을 기다리는 최대 시간(초)
+POOL_RECYCLE = float(os.getenv("DB_POOL_RECYCLE", "1800"))      # 이 시간(초)보다 오래된 연결은 새로 맺음
+POOL_PING_AFTER = float(os.getenv("DB_POOL_PING_AFTER", "30"))  # 이 시간(초) 이상 놀던 연결은 ping 후 사용
+
+
+class PoolTimeout(Exception):
+    """풀에서 정해진 시간 안에 연결을 얻지 못했을 때 발생합니다."""
+
+
+# ---------------------------------------------------------
+# 🏊 커넥션 풀
+# ---------------------------------------------------------
+class ConnectionPool:
+    """
+    스레드 안전한 pymysql 커넥션 풀.
+    - 최대 max_size 개까지만 연결을 만들고, 부족하면 timeout 초 동안 대기합니다.
+    - 오래된 연결(recycle)은 버리고, 한동안 놀던 연결은 ping 으로 살아있는지 확인합니다.
+    - 반납 시 rollback 하여 커밋되지 않은 트랜잭션이 다음 요청으로 새지 않게 합니다.
+    """
+
+    def __init__(self, config, max_size=POOL_SIZE, timeout=POOL_TIMEOUT,
+                 recycle=POOL_RECYCLE, ping_after=POOL_PING_AFTER):
+        self._config = config
+        self._max_size = max_size
+        self._timeout = timeout
+        self._recycle = recycle
+        self._ping_after = ping_after
+
+        self._cond = threading.Condition()
+        self._idle = []          # [(conn, 반납 시각)] - 최근 반납한 연결부터 재사용(LIFO)
+        self._created_at = {}    # id(conn) -> 생성 시각
+        self._size = 0           # 현재 열려있는 연결 수 (대여 중 + 대기 중)
+        self._stats = {
+            "checkouts": 0,
+            "created": 0,
+            "recycled": 0,
+            "ping_failures": 0,
+            "discarded": 0,
+            "timeouts": 0,
+            "wait_seconds_total": 0.0,
+        }
+
+    # --- 내부 헬퍼 ---
+    def _connect(self):
+        conn = pymysql.connect(**self._config)
+        with self._cond:
+            self._created_at[id(conn)] = time.monotonic()
+            self._stats["created"] += 1
+        return conn
+
+    def _close(self, conn):
+        with self._cond:
+            self._created_at.pop(id(conn), None)
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def _is_usable(self, conn, returned_at):
+        now = time.monotonic()
+        created_at = self._created_at.get(id(conn), now)
+        if self._recycle and now - created_at > self._recycle:
+            with self._cond:
+                self._stats["recycled"] += 1
+            return False
+        if self._ping_after is not None and now - returned_at > self._ping_after:
+            try:
+                conn.ping(reconnect=False)
+            except Exception:
+                with self._cond:
+                    self._stats["ping_failures"] += 1
+                return False
+        return True
+
+    # --- 대여 / 반납 ---
+    def acquire(self):
+        # 대기 + (필요 시) 새 연결/ping 까지 포함한 대여 시간
+        with metrics.timed("db.checkout"):
+            return self._acquire()
+
+    def _acquire(self):
+        started = time.monotonic()
+        deadline = started + self._timeout
+        while True:
+            with self._cond:
+                while not self._idle and self._size >= self._max_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._stats["timeouts"] += 1
+                        raise PoolTimeout(f"DB 커넥션 풀 대기 시간 초과 ({self._timeout}s)")
+                    self._cond.wait(remaining)
+
+                if self._idle:
+                    conn, returned_at = self._idle.pop()
+                else:
+                    conn, returned_at = None, None
+                    self._size += 1  # 새 연결 자리를 미리 예약
+
+            if conn is None:
+                try:
+                    conn = self._connect()
+                except Exception:
+                    self._release_slot()
+                    raise
+                break
+
+            if self._is_usable(conn, returned_at):
+                break
+
+            # 낡은 연결은 버리고 같은 자리에 새로 맺습니다.
+            self._close(conn)
+            try:
+                conn = self._connect()
+            except Exception:
+                self._release_slot()
+                raise
+            break
+
+        with self._cond:
+            self._stats["checkouts"] += 1
+            self._stats["wait_seconds_total"] += time.monotonic() - started
+        return conn
+
+    def release(self, conn):
+        reusable = conn.open
+        if reusable:
+            try:
+                conn.rollback()
+            except Exception:
+                reusable = False
+
+        if not reusable:
+            with self._cond:
+                self._stats["discarded"] += 1
+            self._close(conn)
+            self._release_slot()
+            return
+
+        with self._cond:
+            self._idle.append((conn, time.monotonic()))
+            self._cond.notify()
+
+    def _release_slot(self):
+        with self._cond:
+            self._size -= 1
+            self._cond.notify()
+
+    @contextmanager
+    def connection(self):
+        conn = self.acquire()
+        try:
+            yield conn
+        finally:
+            self.release(conn)
+
+    def close_all(self):
+        with self._cond:
+            idle, self._idle = self._idle, []
+            self._size -= len(idle)
+        for conn, _ in idle:
+            self._close(conn)
+
+    def stats(self):
+        with self._cond:
+            return {
+                **self._stats,
+                "size": self._size,
+                "idle": len(self._idle),
+                "in_use": self._size - len(self._idle),
+                "max_size": self._max_size,
+            }
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def get_pool():
+    """프로세스 전역 커넥션 풀 (첫 사용 시 생성)."""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ConnectionPool(DB_CONFIG)
+    return _pool
+
+def get_pool_stats():
+    return get_pool().stats()
+
+@contextmanager
+def db_connection():
+    """스케줄러/배치 작업처럼 요청 밖에서 풀 연결을 빌려 쓸 때 사용합니다."""
+    with get_pool().connection() as conn:
+        yield conn
+
+async def run_with_db(fn, *args, **kwargs):
+    """
+    async 엔드포인트용. 풀에서 연결을 잠깐 빌려 fn(conn, ...) 을 스레드풀에서 실행하고 바로 반납합니다.
+    LLM 응답을 기다리는 동안에는 연결을 붙잡고 있지 않도록 DB 작업 구간마다 사용하세요.
+    """
+    def _call():
+        with db_connection() as conn:
+            return fn(conn, *args, **kwargs)
+    try:
+        return await run_in_threadpool(_call)
+    except PoolTimeout as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
 def get_db():
     """
     FastAPI 의존성 주입용 DB 세션 생성기.
-    API 요청 시 연결하고, 응답 후 자동으로 연결을 닫습니다.
+    API 요청 시 풀에서 연결을 빌려주고, 응답 후 풀에 반납합니다.
     """
-    # 위에서 정의한 DB_CONFIG를 사용하여 연결
-    conn = pymysql.connect(**DB_CONFIG)
+    pool = get_pool()
+    try:
+        conn = pool.acquire()
+    except PoolTimeout as e:
+        raise HTTPException(status_code=503, detail=str(e))
     try:
         yield conn
     finally:
-        conn.close()
+        pool.release(conn)
@@ -0,0 +1,9 @@
+"""
+.env 로드 (프로세스당 한 번).
+
+설정값을 import 시점에 os.getenv 로 읽는 기반 모듈(database, llm, metrics 등)이 가장 먼저 import 합니다.
+라우터나 스크립트는 따로 load_dotenv 를 부르지 않아도 됩니다.
+"""
+from dotenv import load_dotenv
+
+load_dotenv()
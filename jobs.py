@@ -0,0 +1,197 @@
+"""
+배치 작업 실행기.
+
+웹 서버 프로세스(gunicorn 워커 / Cloud Run 인스턴스마다 하나씩 뜸)와 분리해서 배치 작업을 돌립니다.
+작업마다 MySQL advisory lock(GET_LOCK)을 잡기 때문에 실행기가 여러 개 떠 있어도
+같은 작업은 한 곳에서만 실행되고, 나머지는 건너뜁니다. 실행 이력은 job_runs 테이블에 남습니다.
+
+    python jobs.py run monthly          # 그룹 갱신 → 그룹 평균 → 리포트 사전 생성
+    python jobs.py run clustering       # 작업 하나만 실행
+    python jobs.py run category-model   # 로컬 카테고리 분류 모델 재학습
+    python jobs.py serve                # 상주하면서 스케줄대로 실행 (웹 서버는 ENABLE_SCHEDULER=false)
+    python jobs.py history [작업이름]    # 최근 실행 이력
+"""
+import os
+import sys
+import json
+import time
+import socket
+import asyncio
+import datetime
+from contextlib import contextmanager
+
+import rollup
+import report_batch
+import category_model
+from database import db_connection
+from routers import clustering, transactions
+
+JOB_LOCK_PREFIX = os.getenv("JOB_LOCK_PREFIX", "finmate:job:")
+JOB_LOCK_WAIT = int(os.getenv("JOB_LOCK_WAIT", "0"))   # 다른 실행기가 잡고 있을 때 기다릴 시간(초). 0 이면 바로 건너뜀
+CLUSTER_ASSIGN_INTERVAL_MINUTES = int(os.getenv("CLUSTER_ASSIGN_INTERVAL_MINUTES", "10"))  # 신규/소비 변경 사용자 그룹 배정 주기
+
+
+# ---------------------------------------------------------
+# 🔒 advisory lock
+# ---------------------------------------------------------
+@contextmanager
+def advisory_lock(conn, name, wait=JOB_LOCK_WAIT):
+    """
+    GET_LOCK 은 연결(세션) 단위 잠금이라, 작업이 끝날 때까지 같은 연결을 들고 있어야 합니다.
+    실행기가 죽으면 연결이 끊기면서 MySQL 이 잠금을 자동으로 풀어줍니다.
+    """
+    with conn.cursor() as cursor:
+        cursor.execute("SELECT GET_LOCK(%s, %s) AS acquired", (JOB_LOCK_PREFIX + name, wait))
+        acquired = cursor.fetchone()['acquired'] == 1
+    try:
+        yield acquired
+    finally:
+        if acquired:
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT RELEASE_LOCK(%s)", (JOB_LOCK_PREFIX + name,))
+
+
+# ---------------------------------------------------------
+# 🧩 작업 목록 (각 작업은 처리 행 수가 담긴 dict 를 반환)
+# ---------------------------------------------------------
+def job_clustering(loop=None):
+    with db_connection() as conn:
+        result = clustering.logic_clustering(conn)
+    return {**result, "rows": result.get("users_changed", 0)}
+
+def job_cluster_averages(loop=None):
+    month = rollup.previous_month_key()
+    with db_connection() as conn:
+        inserted = rollup.rebuild_cluster_averages(conn, month)
+    return {"month": month, "rows": inserted}
+
+def job_cluster_assign(loop=None, user_ids=None):
+    with db_connection() as conn:
+        result = clustering.assign_users(conn, user_ids)
+    return {**result, "rows": result["assigned"]}
+
+def job_report_batch(loop=None):
+    # 웹 서버 안에서 돌 때는 서버 이벤트 루프에서 실행해 OpenAI 클라이언트/동시성 제한을 공유합니다.
+    if loop is not None:
+        result = asyncio.run_coroutine_threadsafe(report_batch.run_report_batch(), loop).result()
+    else:
+        result = asyncio.run(report_batch.run_report_batch())
+    return {**result, "rows": result["created"]}
+
+def job_category_model(loop=None):
+    with db_connection() as conn:
+        return category_model.train(conn, transactions.CATEGORIES)
+
+def job_monthly(loop=None):
+    """매월 1일: 그룹 갱신 → (새 그룹 기준) 지난달 그룹 평균 → 리포트 사전 생성. 앞 단계가 실패해도 다음 단계는 진행"""
+    steps = {}
+    for name in ("clustering", "cluster-averages", "report-batch"):
+        steps[name] = run_job(name, loop)
+    return {"steps": steps, "rows": sum((s or {}).get("rows", 0) for s in steps.values())}
+
+JOBS = {
+    "clustering": job_clustering,
+    "cluster-averages": job_cluster_averages,
+    "cluster-assign": job_cluster_assign,
+    "report-batch": job_report_batch,
+    "category-model": job_category_model,
+    "monthly": job_monthly,
+}
+
+
+# ---------------------------------------------------------
+# ▶️ 실행 + 이력 기록
+# ---------------------------------------------------------
+def _start_run(conn, name):
+    with conn.cursor() as cursor:
+        cursor.execute(
+            "INSERT INTO job_runs (job_name, status, host, started_at) VALUES (%s, 'running', %s, %s)",
+            (name, socket.gethostname(), datetime.datetime.now())
+        )
+        run_id = cursor.lastrowid
+    conn.commit()
+    return run_id
+
+def _finish_run(conn, run_id, status, elapsed, rows, detail):
+    with conn.cursor() as cursor:
+        cursor.execute(
+            """
+            UPDATE job_runs
+            SET status = %s, finished_at = %s, duration_seconds = %s, row_count = %s, detail = %s
+            WHERE id = %s
+            """,
+            (status, datetime.datetime.now(), round(elapsed, 3), rows, detail, run_id)
+        )
+    conn.commit()
+
+def run_job(name, loop=None, **params):
+    """
+    잠금을 잡은 경우에만 작업을 실행하고 결과를 반환합니다. params 는 작업 함수에 그대로 넘깁니다.
+    다른 실행기가 이미 실행 중이면 None, 실패하면 None (에러는 job_runs 에 기록).
+    """
+    job = JOBS[name]
+    # 잠금용 연결은 작업 내내 붙잡고 있으므로 작업 자체는 별도 연결을 사용합니다.
+    with db_connection() as lock_conn:
+        with advisory_lock(lock_conn, name) as acquired:
+            if not acquired:
+                print(f"⏭️ [작업] {name}: 다른 실행기에서 실행 중이라 건너뜁니다.")
+                return None
+
+            run_id = _start_run(lock_conn, name)
+            print(f"▶️ [작업] {name} 시작 (run {run_id})")
+            started = time.monotonic()
+            try:
+                result = job(loop, **params)
+            except Exception as e:
+                _finish_run(lock_conn, run_id, "failed", time.monotonic() - started, None, str(e)[:2000])
+                print(f"❌ [작업] {name} 실패: {e}")
+                return None
+
+            elapsed = time.monotonic() - started
+            _finish_run(lock_conn, run_id, "success", elapsed, result.get("rows"),
+                        json.dumps(result, ensure_ascii=False, default=str)[:2000])
+            print(f"✅ [작업] {name} 완료 ({elapsed:.1f}s, {result.get('rows')}행)")
+            return result
+
+
+# ---------------------------------------------------------
+# ⏰ 스케줄 (웹 서버 내장 스케줄러와 jobs.py serve 가 같은 설정을 사용)
+# ---------------------------------------------------------
+def add_scheduled_jobs(scheduler, loop=None):
+    scheduler.add_job(run_job, 'cron', day='1', hour='0', minute='0', args=["monthly", loop])
+    scheduler.add_job(run_job, 'interval', minutes=CLUSTER_ASSIGN_INTERVAL_MINUTES, args=["cluster-assign", loop],
+                      max_instances=1, coalesce=True)
+    # 매주 월요일 새벽: 한 주 동안 LLM 이 분류한 소비처까지 포함해 분류 모델 재학습
+    scheduler.add_job(run_job, 'cron', day_of_week='mon', hour='3', minute='0', args=["category-model", loop])
+
+def history(name=None, limit=20):
+    sql = "SELECT * FROM job_runs"
+    params = []
+    if name:
+        sql += " WHERE job_name = %s"
+        params.append(name)
+    sql += " ORDER BY id DESC LIMIT %s"
+    params.append(limit)
+    with db_connection() as conn:
+        with conn.cursor() as cursor:
+            cursor.execute(sql, params)
+            return cursor.fetchall()
+
+
+if __name__ == "__main__":
+    command = sys.argv[1] if len(sys.argv) > 1 else ""
+    if command == "run" and len(sys.argv) > 2 and sys.argv[2] in JOBS:
+        sys.exit(0 if run_job(sys.argv[2]) is not None else 1)
+    elif command == "serve":
+        from apscheduler.schedulers.blocking import BlockingScheduler
+        scheduler = BlockingScheduler()
+        add_scheduled_jobs(scheduler)
+        print("🚀 작업 실행기 가동: " + ", ".join(str(job.trigger) for job in scheduler.get_jobs()))
+        scheduler.start()
+    elif command == "history":
+        for row in history(sys.argv[2] if len(sys.argv) > 2 else None):
+            print(f"{row['started_at']} {row['job_name']:<16} {row['status']:<8} "
+                  f"{row['duration_seconds'] or 0:>8.1f}s {row['row_count'] or 0:>8}행  {row['host']}")
+    else:
+        print(f"사용법: python jobs.py run [{'|'.join(JOBS)}] | serve | history [작업이름]")
+        sys.exit(1)
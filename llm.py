@@ -0,0 +1,211 @@
+import os
+import time
+import random
+import asyncio
+import importlib.util
+
+import env  # noqa: F401  (.env 로드)
+import metrics
+
+# ---------------------------------------------------------
+# ⚙️ LLM 호출 설정 (프로세스 전체 공통)
+# ---------------------------------------------------------
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "64"))  # 동시에 진행 가능한 OpenAI 요청 수
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "30"))                # 요청 1회당 타임아웃(초)
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "2"))           # 재시도 횟수 (최초 시도 제외)
+LLM_BACKOFF_BASE = float(os.getenv("LLM_BACKOFF_BASE", "0.5"))     # 재시도 대기 시간 기준값(초)
+
+# HTTP 커넥션 풀 (API 키마다 하나를 프로세스 전체가 공유 -> 몰릴 때 TLS 핸드셰이크 반복을 줄임)
+LLM_CONNECT_TIMEOUT = float(os.getenv("LLM_CONNECT_TIMEOUT", "5"))                                # 연결 타임아웃(초)
+LLM_POOL_MAX_CONNECTIONS = int(os.getenv("LLM_POOL_MAX_CONNECTIONS", str(LLM_MAX_CONCURRENCY)))  # 키당 최대 연결 수
+LLM_POOL_MAX_KEEPALIVE = int(os.getenv("LLM_POOL_MAX_KEEPALIVE", "32"))                         # 유지할 유휴 연결 수
+LLM_KEEPALIVE_EXPIRY = float(os.getenv("LLM_KEEPALIVE_EXPIRY", "60"))                           # 유휴 연결 유지 시간(초)
+# HTTP/2: auto 면 h2 패키지가 설치된 경우에만 사용 (연결 하나로 여러 요청을 다중화)
+LLM_HTTP2 = os.getenv("LLM_HTTP2", "auto").lower()
+HTTP2_ENABLED = (importlib.util.find_spec("h2") is not None) if LLM_HTTP2 == "auto" else LLM_HTTP2 in ("1", "true", "yes")
+
+# openai/httpx 는 import 비용이 커서(콜드 스타트) 첫 LLM 호출 때 함수 안에서 import 합니다.
+_retryable = None
+
+def _retryable_errors():
+    """재시도할 일시적인 오류 타입들. (인증/잘못된 요청 등은 바로 실패)"""
+    global _retryable
+    if _retryable is None:
+        import openai
+        _retryable = (
+            openai.APITimeoutError,
+            openai.APIConnectionError,
+            openai.RateLimitError,
+            openai.InternalServerError,
+        )
+    return _retryable
+
+_semaphores = {}  # 이벤트 루프 -> Semaphore
+_clients = {}  # api_key -> (이벤트 루프, AsyncOpenAI)
+
+def _get_semaphore():
+    """
+    동시 요청 수 제한용 세마포어. 클라이언트와 마찬가지로 이벤트 루프에 묶이므로 루프마다 따로 만듭니다.
+    (LLM_MAX_CONCURRENCY 는 루프당 한도이며, 서버는 루프 하나로 돌기 때문에 사실상 프로세스 한도입니다)
+    """
+    loop = asyncio.get_running_loop()
+    semaphore = _semaphores.get(loop)
+    if semaphore is None:
+        for closed_loop in [l for l in _semaphores if l.is_closed()]:
+            del _semaphores[closed_loop]  # asyncio.run 이 끝난 루프의 세마포어는 정리
+        semaphore = _semaphores[loop] = asyncio.Semaphore(LLM_MAX_CONCURRENCY)
+    return semaphore
+
+
+# ---------------------------------------------------------
+# 🔌 공유 클라이언트 (API 키당 하나의 keep-alive 커넥션 풀)
+# ---------------------------------------------------------
+async def get_client(api_key):
+    """
+    API 키별 AsyncOpenAI 클라이언트. 처음 쓰일 때 만들고 이후에는 재사용합니다.
+    커넥션은 이벤트 루프에 묶이므로, 배치 실행기처럼 asyncio.run 을 여러 번 하는 경우 루프마다 새로 만들고
+    이전 루프의 클라이언트는 닫습니다.
+    """
+    loop = asyncio.get_running_loop()
+    entry = _clients.get(api_key)
+    if entry is not None and entry[0] is loop:
+        return entry[1]
+
+    import httpx
+    import openai
+    http_client = httpx.AsyncClient(
+        http2=HTTP2_ENABLED,
+        limits=httpx.Limits(
+            max_connections=LLM_POOL_MAX_CONNECTIONS,
+            max_keepalive_connections=LLM_POOL_MAX_KEEPALIVE,
+            keepalive_expiry=LLM_KEEPALIVE_EXPIRY,
+        ),
+    )
+    client = openai.AsyncOpenAI(
+        api_key=api_key,
+        max_retries=0,  # 재시도는 아래 래퍼가 담당
+        timeout=httpx.Timeout(LLM_TIMEOUT, connect=LLM_CONNECT_TIMEOUT),
+        http_client=http_client,
+    )
+    _clients[api_key] = (loop, client)
+    if entry is not None:
+        await _close_replaced(*entry)
+    return client
+
+
+async def _close_replaced(old_loop, old_client):
+    # 이전 루프가 다른 스레드에서 아직 돌고 있으면 그 루프에서 닫고, 이미 끝났으면 여기서 닫습니다.
+    try:
+        if old_loop.is_running():
+            asyncio.run_coroutine_threadsafe(old_client.close(), old_loop)
+        else:
+            await old_client.close()
+    except Exception as e:
+        # 이미 닫힌 루프의 소켓 정리 실패는 새 클라이언트 사용에 영향이 없으므로 기록만 합니다.
+        print(f"⚠️ [LLM] 이전 이벤트 루프의 클라이언트 정리 실패: {type(e).__name__}: {e}")
+
+
+async def close_clients():
+    """서버 종료 시 현재 루프의 커넥션 풀을 닫습니다."""
+    loop = asyncio.get_running_loop()
+    for api_key, (client_loop, client) in list(_clients.items()):
+        if client_loop is loop:
+            await client.close()
+            del _clients[api_key]
+
+
+async def create_chat_completion(api_key, stage="default", **kwargs):
+    """
+    chat.completions.create 공통 래퍼. 라우터는 API 키만 넘기고 클라이언트는 공유 풀을 씁니다.
+    - 세마포어로 동시 요청 수를 제한하고
+    - 요청마다 타임아웃을 걸고
+    - 일시적 오류는 지수 백오프(+지터)로 재시도합니다.
+    - 소요 시간(대기/재시도 포함)과 토큰 사용량을 llm.<stage> 단계로 기록합니다.
+    """
+    with metrics.timed(f"llm.{stage}"):
+        response = await _create_with_retry(await get_client(api_key), stage, kwargs)
+    metrics.record_tokens(stage, response.usage)
+    return response
+
+
+async def _create_with_retry(client, stage, kwargs):
+    attempt = 0
+    while True:
+        try:
+            async with _get_semaphore():
+                return await client.chat.completions.create(**kwargs)
+        except _retryable_errors() as e:
+            if attempt >= LLM_MAX_RETRIES:
+                raise
+            metrics.inc("finmate_llm_retries_total", stage=stage)
+            delay = LLM_BACKOFF_BASE * (2 ** attempt) * (1 + random.random())
+            attempt += 1
+            print(f"🔁 [LLM] {type(e).__name__} - {delay:.1f}s 후 재시도 ({attempt}/{LLM_MAX_RETRIES})")
+            await asyncio.sleep(delay)
+
+
+class AsyncRateLimiter:
+    """
+    분당 요청 수 제한 (토큰 버킷). 배치 작업이 OpenAI 쿼터를 한꺼번에 소진하지 않도록 사용합니다.
+    rate_per_minute <= 0 이면 제한하지 않습니다.
+    """
+
+    def __init__(self, rate_per_minute):
+        self._rate = rate_per_minute / 60.0
+        self._capacity = max(1.0, self._rate)  # 최대 1초 분량까지 몰아서 허용
+        self._tokens = self._capacity
+        self._updated = None
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        if self._rate <= 0:
+            return
+        loop = asyncio.get_running_loop()
+        async with self._lock:
+            while True:
+                now = loop.time()
+                if self._updated is not None:
+                    self._tokens = min(self._capacity, self._tokens + (now - self._updated) * self._rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self._rate)
+
+
+async def stream_chat_completion(api_key, stage="default", **kwargs):
+    """
+    스트리밍 버전 래퍼. 응답 텍스트 조각을 받는 대로 내보냅니다.
+    스트림이 끝날 때까지 세마포어 자리를 차지하며, 재시도는 첫 조각을 받기 전(연결 단계)에만 합니다.
+    첫 조각까지의 시간은 llm.<stage>.first_token, 세마포어 대기/연결/재시도부터 스트림 끝까지의 전체 시간은 llm.<stage> 단계로 기록합니다.
+    """
+    client = await get_client(api_key)
+    kwargs.setdefault("stream_options", {"include_usage": True})  # 마지막 조각에 usage 포함
+    kwargs["stream"] = True
+    attempt = 0
+    started = time.monotonic()
+    first_token = False
+    with metrics.timed(f"llm.{stage}"):
+        async with _get_semaphore():
+            while True:
+                try:
+                    stream = await client.chat.completions.create(**kwargs)
+                    break
+                except _retryable_errors() as e:
+                    if attempt >= LLM_MAX_RETRIES:
+                        raise
+                    metrics.inc("finmate_llm_retries_total", stage=stage)
+                    delay = LLM_BACKOFF_BASE * (2 ** attempt) * (1 + random.random())
+                    attempt += 1
+                    print(f"🔁 [LLM] {type(e).__name__} - {delay:.1f}s 후 재시도 ({attempt}/{LLM_MAX_RETRIES})")
+                    await asyncio.sleep(delay)
+
+            async with stream:
+                async for chunk in stream:
+                    if chunk.usage:
+                        metrics.record_tokens(stage, chunk.usage)
+                    if chunk.choices and chunk.choices[0].delta.content:
+                        if not first_token:
+                            first_token = True
+                            metrics.observe_stage(f"llm.{stage}.first_token", time.monotonic() - started)
+                        yield chunk.choices[0].delta.content
@@ -1,39 +1,61 @@
-import uvicorn
-import pymysql
-from fastapi import FastAPI
+import os
+import time
+import asyncio
+from fastapi import FastAPI, Request
+from fastapi.responses import PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
-from apscheduler.schedulers.background import BackgroundScheduler
-from routers import transactions, analysis, chat, clustering
-from database import DB_CONFIG 
+from routers import transactions, analyze, chat, clustering
+from database import get_pool, get_pool_stats, run_with_db
+import jobs
+import llm
+import metrics
+from category_cache import category_cache
+from category_model import category_model, CATEGORY_MODEL_REFRESH_SECONDS
+from chat_session import message_writer, session_cache
 
 # ---------------------------------------------------------
-# ⏰ 스케줄러 설정 (매월 1일 그룹 갱신)
+# ⏰ 스케줄러 설정 (매월 1일 그룹 갱신 → 그룹 평균 → 리포트 사전 생성, 주기적 신규 사용자 그룹 배정)
 # ---------------------------------------------------------
-def scheduled_task():
-    print(" [자동 실행] 월간 그룹 갱신을 시작합니다...")
-    conn = pymysql.connect(**DB_CONFIG)
-    try:
-        clustering.logic_clustering(conn)
-        print("✅ [자동 실행] 그룹 갱신 완료!")
-    except Exception as e:
-        print(f"❌ [자동 실행] 실패: {e}")
-    finally:
-        conn.close()
+# 인스턴스가 여러 개라면 ENABLE_SCHEDULER=false 로 끄고 별도 실행기(python jobs.py serve)를 띄우세요.
+# 켜 둔 경우에도 작업마다 DB 잠금을 잡으므로 같은 작업이 동시에 여러 번 돌지는 않습니다.
+ENABLE_SCHEDULER = os.getenv("ENABLE_SCHEDULER", "true").lower() in ("1", "true", "yes")
+
+async def _refresh_category_model():
+    # 로컬 분류 모델 로드 (sklearn import + 역직렬화). 끝나기 전까지는 캐시/LLM 분류만 사용합니다.
+    # 이후 CATEGORY_MODEL_REFRESH_SECONDS 마다 새로 활성화된 버전이 있는지 확인해 교체합니다. (요청 경로에서는 확인하지 않음)
+    while True:
+        try:
+            await run_with_db(category_model.refresh, force=True)
+        except Exception as e:
+            print(f"⚠️ 분류 모델 로드 건너뜀: {e}")
+        await asyncio.sleep(CATEGORY_MODEL_REFRESH_SECONDS)
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    # 서버 켜질 때
-    scheduler = BackgroundScheduler()
-    scheduler.add_job(scheduled_task, 'cron', day='1', hour='0', minute='0')
-    scheduler.start()
-    print("🚀 서버 가동: 스케줄러 ON")
+    # 서버 켜질 때 (콜드 스타트를 줄이기 위해 무거운 작업은 첫 요청을 막지 않도록 백그라운드로)
+    scheduler = None
+    if ENABLE_SCHEDULER:
+        from apscheduler.schedulers.background import BackgroundScheduler
+        scheduler = BackgroundScheduler()
+        jobs.add_scheduled_jobs(scheduler, asyncio.get_running_loop())
+        scheduler.start()
+    message_writer.start()
+    transactions.categorize_queue.start()  # 미분류 소비 내역 백그라운드 분류 워커
+    model_task = asyncio.create_task(_refresh_category_model())
+    print(f"🚀 서버 가동: 스케줄러 {'ON' if scheduler else 'OFF'}, 채팅 저장 스레드 ON, 분류 워커 ON")
     
     yield # 서버 작동 중...
     
     # 서버 꺼질 때
-    scheduler.shutdown()
-    print("💤 서버 종료: 스케줄러 OFF")
+    model_task.cancel()
+    if scheduler is not None:
+        scheduler.shutdown()
+    message_writer.stop()  # 아직 저장되지 않은 채팅 메시지 flush
+    await transactions.categorize_queue.stop()  # 남은 미분류 행은 다음 기동 시 DB 스윕이 다시 처리
+    await llm.close_clients()
+    get_pool().close_all()
+    print("💤 서버 종료: 스케줄러 OFF, 채팅 메시지 저장 완료, DB 커넥션 풀 정리")
 
 # ---------------------------------------------------------
 # 🚀 앱 초기화
@@ -64,12 +86,42 @@ app.add_middleware(
     allow_headers=["*"],        # 허용할 헤더 (전체)
 )
 
+# ---------------------------------------------------------
+# 📊 계측 (요청 시간 히스토그램 + 느린 요청 로그)
+# ---------------------------------------------------------
+@app.middleware("http")
+async def measure_request(request: Request, call_next):
+    trace, token = metrics.start_trace()
+    started = time.monotonic()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        # 스트리밍 응답은 헤더를 보낸 시점까지만 잽니다. (LLM 스트림 전체 시간은 llm.<stage> 단계로 기록)
+        elapsed = time.monotonic() - started
+        route = request.scope.get("route")
+        path = route.path if route is not None else "unmatched"  # 경로 파라미터로 라벨이 늘어나지 않게 라우트 템플릿 사용
+        metrics.observe("finmate_http_request_seconds", elapsed, method=request.method, route=path, status=status)
+        metrics.log_if_slow(request.method, request.url.path, status, elapsed, trace)
+        metrics.end_trace(token)
+
+metrics.register_collector("db_pool", get_pool_stats)
+metrics.register_collector("category_cache", category_cache.stats)
+metrics.register_collector("category_model", category_model.stats)
+metrics.register_collector("chat_session", session_cache.stats)
+metrics.register_collector("chat_writer", message_writer.stats)
+metrics.register_collector("categorize_queue", transactions.categorize_queue.stats)
+metrics.register_collector("report_cache", analyze.report_cache.stats)
+metrics.register_collector("report_flight", analyze.report_flight.stats)
+
 # ---------------------------------------------------------
 # 🔗 라우터 등록 (기능 연결)
 # ---------------------------------------------------------
 app.include_router(clustering.router)   # 관리자/그룹분석
 app.include_router(chat.router)         # 챗봇
-app.include_router(analysis.router)     # 리포트 분석
+app.include_router(analyze.router)      # 리포트 분석
 app.include_router(transactions.router) # 소비내역 관리
 
 
@@ -77,8 +129,20 @@ app.include_router(transactions.router) # 소비내역 관리
 # 👋 기본 접속 테스트
 # ---------------------------------------------------------
 @app.get("/")
-def read_root():
+async def read_root():
+    # 스레드풀을 거치지 않으므로 LLM/DB 작업이 몰려도 헬스체크는 바로 응답합니다.
     return {"message": "Hello FinMate! 프론트엔드와 연결할 준비가 되었습니다."}
 
+@app.get("/health/db")
+def db_pool_health():
+    # DB 커넥션 풀 상태 (대여 중/대기 중 연결 수, 대기 시간 초과 횟수 등)
+    return get_pool_stats()
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics_endpoint():
+    # Prometheus 텍스트 포맷 (단계별 지연 시간, 토큰 사용량, 에러, 캐시 적중률, 풀 상태)
+    return metrics.render()
+
 if __name__ == "__main__":
+    import uvicorn
     uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True)
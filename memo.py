@@ -0,0 +1,68 @@
+"""
+프로세스 내 캐시 유틸리티.
+
+- TTLCache: 만료 시간이 있는 LRU 캐시 (스레드 안전)
+- SingleFlight: 같은 키로 동시에 들어온 비동기 작업을 하나로 합쳐 결과를 공유
+"""
+import time
+import asyncio
+import threading
+from collections import OrderedDict
+
+
+class TTLCache:
+    def __init__(self, max_size, ttl):
+        self._max_size = max_size
+        self._ttl = ttl
+        self._items = OrderedDict()  # key -> (value, 만료 시각)
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0}
+
+    def get(self, key):
+        with self._lock:
+            item = self._items.get(key)
+            if item is None or item[1] < time.monotonic():
+                if item is not None:
+                    del self._items[key]
+                self._stats["misses"] += 1
+                return None
+            self._items.move_to_end(key)
+            self._stats["hits"] += 1
+            return item[0]
+
+    def set(self, key, value):
+        with self._lock:
+            self._items[key] = (value, time.monotonic() + self._ttl)
+            self._items.move_to_end(key)
+            while len(self._items) > self._max_size:
+                self._items.popitem(last=False)
+                self._stats["evictions"] += 1
+
+    def stats(self):
+        with self._lock:
+            return {**self._stats, "size": len(self._items), "max_size": self._max_size}
+
+
+class SingleFlight:
+    """
+    같은 key 의 작업이 진행 중이면 새로 시작하지 않고 그 결과를 함께 기다립니다.
+    작업은 별도 Task 로 돌기 때문에 먼저 요청한 쪽이 끊겨도(취소) 나머지 대기자에게는 영향이 없습니다.
+    """
+
+    def __init__(self):
+        self._inflight = {}
+        self._stats = {"started": 0, "joined": 0}
+
+    async def do(self, key, factory):
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.get_running_loop().create_task(factory())
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+            self._stats["started"] += 1
+        else:
+            self._stats["joined"] += 1
+        return await asyncio.shield(task)
+
+    def stats(self):
+        return {**self._stats, "inflight": len(self._inflight)}
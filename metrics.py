@@ -0,0 +1,199 @@
+"""
+단계별 지연 시간/토큰/에러 계측 + Prometheus 텍스트 출력.
+
+- timed("llm.report") / @instrument() 로 감싼 구간은 finmate_stage_seconds 히스토그램에 쌓이고,
+  예외가 나면 finmate_stage_errors_total 에 단계/예외 타입별로 집계됩니다.
+- OpenAI 응답의 usage 는 finmate_llm_tokens_total 에 단계별로 더합니다.
+- 캐시/풀처럼 이미 stats() 를 가진 컴포넌트는 register_collector 로 등록하면 /metrics 출력 시점에 읽어 갑니다.
+- 요청 하나 안에서 지나간 단계들은 trace 에 모아 두었다가, 느린 요청(SLOW_REQUEST_SECONDS 초과)일 때 함께 출력합니다.
+
+외부 의존성(prometheus_client) 없이 텍스트 포맷만 직접 만듭니다.
+"""
+import os
+import time
+import functools
+import threading
+import contextvars
+from contextlib import contextmanager
+
+import env  # noqa: F401  (.env 로드)
+
+SLOW_REQUEST_SECONDS = float(os.getenv("SLOW_REQUEST_SECONDS", "0"))  # 이 시간(초)을 넘는 요청은 단계별 시간과 함께 로그 (0: 끔)
+
+# 히스토그램 버킷 상한(초). DB 단계(ms 단위)와 LLM 단계(수 초)를 모두 구분할 수 있게 넓게 잡습니다.
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+_lock = threading.Lock()
+_counters = {}      # (이름, 라벨 튜플) -> 값
+_histograms = {}    # (이름, 라벨 튜플) -> [버킷별 개수..., 합계, 개수]
+_collectors = {}    # 컴포넌트 이름 -> stats() 함수
+
+_HELP = {
+    "finmate_stage_seconds": ("histogram", "단계별 소요 시간(초)"),
+    "finmate_stage_errors_total": ("counter", "단계별 예외 발생 수"),
+    "finmate_http_request_seconds": ("histogram", "HTTP 요청 처리 시간(초, 응답 헤더까지)"),
+    "finmate_llm_tokens_total": ("counter", "OpenAI 응답 usage 기준 토큰 수"),
+    "finmate_llm_retries_total": ("counter", "OpenAI 요청 재시도 수"),
+}
+
+_trace = contextvars.ContextVar("finmate_trace", default=None)
+
+
+def _key(name, labels):
+    return name, tuple(sorted(labels.items()))
+
+
+# ---------------------------------------------------------
+# 📈 기록
+# ---------------------------------------------------------
+def inc(name, value=1, **labels):
+    key = _key(name, labels)
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + value
+
+
+def observe(name, seconds, **labels):
+    key = _key(name, labels)
+    with _lock:
+        hist = _histograms.get(key)
+        if hist is None:
+            hist = _histograms[key] = [0] * (len(BUCKETS) + 2)
+        for i, bound in enumerate(BUCKETS):
+            if seconds <= bound:
+                hist[i] += 1
+        hist[-2] += seconds
+        hist[-1] += 1
+
+
+def observe_stage(stage, seconds, error=None):
+    observe("finmate_stage_seconds", seconds, stage=stage)
+    if error is not None:
+        inc("finmate_stage_errors_total", stage=stage, error=error)
+    trace = _trace.get()
+    if trace is not None:
+        trace.append((stage, seconds))
+
+
+@contextmanager
+def timed(stage):
+    """
+    with timed("sql.get_group_averages"): ... - 소요 시간과 예외를 단계 이름으로 기록.
+    취소/스트림 중단(asyncio.CancelledError, GeneratorExit 등 BaseException)은 시간만 기록하고 에러로 세지 않습니다.
+    """
+    started = time.monotonic()
+    try:
+        yield
+    except Exception as e:
+        observe_stage(stage, time.monotonic() - started, type(e).__name__)
+        raise
+    except BaseException:
+        observe_stage(stage, time.monotonic() - started)
+        raise
+    observe_stage(stage, time.monotonic() - started)
+
+
+def instrument(stage=None):
+    """동기 함수용 데코레이터. 단계 이름을 주지 않으면 'sql.<함수명>'"""
+    def decorator(fn):
+        name = stage or f"sql.{fn.__name__}"
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with timed(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def record_tokens(stage, usage):
+    if usage is None:
+        return
+    inc("finmate_llm_tokens_total", usage.prompt_tokens or 0, stage=stage, kind="prompt")
+    inc("finmate_llm_tokens_total", usage.completion_tokens or 0, stage=stage, kind="completion")
+
+
+def register_collector(component, stats_fn):
+    """stats() 가 돌려주는 숫자 값들을 finmate_<component>_<key> 게이지로 노출합니다."""
+    _collectors[component] = stats_fn
+
+
+# ---------------------------------------------------------
+# 🐢 요청 단위 trace (느린 요청 로그용)
+# ---------------------------------------------------------
+def start_trace():
+    """현재 요청의 단계 기록을 시작합니다. 스레드풀로 넘어간 DB 작업도 같은 리스트에 쌓입니다."""
+    trace = []
+    return trace, _trace.set(trace)
+
+
+def end_trace(token):
+    _trace.reset(token)
+
+
+def log_if_slow(method, path, status, seconds, trace):
+    if not SLOW_REQUEST_SECONDS or seconds < SLOW_REQUEST_SECONDS:
+        return
+    stages = ", ".join(f"{stage}={elapsed * 1000:.0f}ms" for stage, elapsed in trace) or "-"
+    print(f"🐢 [느린 요청] {method} {path} {status} {seconds * 1000:.0f}ms | {stages}")
+
+
+# ---------------------------------------------------------
+# 🧾 Prometheus 텍스트 포맷
+# ---------------------------------------------------------
+def _labels(pairs, extra=None):
+    pairs = list(pairs) + ([extra] if extra else [])
+    if not pairs:
+        return ""
+    escaped = (f'{k}="{str(v).replace(chr(92), chr(92) * 2).replace(chr(34), chr(92) + chr(34))}"' for k, v in pairs)
+    return "{" + ",".join(escaped) + "}"
+
+
+def _collector_lines():
+    lines = []
+    for component, stats_fn in sorted(_collectors.items()):
+        try:
+            stats = dict(stats_fn())
+        except Exception as e:
+            print(f"⚠️ [metrics] {component} 수집 실패: {e}")
+            continue
+        if "hit_rate" not in stats and "hits" in stats and "misses" in stats:
+            lookups = stats["hits"] + stats["misses"]
+            stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+        for key, value in sorted(stats.items()):
+            if isinstance(value, bool) or not isinstance(value, (int, float)):
+                continue
+            name = f"finmate_{component}_{key}"
+            lines.append(f"# TYPE {name} gauge")
+            lines.append(f"{name} {value}")
+    return lines
+
+
+def render():
+    with _lock:
+        counters = dict(_counters)
+        histograms = {key: list(hist) for key, hist in _histograms.items()}
+
+    lines = []
+    typed = set()
+
+    def header(name):
+        if name not in typed:
+            typed.add(name)
+            kind, text = _HELP.get(name, ("untyped", name))
+            lines.append(f"# HELP {name} {text}")
+            lines.append(f"# TYPE {name} {kind}")
+
+    for (name, labels), value in sorted(counters.items()):
+        header(name)
+        lines.append(f"{name}{_labels(labels)} {value}")
+
+    for (name, labels), hist in sorted(histograms.items()):
+        header(name)
+        for bound, count in zip(BUCKETS, hist):
+            lines.append(f"{name}_bucket{_labels(labels, ('le', bound))} {count}")
+        lines.append(f"{name}_bucket{_labels(labels, ('le', '+Inf'))} {hist[-1]}")
+        lines.append(f"{name}_sum{_labels(labels)} {hist[-2]}")
+        lines.append(f"{name}_count{_labels(labels)} {hist[-1]}")
+
+    lines.extend(_collector_lines())
+    return "\n".join(lines) + "\n"
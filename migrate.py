@@ -0,0 +1,76 @@
+"""
+스키마 마이그레이션 실행기.
+
+migrations/ 폴더의 NNNN_*.sql 파일을 번호 순서대로 한 번씩만 적용합니다.
+적용 이력은 schema_migrations 테이블에 남습니다.
+컨테이너는 gunicorn 을 띄우기 전에 이 스크립트를 실행하므로(Dockerfile CMD) 배포하면 새 마이그레이션이 함께 적용됩니다.
+여러 인스턴스가 동시에 떠도 MySQL advisory lock(GET_LOCK)으로 한 곳에서만 적용하고, 나머지는 끝날 때까지 기다립니다.
+
+    python migrate.py          # 미적용 마이그레이션 실행
+    python migrate.py --list   # 적용 현황만 출력
+"""
+import os
+import sys
+
+from database import db_connection
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "migrations")
+MIGRATE_LOCK = os.getenv("MIGRATE_LOCK", "finmate:migrate")
+MIGRATE_LOCK_WAIT = int(os.getenv("MIGRATE_LOCK_WAIT", "300"))  # 다른 인스턴스가 적용 중일 때 기다릴 시간(초)
+
+
+def _split_statements(sql_text):
+    lines = [line for line in sql_text.splitlines() if not line.strip().startswith("--")]
+    return [stmt.strip() for stmt in "\n".join(lines).split(";") if stmt.strip()]
+
+
+def list_migrations():
+    return sorted(f for f in os.listdir(MIGRATIONS_DIR) if f.endswith(".sql"))
+
+
+def applied_migrations(cursor):
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            name VARCHAR(191) NOT NULL PRIMARY KEY,
+            applied_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    cursor.execute("SELECT name FROM schema_migrations")
+    return {row['name'] for row in cursor.fetchall()}
+
+
+def migrate(conn):
+    with conn.cursor() as cursor:
+        cursor.execute("SELECT GET_LOCK(%s, %s) AS acquired", (MIGRATE_LOCK, MIGRATE_LOCK_WAIT))
+        if cursor.fetchone()['acquired'] != 1:
+            raise RuntimeError(f"다른 인스턴스의 마이그레이션이 {MIGRATE_LOCK_WAIT}초 안에 끝나지 않았습니다.")
+        try:
+            _apply_pending(conn, cursor)
+        finally:
+            cursor.execute("SELECT RELEASE_LOCK(%s)", (MIGRATE_LOCK,))
+    print("✅ [마이그레이션] 완료")
+
+
+def _apply_pending(conn, cursor):
+    # 잠금을 잡은 뒤에 적용 이력을 읽으므로, 기다리는 동안 다른 인스턴스가 적용한 파일은 건너뜁니다.
+    done = applied_migrations(cursor)
+    for name in list_migrations():
+        if name in done:
+            continue
+        print(f"🛠️ [마이그레이션] {name} 적용 중...")
+        with open(os.path.join(MIGRATIONS_DIR, name), encoding="utf-8") as f:
+            for stmt in _split_statements(f.read()):
+                cursor.execute(stmt)
+        cursor.execute("INSERT INTO schema_migrations (name) VALUES (%s)", (name,))
+        conn.commit()
+
+
+if __name__ == "__main__":
+    with db_connection() as conn:
+        if "--list" in sys.argv:
+            with conn.cursor() as cursor:
+                done = applied_migrations(cursor)
+            for name in list_migrations():
+                print(f"{'[x]' if name in done else '[ ]'} {name}")
+        else:
+            migrate(conn)
@@ -0,0 +1,10 @@
+-- 소비처(정규화된 가맹점명) -> 카테고리 분류 캐시
+-- 인스턴스 재시작/스케일아웃 후에도 LLM 분류 결과를 공유하기 위한 테이블
+CREATE TABLE IF NOT EXISTS category_cache (
+    merchant_key VARCHAR(191) NOT NULL,
+    category     VARCHAR(50)  NOT NULL,
+    hits         INT          NOT NULL DEFAULT 0,
+    created_at   DATETIME     NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    updated_at   DATETIME     NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    PRIMARY KEY (merchant_key)
+) DEFAULT CHARSET = utf8mb4;
@@ -0,0 +1,11 @@
+-- 사용자/월/카테고리별 지출 합계 롤업 (WITHDRAW 만 집계)
+-- 소비 내역 INSERT 와 같은 트랜잭션에서 증분 갱신되며, python rollup.py rebuild 로 재계산할 수 있습니다.
+CREATE TABLE IF NOT EXISTS monthly_category_totals (
+    user_id      INT           NOT NULL,
+    month        CHAR(7)       NOT NULL,  -- 'YYYY-MM'
+    category     VARCHAR(50)   NOT NULL,
+    total_amount DECIMAL(15,2) NOT NULL DEFAULT 0,
+    txn_count    INT           NOT NULL DEFAULT 0,
+    updated_at   DATETIME      NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    PRIMARY KEY (user_id, month, category)
+) DEFAULT CHARSET = utf8mb4;
@@ -0,0 +1,6 @@
+-- 월별 조회를 반열린 날짜 구간으로 바꾸면서 추가하는 인덱스
+-- (user_id, type, transacted_at): 사용자별/월별 지출 조회, 그룹 평균 계산의 transactions 접근
+-- (cluster_id): 그룹 평균 계산 시 같은 그룹 사용자 찾기
+-- 확인: python spending.py explain
+CREATE INDEX idx_transactions_user_type_time ON transactions (user_id, type, transacted_at);
+CREATE INDEX idx_users_cluster ON users (cluster_id);
@@ -0,0 +1,12 @@
+-- 그룹(클러스터)별 월간 카테고리 평균. 매월 1일 스케줄러가 지난달 분을 계산해 둡니다.
+-- avg_per_user: 그룹 인원 1인당 평균 지출, avg_per_txn: 건당 평균 지출
+CREATE TABLE IF NOT EXISTS cluster_month_averages (
+    cluster_id   INT           NOT NULL,
+    month        CHAR(7)       NOT NULL,  -- 'YYYY-MM'
+    category     VARCHAR(50)   NOT NULL,
+    avg_per_user DECIMAL(15,2) NOT NULL,
+    avg_per_txn  DECIMAL(15,2) NOT NULL,
+    member_count INT           NOT NULL,
+    updated_at   DATETIME      NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    PRIMARY KEY (cluster_id, month, category)
+) DEFAULT CHARSET = utf8mb4;
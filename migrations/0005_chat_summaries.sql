@@ -0,0 +1,7 @@
+-- 사용자별 이전 대화 롤링 요약. 토큰 예산 밖으로 밀려난 오래된 대화를 요약해 보관합니다.
+CREATE TABLE IF NOT EXISTS chat_summaries (
+    user_id    INT      NOT NULL,
+    summary    TEXT     NOT NULL,
+    updated_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    PRIMARY KEY (user_id)
+) DEFAULT CHARSET = utf8mb4;
@@ -0,0 +1,6 @@
+-- 사용자/월당 리포트는 하나만 저장되도록 보장합니다.
+-- 기존 중복 행은 가장 먼저 저장된 것(id 최소)만 남기고 정리합니다.
+DELETE a FROM analysis_reports a
+JOIN analysis_reports b
+  ON a.user_id = b.user_id AND a.report_month = b.report_month AND a.id > b.id;
+ALTER TABLE analysis_reports ADD UNIQUE KEY uq_analysis_reports_user_month (user_id, report_month);
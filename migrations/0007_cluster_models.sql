@@ -0,0 +1,12 @@
+-- 월간 클러스터링 결과 모델 (특징 표준화 값 + 중심점). 다음 월간 실행 전까지
+-- 새 사용자를 재학습 없이 가장 가까운 그룹에 배정하는 데 사용합니다.
+-- centroids 는 cluster_id 1, 2, ... 순서의 JSON 배열입니다.
+CREATE TABLE IF NOT EXISTS cluster_models (
+    id           INT         NOT NULL AUTO_INCREMENT,
+    months       VARCHAR(64) NOT NULL,  -- 'YYYY-MM,YYYY-MM,...'
+    scaler_mean  TEXT        NOT NULL,
+    scaler_scale TEXT        NOT NULL,
+    centroids    MEDIUMTEXT  NOT NULL,
+    created_at   DATETIME    NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (id)
+) DEFAULT CHARSET = utf8mb4;
@@ -0,0 +1,14 @@
+-- 배치 작업 실행 이력 (jobs.py). 작업마다 실행 시간과 처리 행 수를 남깁니다.
+CREATE TABLE IF NOT EXISTS job_runs (
+    id               INT          NOT NULL AUTO_INCREMENT,
+    job_name         VARCHAR(64)  NOT NULL,
+    status           VARCHAR(16)  NOT NULL,  -- running / success / failed
+    host             VARCHAR(128) NOT NULL,
+    started_at       DATETIME     NOT NULL,
+    finished_at      DATETIME     NULL,
+    duration_seconds DOUBLE       NULL,
+    row_count        INT          NULL,
+    detail           TEXT         NULL,      -- 결과 요약(JSON) 또는 에러 메시지
+    PRIMARY KEY (id),
+    KEY idx_job_runs_name_started (job_name, started_at)
+) DEFAULT CHARSET = utf8mb4;
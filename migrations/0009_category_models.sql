@@ -0,0 +1,13 @@
+-- 로컬 카테고리 분류 모델 버전 (category_model.py). model 은 joblib 으로 직렬화한 sklearn 파이프라인.
+CREATE TABLE IF NOT EXISTS category_models (
+    id         INT        NOT NULL AUTO_INCREMENT,
+    metrics    TEXT       NOT NULL,  -- holdout 평가 결과 (JSON)
+    model      LONGBLOB   NOT NULL,
+    active     TINYINT(1) NOT NULL DEFAULT 0,
+    created_at DATETIME   NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (id)
+) DEFAULT CHARSET = utf8mb4;
+
+-- 카테고리를 누가 붙였는지 (cache / model / llm / fallback). 모델이 붙인 답은 다시 학습하지 않기 위함.
+-- NULL 은 이 컬럼이 생기기 전 행 (모두 LLM 분류 결과)
+ALTER TABLE transactions ADD COLUMN category_source VARCHAR(8) NULL;
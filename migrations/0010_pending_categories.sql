@@ -0,0 +1,3 @@
+-- 비동기 분류 대기 행 찾기용 (category_source = 'pending').
+-- 대기 행은 잠깐만 존재하므로 인덱스로 바로 좁혀지며, 분류 작업이 원본 테이블을 풀스캔하지 않습니다.
+CREATE INDEX idx_transactions_category_source ON transactions (category_source);
@@ -0,0 +1,6 @@
+-- 비동기 분류 대기 행을 큐에 넣은(또는 스윕이 가져간) 시각. 스윕은 이 시각이 오래된 대기 행만 가져가고
+-- 가져갈 때 갱신하므로, 여러 인스턴스가 방금 들어온 행이나 다른 인스턴스가 처리 중인 행을 중복으로 분류하지 않습니다.
+-- 새 행은 INSERT 시각으로 채워지며, 분류가 끝난 행에서는 의미가 없습니다.
+ALTER TABLE transactions ADD COLUMN category_queued_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP;
+DROP INDEX idx_transactions_category_source ON transactions;
+CREATE INDEX idx_transactions_pending ON transactions (category_source, category_queued_at);
@@ -0,0 +1,4 @@
+-- 사용자가 그룹에 (다시) 배정된 시각. 증분 배정은 이 시각 이후 롤업(monthly_category_totals.updated_at)이
+-- 바뀐 사용자, 즉 배정 뒤에 새로 소비한 사용자를 다시 배정합니다. 기존 배정은 지금 배정된 것으로 봅니다.
+ALTER TABLE users ADD COLUMN cluster_assigned_at DATETIME NULL;
+UPDATE users SET cluster_assigned_at = NOW() WHERE cluster_id IS NOT NULL;
@@ -0,0 +1,8 @@
+-- 롤링 요약에 반영된 마지막 chat_messages.id. 요약은 이 id 이후의 메시지를 DB 에서 읽어 갱신하므로
+-- 세션 만료/서버 재시작으로 메모리의 대기 목록을 잃어도 밀려난 대화가 요약에서 빠지지 않습니다.
+-- 기존 요약은 최근 대화 구간(CHAT_HISTORY_LIMIT 기본값 6개) 이전까지 반영된 것으로 봅니다.
+ALTER TABLE chat_summaries ADD COLUMN last_message_id BIGINT NOT NULL DEFAULT 0;
+UPDATE chat_summaries s
+SET last_message_id = COALESCE(
+    (SELECT m.id FROM chat_messages m WHERE m.user_id = s.user_id ORDER BY m.id DESC LIMIT 1 OFFSET 6), 0
+);
@@ -0,0 +1,76 @@
+"""
+프롬프트 토큰 계산/예산 관리.
+
+tiktoken 이 설치되어 있으면 모델 토크나이저로 정확히 세고, 없으면 보수적인 추정치를 씁니다.
+(한글 등 비 ASCII 문자는 1자 = 1토큰, ASCII 는 4자 = 1토큰)
+"""
+import os
+import math
+
+import env  # noqa: F401  (.env 로드)
+
+try:
+    import tiktoken
+except ImportError:  # 선택 의존성
+    tiktoken = None
+
+CHAT_PROMPT_TOKEN_BUDGET = int(os.getenv("CHAT_PROMPT_TOKEN_BUDGET", "3000"))  # 답변을 제외한 프롬프트 전체 예산
+CHAT_MAX_CATEGORIES = int(os.getenv("CHAT_MAX_CATEGORIES", "8"))              # 요약 데이터에 남길 최대 카테고리 수
+
+MESSAGE_OVERHEAD = 4  # 메시지 1개당 role/구분자 토큰
+
+_encoding = None
+
+
+def _get_encoding():
+    global _encoding
+    if _encoding is None and tiktoken is not None:
+        try:
+            _encoding = tiktoken.encoding_for_model("gpt-4o")
+        except Exception:
+            _encoding = tiktoken.get_encoding("o200k_base")
+    return _encoding
+
+
+def count_tokens(text):
+    if not text:
+        return 0
+    encoding = _get_encoding()
+    if encoding is not None:
+        return len(encoding.encode(text))
+    ascii_chars = sum(1 for ch in text if ord(ch) < 128)
+    return (len(text) - ascii_chars) + math.ceil(ascii_chars / 4)
+
+
+def message_tokens(message):
+    return count_tokens(message["content"]) + MESSAGE_OVERHEAD
+
+
+def compact_summary(data, max_categories=CHAT_MAX_CATEGORIES):
+    """
+    {"summary": {카테고리: 금액}, "total": N} 을 금액 큰 순으로 max_categories 개만 남기고
+    나머지는 '그 외' 로 합칩니다. (카테고리가 늘어나도 프롬프트 크기가 일정하도록)
+    """
+    items = sorted(data["summary"].items(), key=lambda kv: kv[1], reverse=True)
+    if len(items) <= max_categories:
+        return {"summary": dict(items), "total": data["total"]}
+    kept = dict(items[:max_categories - 1])
+    kept["그 외"] = sum(amount for _, amount in items[max_categories - 1:])
+    return {"summary": kept, "total": data["total"]}
+
+
+def fit_history(history, budget):
+    """
+    최근 메시지부터 예산 안에 들어가는 만큼 남깁니다.
+    (남길 메시지들, 예산 밖으로 밀려난 오래된 메시지들) 반환
+    """
+    kept = []
+    used = 0
+    for message in reversed(history):
+        tokens = message_tokens(message)
+        if used + tokens > budget:
+            break
+        kept.append(message)
+        used += tokens
+    kept.reverse()
+    return kept, history[:len(history) - len(kept)]
@@ -0,0 +1,84 @@
+"""
+월초 리포트 사전 생성 배치.
+
+매월 1일 클러스터링/그룹 평균 계산 직후 실행되어, 지난달 소비가 있는 사용자들의
+analysis_reports 를 미리 만들어 둡니다. 이미 리포트가 있는 사용자는 건너뛰므로
+중간에 끊겨도 다시 실행하면 이어서 진행합니다.
+
+    python report_batch.py
+"""
+import os
+import time
+import asyncio
+import datetime
+
+import llm
+from database import run_with_db
+from routers import analyze
+
+REPORT_BATCH_WORKERS = int(os.getenv("REPORT_BATCH_WORKERS", "8"))   # 동시에 생성하는 리포트 수
+REPORT_BATCH_RPM = int(os.getenv("REPORT_BATCH_RPM", "300"))         # 분당 최대 LLM 요청 수 (0: 제한 없음)
+REPORT_BATCH_LOG_EVERY = int(os.getenv("REPORT_BATCH_LOG_EVERY", "100"))
+
+
+def _pending_users(conn, report_month):
+    """지난달 소비 내역이 있는데 아직 리포트가 없는 사용자 목록"""
+    sql = """
+        SELECT DISTINCT r.user_id
+        FROM monthly_category_totals r
+        LEFT JOIN analysis_reports a ON a.user_id = r.user_id AND a.report_month = %s
+        WHERE r.month = %s AND a.user_id IS NULL
+        ORDER BY r.user_id
+    """
+    with conn.cursor() as cursor:
+        cursor.execute(sql, (report_month, report_month))
+        return [row['user_id'] for row in cursor.fetchall()]
+
+
+async def run_report_batch(today=None, workers=REPORT_BATCH_WORKERS, rpm=REPORT_BATCH_RPM):
+    today = today or datetime.date.today()
+    report_month = (today.replace(day=1) - datetime.timedelta(days=1)).strftime("%Y-%m")
+    user_ids = await run_with_db(_pending_users, report_month)
+    total = len(user_ids)
+    print(f"📝 [리포트 배치] {report_month} 대상 {total}명 (workers={workers}, rpm={rpm})")
+
+    queue = asyncio.Queue()
+    for user_id in user_ids:
+        queue.put_nowait(user_id)
+
+    limiter = llm.AsyncRateLimiter(rpm)
+    stats = {"created": 0, "cached": 0, "failed": 0, "pending": 0}
+    started = time.monotonic()
+
+    def log_progress():
+        done = sum(stats.values())
+        elapsed = time.monotonic() - started
+        rate = done / elapsed if elapsed else 0.0
+        print(f"  ... {done}/{total} 완료 ({rate:.1f}명/s) {stats}")
+
+    async def worker():
+        while True:
+            try:
+                user_id = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            await limiter.acquire()
+            try:
+                result = await analyze.build_monthly_report(user_id, today)
+                stats[result["status"]] += 1
+            except Exception as e:
+                stats["failed"] += 1
+                print(f"❌ [리포트 배치] user {user_id} 실패: {e}")
+            if sum(stats.values()) % REPORT_BATCH_LOG_EVERY == 0:
+                log_progress()
+
+    await asyncio.gather(*(worker() for _ in range(max(1, min(workers, total)))))
+
+    elapsed = time.monotonic() - started
+    log_progress()
+    print(f"✅ [리포트 배치] {report_month} 완료 - {elapsed:.1f}s")
+    return {"report_month": report_month, "total": total, "elapsed_seconds": round(elapsed, 1), **stats}
+
+
+if __name__ == "__main__":
+    asyncio.run(run_report_batch())
@@ -0,0 +1,118 @@
+"""
+월간 리포트용 팩트 계산 + 템플릿 문장.
+
+총액/증감률/카테고리별 증감/그룹 평균 대비 차이는 LLM 에 맡기지 않고 여기서 카테고리 축으로 한 번에 계산합니다.
+- AI 리포트: 계산된 팩트를 짧은 표(fact_table_text)로 만들어 프롬프트에 넣고, 문장만 LLM 이 씁니다.
+- 빠른 리포트(mode=fast) / AI 실패 시: render_sections 의 템플릿 문장으로 LLM 없이 만듭니다.
+"""
+
+
+def _amount(value):
+    return f"{int(round(value)):,}원"
+
+
+def _pct(value):
+    return "-" if value is None else f"{value:+.1f}%"
+
+
+def compute_facts(prev_data, curr_data, group_data):
+    """
+    prev_data / curr_data / group_data: {"summary": {카테고리: 금액}, "total": N}
+    group_data 는 그룹 1인당 월 지출이어야 내 월 합계와 비교가 맞습니다. (spending.get_group_averages)
+    카테고리는 저번 달 금액이 큰 순. 비교 대상이 0 이면 증감률은 None.
+    """
+    import numpy as np  # 리포트 경로에서만 사용 (콜드 스타트 시 import 비용 회피)
+
+    prev, curr, group = prev_data["summary"], curr_data["summary"], group_data["summary"]
+    categories = sorted(set(prev) | set(curr) | set(group), key=lambda k: -float(curr.get(k, 0)))
+
+    prev_v = np.array([float(prev.get(k, 0)) for k in categories])
+    curr_v = np.array([float(curr.get(k, 0)) for k in categories])
+    group_v = np.array([float(group.get(k, 0)) for k in categories])
+    has_group = np.array([k in group for k in categories], dtype=bool)
+
+    delta = curr_v - prev_v
+    with np.errstate(divide="ignore", invalid="ignore"):
+        pct = np.where(prev_v > 0, delta / prev_v * 100, np.nan)
+        group_diff = np.where(has_group, curr_v - group_v, np.nan)
+        group_pct = np.where(has_group & (group_v > 0), (curr_v - group_v) / group_v * 100, np.nan)
+
+    def _opt(value):
+        return None if np.isnan(value) else round(float(value), 1)
+
+    prev_total, curr_total = float(prev_data["total"]), float(curr_data["total"])
+    return {
+        "total": {
+            "prev": prev_total,
+            "curr": curr_total,
+            "delta": curr_total - prev_total,
+            "pct": round((curr_total - prev_total) / prev_total * 100, 1) if prev_total else None,
+        },
+        "has_group": bool(has_group.any()),
+        "categories": [
+            {
+                "category": categories[i],
+                "prev": float(prev_v[i]), "curr": float(curr_v[i]), "delta": float(delta[i]), "pct": _opt(pct[i]),
+                "group": float(group_v[i]) if has_group[i] else None,
+                "group_diff": _opt(group_diff[i]), "group_pct": _opt(group_pct[i]),
+            }
+            for i in range(len(categories))
+        ],
+    }
+
+
+def fact_table_text(facts, m1_month, m2_month):
+    """프롬프트용 팩트 표 (JSON 보다 토큰이 적음)"""
+    total = facts["total"]
+    lines = [
+        f"[전체] {m2_month}월 {_amount(total['prev'])} -> {m1_month}월 {_amount(total['curr'])} "
+        f"(증감 {total['delta']:+,.0f}원, {_pct(total['pct'])})",
+        f"카테고리|{m2_month}월|{m1_month}월|증감|증감률|그룹평균|그룹대비",
+    ]
+    for row in facts["categories"]:
+        group = "-" if row["group"] is None else f"{row['group']:,.0f}"
+        group_diff = "-" if row["group_diff"] is None else f"{row['group_diff']:+,.0f}"
+        pct = "신규" if row["pct"] is None and row["curr"] > 0 else _pct(row["pct"])
+        lines.append(f"{row['category']}|{row['prev']:,.0f}|{row['curr']:,.0f}|{row['delta']:+,.0f}|{pct}|{group}|{group_diff}")
+    return "\n".join(lines)
+
+
+def cluster_sentence(range_text):
+    return f"당신은 소비구간 {range_text} 구간에 속해 있습니다."
+
+
+def render_sections(facts, range_text, m1_month, m2_month, top=3):
+    """LLM 없이 세 섹션을 템플릿으로 만듭니다. (generate_ai_report 와 같은 키)"""
+    total = facts["total"]
+    if not total["prev"]:
+        past = f"{m2_month}월 소비 내역이 없어 비교할 수 없습니다. {m1_month}월 전체 소비는 {_amount(total['curr'])}입니다."
+    else:
+        direction = "증가" if total["delta"] >= 0 else "감소"
+        past = f"전체 소비는 {_amount(abs(total['delta']))}({_pct(total['pct'])}) {direction}했습니다."
+        changes = sorted((r for r in facts["categories"] if r["delta"]), key=lambda r: -abs(r["delta"]))[:top]
+        phrases = [
+            f"{r['category']} 신규 {_amount(r['curr'])}" if r["prev"] == 0
+            else f"{r['category']} {r['delta']:+,.0f}원({_pct(r['pct'])})"
+            for r in changes
+        ]
+        if phrases:
+            past += " 변화가 큰 카테고리는 " + ", ".join(phrases) + "입니다."
+
+    if not facts["has_group"]:
+        group_text = "그룹 평균 데이터가 없어 비교할 수 없습니다."
+    else:
+        compared = [r for r in facts["categories"] if r["group_diff"] is not None]
+        more = sorted((r for r in compared if r["group_diff"] > 0), key=lambda r: -r["group_diff"])[:top]
+        less = sorted((r for r in compared if r["group_diff"] < 0), key=lambda r: r["group_diff"])[:top]
+        parts = []
+        if more:
+            parts.append(", ".join(f"{r['category']}(+{r['group_diff']:,.0f}원)" for r in more) + "에 더 많이 썼")
+        if less:
+            parts.append(", ".join(f"{r['category']}({r['group_diff']:,.0f}원)" for r in less) + "에는 덜 썼")
+        group_text = ("그룹 평균보다 " + "고, ".join(parts) + "습니다.") if parts else "그룹 평균과 비슷하게 소비했습니다."
+
+    return {
+        "section_past_comparison": past,
+        "section_cluster_info": cluster_sentence(range_text),
+        "section_group_comparison": group_text,
+    }
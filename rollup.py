@@ -0,0 +1,147 @@
+"""
+월별 카테고리 지출 롤업 (monthly_category_totals).
+
+transactions 원본을 매번 GROUP BY 하지 않도록, 소비 내역을 저장하는 트랜잭션 안에서
+(user_id, month, category) 합계/건수를 함께 올려둡니다. 조회는 spending 모듈에서 합니다.
+
+    python rollup.py rebuild              # 전체 재계산
+    python rollup.py rebuild --user 42    # 특정 사용자만 재계산
+    python rollup.py cluster-averages [YYYY-MM]   # 그룹 월평균 재계산 (기본: 지난달)
+"""
+import sys
+import datetime
+from collections import defaultdict
+
+from database import db_connection
+
+# 비동기 분류(categorize_queue)가 끝나기 전 소비 금액이 잠시 들어가는 카테고리
+PENDING_CATEGORY = "미분류"
+
+UPSERT_SQL = """
+    INSERT INTO monthly_category_totals (user_id, month, category, total_amount, txn_count)
+    VALUES (%s, %s, %s, %s, %s)
+    ON DUPLICATE KEY UPDATE
+        total_amount = total_amount + VALUES(total_amount),
+        txn_count = txn_count + VALUES(txn_count)
+"""
+
+
+def apply_transactions(cursor, rows):
+    """
+    새로 INSERT 한 WITHDRAW 내역을 롤업에 반영합니다. commit 은 호출한 쪽에서 함께 합니다.
+    rows: [(user_id, amount, category, transacted_at 'YYYY-MM-DD ...'), ...]
+    """
+    totals = defaultdict(lambda: [0, 0])
+    for user_id, amount, category, transacted_at in rows:
+        bucket = totals[(user_id, str(transacted_at)[:7], category)]
+        bucket[0] += amount
+        bucket[1] += 1
+    if totals:
+        cursor.executemany(UPSERT_SQL, [(*key, amount, count) for key, (amount, count) in totals.items()])
+
+
+def move_transactions(cursor, rows):
+    """
+    카테고리가 바뀐 내역(예: 미분류 -> 분류 완료)의 금액/건수를 롤업에서 옮기고, 비게 된 행은 지웁니다.
+    rows: [(user_id, amount, old_category, new_category, transacted_at), ...]
+    """
+    totals = defaultdict(lambda: [0, 0])
+    for user_id, amount, old_category, new_category, transacted_at in rows:
+        month = str(transacted_at)[:7]
+        for category, sign in ((old_category, -1), (new_category, 1)):
+            bucket = totals[(user_id, month, category)]
+            bucket[0] += sign * amount
+            bucket[1] += sign
+    if totals:
+        cursor.executemany(UPSERT_SQL, [(*key, amount, count) for key, (amount, count) in totals.items()])
+        emptied = [key for key, (_, count) in totals.items() if count < 0]
+        cursor.executemany(
+            "DELETE FROM monthly_category_totals WHERE user_id = %s AND month = %s AND category = %s AND txn_count <= 0",
+            emptied
+        )
+
+
+REBUILD_USER_SQL = """
+    INSERT INTO monthly_category_totals (user_id, month, category, total_amount, txn_count)
+    SELECT user_id, DATE_FORMAT(transacted_at, '%%Y-%%m'), category, SUM(amount), COUNT(*)
+    FROM transactions
+    WHERE user_id = %s AND type = 'WITHDRAW'
+    GROUP BY user_id, DATE_FORMAT(transacted_at, '%%Y-%%m'), category
+"""
+
+
+def rebuild_user(cursor, user_id):
+    cursor.execute("DELETE FROM monthly_category_totals WHERE user_id = %s", (user_id,))
+    cursor.execute(REBUILD_USER_SQL, (user_id,))
+
+
+def rebuild(conn, user_id=None):
+    """원본 transactions 로부터 롤업을 다시 계산합니다. 사용자 단위로 나눠 커밋합니다."""
+    with conn.cursor() as cursor:
+        if user_id is not None:
+            user_ids = [user_id]
+        else:
+            cursor.execute("SELECT DISTINCT user_id FROM transactions")
+            user_ids = [row['user_id'] for row in cursor.fetchall()]
+
+        for i, uid in enumerate(user_ids, start=1):
+            rebuild_user(cursor, uid)
+            conn.commit()
+            if i % 1000 == 0:
+                print(f"  ... {i}/{len(user_ids)}명 재계산")
+    print(f"✅ [롤업] {len(user_ids)}명 재계산 완료")
+
+
+# ---------------------------------------------------------
+# 👥 그룹(클러스터)별 월평균 (cluster_month_averages)
+# ---------------------------------------------------------
+def previous_month_key(today=None):
+    today = today or datetime.date.today()
+    return (today.replace(day=1) - datetime.timedelta(days=1)).strftime("%Y-%m")
+
+
+def rebuild_cluster_averages(conn, month):
+    """
+    해당 월('YYYY-MM')의 그룹별 카테고리 평균을 롤업 테이블에서 계산해 통째로 교체합니다.
+    클러스터링 직후에 돌려야 최신 그룹 배정이 반영됩니다.
+    아직 분류되지 않은 '미분류' 금액은 사용자마다 잠깐 머무는 값이라 그룹 평균에서는 뺍니다.
+    """
+    with conn.cursor() as cursor:
+        cursor.execute("DELETE FROM cluster_month_averages WHERE month = %s", (month,))
+        sql = """
+            INSERT INTO cluster_month_averages
+                (cluster_id, month, category, avg_per_user, avg_per_txn, member_count)
+            SELECT u.cluster_id, r.month, r.category,
+                   SUM(r.total_amount) / c.members,
+                   SUM(r.total_amount) / SUM(r.txn_count),
+                   c.members
+            FROM monthly_category_totals r
+            JOIN users u ON u.id = r.user_id
+            JOIN (
+                SELECT cluster_id, COUNT(*) AS members
+                FROM users WHERE cluster_id IS NOT NULL
+                GROUP BY cluster_id
+            ) c ON c.cluster_id = u.cluster_id
+            WHERE r.month = %s AND r.category <> %s
+            GROUP BY u.cluster_id, r.month, r.category, c.members
+        """
+        cursor.execute(sql, (month, PENDING_CATEGORY))
+        inserted = cursor.rowcount
+    conn.commit()
+    print(f"✅ [그룹 평균] {month} {inserted}행 갱신")
+    return inserted
+
+
+if __name__ == "__main__":
+    command = sys.argv[1] if len(sys.argv) > 1 else None
+    if command == "rebuild":
+        target = int(sys.argv[sys.argv.index("--user") + 1]) if "--user" in sys.argv else None
+        with db_connection() as conn:
+            rebuild(conn, target)
+    elif command == "cluster-averages":
+        month = sys.argv[2] if len(sys.argv) > 2 else previous_month_key()
+        with db_connection() as conn:
+            rebuild_cluster_averages(conn, month)
+    else:
+        print(__doc__)
+        sys.exit(1)
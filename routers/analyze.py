@@ -1,126 +1,92 @@
 import os
 import json
 import datetime
-from fastapi import APIRouter, Depends, HTTPException
-from openai import OpenAI
-from database import get_db
+from fastapi import APIRouter, HTTPException
+import llm
+import metrics
+import report_facts
+from database import run_with_db
+from spending import get_monthly_summaries, get_group_averages, get_user_cluster_info
 from schemas import UserRequest
-from dotenv import load_dotenv
+from memo import TTLCache, SingleFlight
+from rollup import PENDING_CATEGORY
 
-load_dotenv()
 
 router = APIRouter(prefix="/api/analysis", tags=["Analysis"])
 
 ANALYZE_API_KEY = os.getenv("ANALYZE_API_KEY")
-client = OpenAI(api_key=ANALYZE_API_KEY)
 MODEL_NAME = "gpt-4o"
 
-def get_monthly_summary(cursor, user_id, year, month):
-    sql = """
-        SELECT category, SUM(amount) as total_amount
-        FROM transactions
-        WHERE user_id = %s AND transacted_at LIKE %s AND type = 'WITHDRAW'
-        GROUP BY category
-    """
-    month_str = f"{year}-{month:02d}%"
-    cursor.execute(sql, (user_id, month_str))
-    result = cursor.fetchall()
-    summary = {row['category']: int(row['total_amount']) for row in result}
-    return {"summary": summary, "total": sum(summary.values())}
-
-def get_group_averages(cursor, user_id, year, month):
-    # 1. 내 cluster_id 찾기
-    cursor.execute("SELECT cluster_id FROM users WHERE id = %s", (user_id,))
-    user = cursor.fetchone()
-    if not user or not user['cluster_id']: return {"summary": {}, "total": 0}
-    
-    # 2. 그룹 평균 계산
-    sql = """
-        SELECT t.category, AVG(t.amount) as avg_amount
-        FROM transactions t
-        JOIN users u ON t.user_id = u.id
-        WHERE u.cluster_id = %s AND t.transacted_at LIKE %s AND t.type = 'WITHDRAW'
-        GROUP BY t.category
-    """
-    month_str = f"{year}-{month:02d}%"
-    cursor.execute(sql, (user['cluster_id'], month_str))
-    result = cursor.fetchall()
-    summary = {row['category']: int(row['avg_amount']) for row in result}
-    return {"summary": summary, "total": sum(summary.values())}
-
-def get_user_cluster_info(cursor, user_id):
-    sql = """
-        SELECT c.min_amount, c.max_amount
-        FROM users u JOIN clusters c ON u.cluster_id = c.id
-        WHERE u.id = %s
-    """
-    cursor.execute(sql, (user_id,))
-    return cursor.fetchone()
+# 리포트는 한 달 동안 바뀌지 않으므로 메모리에 두고, 동시에 같은 리포트를 요청하면 생성은 한 번만 합니다.
+report_cache = TTLCache(
+    max_size=int(os.getenv("REPORT_CACHE_SIZE", "10000")),
+    ttl=float(os.getenv("REPORT_CACHE_TTL", "3600")),
+)
+report_flight = SingleFlight()
 
 # =========================================================
 #  [AI] 분석 로직
 # =========================================================
 
-def generate_ai_report(m2_data, m1_data, group_data, cluster_info, range_text):
+async def generate_ai_report(facts, m1_month, m2_month):
+    """
+    숫자(합계/증감률/그룹 대비 차이)는 report_facts 에서 미리 계산해 표로 넘기고, LLM 은 문장만 씁니다.
+    section_cluster_info 는 고정 문장이라 요청하지 않습니다.
+    """
     prompt = f"""
     당신은 '금융 데이터 분석가'입니다. 조언은 하지 말고, 주어진 데이터를 분석하여 팩트만 서술하세요.
-    
-    [데이터 셋]
-    1. 저저번 달 내 소비: {json.dumps(m2_data, ensure_ascii=False)}
-    2. 저번 달 내 소비: {json.dumps(m1_data, ensure_ascii=False)}
-    3. 저번 달 그룹 평균: {json.dumps(group_data, ensure_ascii=False)}
-    4. 내 소비구간: {range_text}
+    아래 표의 숫자는 이미 계산된 값입니다. 다시 계산하지 말고 표에 있는 숫자를 그대로 인용하세요.
+
+    [팩트 표] (금액 단위: 원, 그룹평균은 {m1_month}월 그룹 1인당 카테고리별 지출, 그룹대비는 내 {m1_month}월 지출 - 그룹평균)
+{report_facts.fact_table_text(facts, m1_month, m2_month)}
 
     [작성 요구사항 (순서대로 작성하세요)]
     1. 'section_past_comparison': 
-       - 저저번 달 대비 저번 달의 소비 습관 변화를 분석.
+       - {m2_month}월 대비 {m1_month}월의 소비 습관 변화를 분석.
        - "전체 소비는 X원(Y%) 증가/감소했습니다." 포함.
        - 카테고리별 변화 팩트 위주 서술.
 
-    2. 'section_cluster_info': 
-       - 정확히 "당신은 소비구간 {range_text} 구간에 속해 있습니다." 라고만 작성.
-
-    3. 'section_group_comparison': 
-       - 저번 달 내 소비와 그룹 평균을 비교.
+    2. 'section_group_comparison': 
+       - {m1_month}월 내 소비와 그룹 평균을 비교.
        - 어떤 부분(카테고리)에 소비를 더 많이 했거나 덜 했는지 명시적으로 서술.
 
     [출력 형식 (JSON Only)]:
     {{
         "section_past_comparison": "...",
-        "section_cluster_info": "...",
         "section_group_comparison": "..."
     }}
     """
     try:
-        response = client.chat.completions.create(
+        response = await llm.create_chat_completion(
+            ANALYZE_API_KEY,
+            stage="report",
             model=MODEL_NAME,
             messages=[{"role": "user", "content": prompt}],
             response_format={"type": "json_object"},
             temperature=0.5
         )
         return json.loads(response.choices[0].message.content)
-    except:
+    except Exception:
         return {}
 
+def _format_report(sections, m1_month, m2_month):
+    # 화면 출력용 텍스트 조립
+    return f"""[{m2_month}월 소비 vs {m1_month}월 소비]
+{sections.get('section_past_comparison', '데이터 부족')}
+
+----------------------------------------
+[속한 그룹과의 비교]
+{sections.get('section_cluster_info', '데이터 부족')}
+{sections.get('section_group_comparison', '데이터 부족')}"""
+
 # =========================================================
 #  [API] 엔드포인트
 # =========================================================
 
-@router.post("/report")
-def get_monthly_report(req: UserRequest, db=Depends(get_db)):
-    user_id = req.user_id
-    
-    # 1. 날짜 계산 (오늘 기준 지난달 리포트)
-    today = datetime.date.today()
-    first_day_curr = today.replace(day=1)
-    last_month_date = first_day_curr - datetime.timedelta(days=1)
-    report_month_key = last_month_date.strftime("%Y-%m")
-    
-    m1_year, m1_month = last_month_date.year, last_month_date.month
-    two_months_ago = last_month_date.replace(day=1) - datetime.timedelta(days=1)
-    m2_year, m2_month = two_months_ago.year, two_months_ago.month
-
-    with db.cursor() as cursor:
+@metrics.instrument("sql.load_report_inputs")
+def _load_report_inputs(conn, user_id, report_month_key, m1, m2):
+    """캐시된 리포트가 있으면 (텍스트, None), 없으면 (None, 분석 입력 데이터) 반환"""
+    with conn.cursor() as cursor:
         # -------------------------------------------------------
         # STEP 1: 캐시 확인 (DB에 이미 있는지?)
         # -------------------------------------------------------
@@ -133,51 +99,158 @@ def get_monthly_report(req: UserRequest, db=Depends(get_db)):
         existing_report = cursor.fetchone()
 
         if existing_report:
-            return {
-                "status": "cached",
-                "report_text": existing_report['formatted_text']
-            }
+            return existing_report['formatted_text'], None
 
         # -------------------------------------------------------
         # STEP 2: 없으면 데이터 수집
         # -------------------------------------------------------
-        data_m2 = get_monthly_summary(cursor, user_id, m2_year, m2_month)
-        data_m1 = get_monthly_summary(cursor, user_id, m1_year, m1_month)
-        group_m1 = get_group_averages(cursor, user_id, m1_year, m1_month)
+        summaries = get_monthly_summaries(cursor, user_id, [m2, m1])
+        data_m2, data_m1 = summaries[m2], summaries[m1]
+        group_m1 = get_group_averages(cursor, user_id, *m1)
         cluster_info = get_user_cluster_info(cursor, user_id)
+    return None, (data_m2, data_m1, group_m1, cluster_info)
 
-        range_text = "정보 없음"
-        if cluster_info:
-            min_v = int(cluster_info['min_amount']) // 10000
-            max_v = int(cluster_info['max_amount']) // 10000
-            range_text = f"{min_v}만원~{max_v}만원"
+@metrics.instrument("sql.save_report")
+def _save_report(conn, user_id, report_month_key, ai_json, final_text):
+    """
+    리포트 저장. (user_id, report_month) UNIQUE 키로 한 건만 남으며,
+    다른 인스턴스가 먼저 저장했다면 그 리포트 텍스트를 반환합니다.
+    """
+    sql_save = """
+        INSERT INTO analysis_reports 
+        (user_id, report_month, raw_json, formatted_text, created_at)
+        VALUES (%s, %s, %s, %s, NOW())
+        ON DUPLICATE KEY UPDATE user_id = user_id
+    """
+    with conn.cursor() as cursor:
+        cursor.execute(sql_save, (user_id, report_month_key, json.dumps(ai_json, ensure_ascii=False), final_text))
+        if cursor.rowcount == 0:
+            cursor.execute(
+                "SELECT formatted_text FROM analysis_reports WHERE user_id = %s AND report_month = %s",
+                (user_id, report_month_key)
+            )
+            final_text = cursor.fetchone()['formatted_text']
+    conn.commit()
+    return final_text
 
-        # -------------------------------------------------------
-        # STEP 3: AI 분석 실행
-        # -------------------------------------------------------
-        ai_json = generate_ai_report(data_m2, data_m1, group_m1, cluster_info, range_text)
+async def build_monthly_report(user_id, today=None, mode="ai"):
+    """
+    지난달 리포트를 조회/생성합니다. (API 와 월초 배치 사전 생성이 함께 사용)
+    status: cached(이미 있음) / created(새로 생성) / failed(AI 응답 실패, 템플릿 문장으로 응답하고 저장하지 않음)
+            / fast(mode="fast": 저장된 AI 리포트가 없어 LLM 없이 템플릿으로 만든 리포트, 저장하지 않음)
+            / pending(아직 분류 중인 '미분류' 소비가 있어 임시로 만든 리포트, 저장하지 않음)
+    """
+    # 1. 날짜 계산 (오늘 기준 지난달 리포트)
+    today = today or datetime.date.today()
+    first_day_curr = today.replace(day=1)
+    last_month_date = first_day_curr - datetime.timedelta(days=1)
+    report_month_key = last_month_date.strftime("%Y-%m")
+    
+    m1_year, m1_month = last_month_date.year, last_month_date.month
+    two_months_ago = last_month_date.replace(day=1) - datetime.timedelta(days=1)
+    m2_year, m2_month = two_months_ago.year, two_months_ago.month
 
-        # 화면 출력용 텍스트 조립
-        final_text = f"""[{m2_month}월 소비 vs {m1_month}월 소비]
-{ai_json.get('section_past_comparison', '데이터 부족')}
+    # 메모리 캐시 -> 같은 리포트를 만드는 중인 요청이 있으면 그 결과를 함께 기다림
+    # (fast 모드도 이미 만들어진 AI 리포트가 있으면 그것을 그대로 돌려줍니다)
+    key = (user_id, report_month_key)
+    cached_text = report_cache.get(key)
+    if cached_text is not None:
+        return {
+            "status": "cached",
+            "report_text": cached_text
+        }
+    if mode == "fast":
+        fast_text = report_cache.get(key + ("fast",))
+        if fast_text is not None:
+            return {
+                "status": "fast",
+                "report_text": fast_text
+            }
+    flight_key = key if mode == "ai" else key + (mode,)
+    return await report_flight.do(flight_key, lambda: _load_or_generate_report(
+        user_id, report_month_key, (m1_year, m1_month), (m2_year, m2_month), mode
+    ))
 
-----------------------------------------
-[속한 그룹과의 비교]
-{ai_json.get('section_cluster_info', '데이터 부족')}
-{ai_json.get('section_group_comparison', '데이터 부족')}"""
+async def _load_or_generate_report(user_id, report_month_key, m1, m2, mode="ai"):
+    m1_year, m1_month = m1
+    m2_year, m2_month = m2
 
-        # -------------------------------------------------------
-        # STEP 4: DB 저장 (INSERT)
-        # -------------------------------------------------------
-        sql_save = """
-            INSERT INTO analysis_reports 
-            (user_id, report_month, raw_json, formatted_text, created_at)
-            VALUES (%s, %s, %s, %s, NOW())
-        """
-        cursor.execute(sql_save, (user_id, report_month_key, json.dumps(ai_json, ensure_ascii=False), final_text))
-        db.commit()
+    # STEP 1~2: 캐시 확인 + 데이터 수집 (LLM 대기 중에는 DB 연결을 붙잡지 않음)
+    cached_text, inputs = await run_with_db(
+        _load_report_inputs, user_id, report_month_key, (m1_year, m1_month), (m2_year, m2_month)
+    )
+    if cached_text is not None:
+        report_cache.set((user_id, report_month_key), cached_text)
+        return {
+            "status": "cached",
+            "report_text": cached_text
+        }
+    data_m2, data_m1, group_m1, cluster_info = inputs
 
+    range_text = "정보 없음"
+    if cluster_info:
+        min_v = int(cluster_info['min_amount']) // 10000
+        max_v = int(cluster_info['max_amount']) // 10000
+        range_text = f"{min_v}만원~{max_v}만원"
+
+    # 비동기 분류가 끝나지 않은 소비가 있으면 카테고리가 바뀔 수 있으므로 저장/캐시하지 않습니다.
+    has_pending = PENDING_CATEGORY in data_m1["summary"] or PENDING_CATEGORY in data_m2["summary"]
+
+    # 합계/증감률/그룹 대비 차이는 LLM 에 맡기지 않고 여기서 계산
+    facts = report_facts.compute_facts(data_m2, data_m1, group_m1)
+    template_sections = report_facts.render_sections(facts, range_text, m1_month, m2_month)
+
+    # fast 모드: LLM 호출 없이 템플릿 문장으로 바로 응답 (AI 리포트 자리를 차지하지 않도록 DB 에는 저장하지 않음)
+    if mode == "fast":
+        final_text = _format_report(template_sections, m1_month, m2_month)
+        if not has_pending:
+            report_cache.set((user_id, report_month_key, "fast"), final_text)
         return {
-            "status": "created",
+            "status": "fast",
             "report_text": final_text
         }
+
+    # -------------------------------------------------------
+    # STEP 3: AI 분석 실행
+    # -------------------------------------------------------
+    ai_json = await generate_ai_report(facts, m1_month, m2_month)
+    final_text = _format_report(
+        {**template_sections, **ai_json, "section_cluster_info": report_facts.cluster_sentence(range_text)},
+        m1_month, m2_month
+    )
+
+    # AI 응답이 실패한 리포트는 캐시로 굳지 않도록 저장하지 않습니다. (다음 요청/배치에서 재시도)
+    if not ai_json:
+        return {
+            "status": "failed",
+            "report_text": final_text
+        }
+
+    if has_pending:
+        return {
+            "status": "pending",
+            "report_text": final_text
+        }
+
+    # -------------------------------------------------------
+    # STEP 4: DB 저장 (INSERT)
+    # -------------------------------------------------------
+    final_text = await run_with_db(_save_report, user_id, report_month_key, ai_json, final_text)
+    report_cache.set((user_id, report_month_key), final_text)
+
+    return {
+        "status": "created",
+        "report_text": final_text
+    }
+
+@router.post("/report")
+async def get_monthly_report(req: UserRequest, mode: str = "ai"):
+    # mode=fast: 저장된 AI 리포트가 없으면 LLM 없이 템플릿 문장으로 바로 응답 (LLM 지연/쿼터 초과 대비)
+    if mode not in ("ai", "fast"):
+        raise HTTPException(status_code=400, detail="mode 는 ai 또는 fast 만 가능합니다.")
+    return await build_monthly_report(req.user_id, mode=mode)
+
+@router.get("/report-cache")
+def get_report_cache_stats():
+    # 리포트 메모리 캐시 / 동시 요청 합치기 현황
+    return {"cache": report_cache.stats(), "single_flight": report_flight.stats()}
@@ -1,35 +1,32 @@
 import json
+import asyncio
 import datetime
-from fastapi import APIRouter, Depends, HTTPException
-from openai import OpenAI
-from database import get_db 
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import StreamingResponse
+import llm
+import metrics
+from database import run_with_db
+from spending import get_monthly_summaries
+from chat_session import (CHAT_HISTORY_LIMIT, ChatSession, session_cache, message_writer,
+                          load_rolling_summary, count_unsummarized, load_unsummarized, save_rolling_summary)
+import prompt_budget
 from schemas import ChatRequest
 import os
-from dotenv import load_dotenv
 
-load_dotenv()
 
 router = APIRouter(prefix="/api/chat", tags=["Chatbot"])
 
 CHATBOT_API_KEY = os.getenv("CHATBOT_API_KEY")
-client = OpenAI(api_key=CHATBOT_API_KEY)
 MODEL_NAME = "gpt-4o"
+SUMMARY_MODEL_NAME = os.getenv("CHAT_SUMMARY_MODEL", "gpt-4o-mini")          # 롤링 요약용 (백그라운드)
+CHAT_COMPACT_MIN_MESSAGES = int(os.getenv("CHAT_COMPACT_MIN_MESSAGES", "4"))  # 이만큼 밀려나면 요약 갱신
+CHAT_SUMMARY_MAX_CHARS = int(os.getenv("CHAT_SUMMARY_MAX_CHARS", "600"))
 
-# --- SQL Helpers (기존과 동일) ---
-def get_monthly_summary(cursor, user_id, year, month):
-    sql = """
-        SELECT category, SUM(amount) as total_amount
-        FROM transactions
-        WHERE user_id = %s AND transacted_at LIKE %s AND type = 'WITHDRAW'
-        GROUP BY category
-    """
-    month_str = f"{year}-{month:02d}%"
-    cursor.execute(sql, (user_id, month_str))
-    result = cursor.fetchall()
-    summary = {row['category']: int(row['total_amount']) for row in result}
-    return {"summary": summary, "total": sum(summary.values())}
+_background_tasks = set()
 
-def get_chat_history(cursor, user_id, limit=6):
+# --- SQL Helpers (월별 합계 조회는 spending 모듈) ---
+@metrics.instrument()
+def get_chat_history(cursor, user_id, limit=CHAT_HISTORY_LIMIT):
     sql = "SELECT sender, content FROM chat_messages WHERE user_id = %s ORDER BY created_at DESC LIMIT %s"
     cursor.execute(sql, (user_id, limit))
     rows = cursor.fetchall()
@@ -39,12 +36,18 @@ def get_chat_history(cursor, user_id, limit=6):
         history.append({"role": role, "content": row['content']})
     return history[::-1]
 
-def save_chat_message(cursor, user_id, sender, content):
-    sql = "INSERT INTO chat_messages (user_id, sender, content, created_at) VALUES (%s, %s, %s, NOW())"
-    cursor.execute(sql, (user_id, sender, content))
-
 # --- AI Function (조건부 로직 적용) ---
-def generate_ai_response(user_msg, curr_data, prev_data, target_budget, history):
+AI_ERROR_REPLY = "죄송합니다. AI 서버 연결 중 오류가 발생했습니다."
+
+def build_chat_messages(user_msg, curr_data, prev_data, target_budget, history, rolling_summary=""):
+    """
+    프롬프트를 조립하고 토큰 예산(CHAT_PROMPT_TOKEN_BUDGET)에 맞춰 히스토리를 자릅니다.
+    (messages, 예산 밖으로 밀려난 오래된 메시지들, 섹션별 토큰 수) 반환
+    """
+    # 카테고리가 많아도 데이터 섹션 크기가 일정하도록 상위 항목만 남김
+    curr_data = prompt_budget.compact_summary(curr_data)
+    prev_data = prompt_budget.compact_summary(prev_data)
+
     # 1. 목표 금액이 설정되지 않은 경우 (0원 혹은 None)
     if not target_budget or int(target_budget) == 0:
         system_prompt = """
@@ -69,8 +72,8 @@ def generate_ai_response(user_msg, curr_data, prev_data, target_budget, history)
         당신은 사용자가 설정한 '목표 소비 금액({target_budget}원)' 달성을 돕는 'AI 자산 관리 비서'입니다.
         현재 소비 내역과 지난달 내역을 비교하여 현실적인 조언을 제공하세요.
         
-        [데이터 1: 이번 달 현황]: {json.dumps(curr_data, ensure_ascii=False)}
-        [데이터 2: 지난 달 내역]: {json.dumps(prev_data, ensure_ascii=False)}
+        [데이터 1: 이번 달 현황]: {json.dumps(curr_data, ensure_ascii=False, separators=(",", ":"))}
+        [데이터 2: 지난 달 내역]: {json.dumps(prev_data, ensure_ascii=False, separators=(",", ":"))}
         
         [조언 생성 원칙 (엄격 준수)]:
         1. **절약 1순위 그룹 집중 공략**: [유흥/술, 택시/배달, 쇼핑] 중 증가/비중 큰 항목 우선 지적.
@@ -79,44 +82,204 @@ def generate_ai_response(user_msg, curr_data, prev_data, target_budget, history)
         4. **단계적 제안**: "하지 마세요" 대신 "줄여볼까요?" 또는 대체재 제안.
         """
 
-    messages = [{"role": "system", "content": system_prompt}]
-    messages.extend(history)
-    messages.append({"role": "user", "content": user_msg})
+    summary_prompt = f"\n[이전 대화 요약]: {rolling_summary}" if rolling_summary else ""
+    system_message = {"role": "system", "content": system_prompt + summary_prompt}
+    user_message = {"role": "user", "content": user_msg}
+
+    tokens = {
+        "system": prompt_budget.message_tokens(system_message) - prompt_budget.count_tokens(summary_prompt),
+        "summary": prompt_budget.count_tokens(summary_prompt),
+        "user": prompt_budget.message_tokens(user_message),
+    }
+    remaining = prompt_budget.CHAT_PROMPT_TOKEN_BUDGET - sum(tokens.values())
+    kept, dropped = prompt_budget.fit_history(history, max(remaining, 0))
+    tokens["history"] = sum(prompt_budget.message_tokens(m) for m in kept)
+    tokens["total"] = sum(tokens.values())
+
+    messages = [system_message, *kept, user_message]
+    return messages, dropped, tokens
 
+async def generate_ai_response(messages):
     try:
-        response = client.chat.completions.create(model=MODEL_NAME, messages=messages, temperature=0.7)
+        response = await llm.create_chat_completion(CHATBOT_API_KEY, stage="chat", model=MODEL_NAME, messages=messages, temperature=0.7)
+        if response.usage:
+            print(f"🧮 [chat usage] prompt={response.usage.prompt_tokens} completion={response.usage.completion_tokens}")
         return response.choices[0].message.content
-    except:
-        return "죄송합니다. AI 서버 연결 중 오류가 발생했습니다."
+    except Exception:
+        return AI_ERROR_REPLY
+
+async def stream_ai_response(messages):
+    """generate_ai_response 의 스트리밍 버전. 토큰 조각(str)을 받는 대로 내보냅니다."""
+    async for delta in llm.stream_chat_completion(CHATBOT_API_KEY, stage="chat", model=MODEL_NAME, messages=messages, temperature=0.7):
+        yield delta
+
+# --- 롤링 요약 (토큰 예산/대화 구간 밖으로 밀려난 대화를 백그라운드에서 압축) ---
+async def summarize_history(previous_summary, messages):
+    transcript = "\n".join(
+        f"{'사용자' if m['role'] == 'user' else 'AI'}: {m['content']}" for m in messages
+    )
+    prompt = f"""
+    아래는 사용자와 'AI 자산 관리 비서'의 [기존 대화 요약]과 그 이후의 [추가 대화]입니다.
+    두 내용을 합쳐 {CHAT_SUMMARY_MAX_CHARS}자 이내의 한국어 요약으로 갱신하세요.
+    목표 소비 금액, 사용자가 밝힌 상황/선호, 이미 제안한 조언과 사용자의 반응 위주로 남기고 인사말은 버리세요.
+    요약문만 출력하세요.
+
+    [기존 대화 요약]: {previous_summary or "없음"}
+    [추가 대화]:
+    {transcript}
+    """
+    response = await llm.create_chat_completion(
+        CHATBOT_API_KEY,
+        stage="chat_summary",
+        model=SUMMARY_MODEL_NAME,
+        messages=[{"role": "user", "content": prompt}],
+        temperature=0.3
+    )
+    return response.choices[0].message.content.strip()[:CHAT_SUMMARY_MAX_CHARS * 2]
+
+async def _compact_history(user_id, keep, pending):
+    """
+    chat_messages 에서 마지막 요약 이후 + 대화 구간(최근 keep 개) 밖의 메시지를 읽어 요약하고, 요약한 마지막 id 를 함께 저장합니다.
+    실패하면 대기 수를 되돌려 다음 대화에서 다시 시도합니다.
+    """
+    try:
+        # write-behind 로 아직 쓰이지 않은 메시지를 먼저 저장해 DB 를 기준으로 삼습니다.
+        await asyncio.to_thread(message_writer.flush)
+        previous_summary, messages, last_message_id = await run_with_db(load_unsummarized, user_id, keep)
+        if not messages:
+            session_cache.finish_compaction(user_id)
+            return
+        summary = await summarize_history(previous_summary, messages)
+        await run_with_db(save_rolling_summary, user_id, summary, last_message_id)
+    except Exception as e:
+        print(f"❌ [chat summary] user={user_id} 요약 실패: {e}")
+        session_cache.finish_compaction(user_id, failed_pending=pending)
+        return
+    session_cache.finish_compaction(user_id, summary=summary)
+
+def _schedule_compaction(user_id):
+    job = session_cache.take_for_compaction(user_id, CHAT_COMPACT_MIN_MESSAGES)
+    if job is None:
+        return
+    task = asyncio.get_running_loop().create_task(_compact_history(user_id, *job))
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+
+def _build_prompt(req, context):
+    """프롬프트 조립 + 예산 밖 메시지 정리 + 토큰 로그"""
+    curr_data, prev_data, history, rolling_summary = context
+    messages, dropped, tokens = build_chat_messages(
+        req.message, curr_data, prev_data, req.target_budget, history, rolling_summary
+    )
+    if dropped:
+        session_cache.trim_messages(req.user_id, dropped)
+    _schedule_compaction(req.user_id)
+    print(f"🧮 [chat tokens] user={req.user_id} {tokens} budget={prompt_budget.CHAT_PROMPT_TOKEN_BUDGET} "
+          f"history={len(history) - len(dropped)}/{len(history)}")
+    return messages
+
+# --- 세션 준비 / 기록 (세션 캐시 적중 시 DB 조회 없음, 메시지 저장은 write-behind) ---
+def _load_session(conn, user_id, months):
+    with conn.cursor() as cursor:
+        summaries = get_monthly_summaries(cursor, user_id, months)
+        history = get_chat_history(cursor, user_id, CHAT_HISTORY_LIMIT)
+        rolling_summary, last_message_id = load_rolling_summary(cursor, user_id)
+        # 대화 구간보다 오래됐는데 아직 요약에 반영되지 않은 메시지 (만료/재시작 전에 밀려난 대화)
+        unsummarized = count_unsummarized(cursor, user_id, last_message_id, len(history) + CHAT_COMPACT_MIN_MESSAGES)
+    return summaries, history, rolling_summary, max(unsummarized - len(history), 0)
+
+def _load_summaries(conn, user_id, months):
+    with conn.cursor() as cursor:
+        return get_monthly_summaries(cursor, user_id, months)
+
+async def _prepare_chat(user_id, message):
+    # 1. 이번 달 / 지난 달
+    today = datetime.date.today()
+    first = today.replace(day=1)
+    last_month = first - datetime.timedelta(days=1)
+    curr, prev = (today.year, today.month), (last_month.year, last_month.month)
+
+    # 2. 세션 (최근 대화 + 소비 요약). 캐시에 없을 때만 DB 조회
+    session = session_cache.get(user_id)
+    if session is None:
+        summaries, history, rolling_summary, unsummarized = await run_with_db(_load_session, user_id, [curr, prev])
+        # 아직 DB 에 쓰이지 않은 메시지도 합칩니다.
+        for _, sender, content, _ in message_writer.pending_for(user_id):
+            history.append({"role": "user" if sender == "USER" else "assistant", "content": content})
+        session = ChatSession(history, summaries, rolling_summary, compact_pending=unsummarized)
+        session_cache.put(user_id, session)
+
+    summaries = session.summaries_for([curr, prev])
+    if summaries is None:
+        # 소비 내역이 추가되었거나(무효화) 오래되었거나 월이 바뀐 경우 요약만 다시 조회
+        summaries = await run_with_db(_load_summaries, user_id, [curr, prev])
+        session_cache.set_summaries(user_id, summaries)
+    history = list(session.history)
+    rolling_summary = session.rolling_summary
+
+    # 3. 유저 질문 기록
+    # 참고: 프론트엔드에서 '입장 신호(예: init_signal)'를 보낼 경우, DB에 저장하지 않도록 처리할 수도 있습니다.
+    # 여기서는 모든 메시지를 저장한다고 가정합니다.
+    _record_message(user_id, 'USER', message)
+    return summaries[curr], summaries[prev], history, rolling_summary
+
+def _record_message(user_id, sender, content):
+    session_cache.append(user_id, "user" if sender == "USER" else "assistant", content)
+    message_writer.enqueue(user_id, sender, content)
+
+# --- 스트리밍 응답 (SSE) ---
+def _sse(event, data):
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+def _stream_reply(req, messages):
+    """
+    stream=true 일 때의 SSE 응답. 토큰이 생성되는 대로 `event: delta` 로 보내고, 끝나면 `event: done` 으로 전체 답변을 보냅니다.
+    답변은 스트림이 끝나거나 클라이언트가 끊었을 때 그때까지 모인 내용으로 저장됩니다.
+    """
+    user_id = req.user_id
+
+    async def event_stream():
+        parts = []
+        try:
+            try:
+                async for delta in stream_ai_response(messages):
+                    parts.append(delta)
+                    yield _sse("delta", {"delta": delta})
+            except Exception as e:
+                print(f"AI Stream Error: {e}")
+                if not parts:
+                    parts.append(AI_ERROR_REPLY)
+                    yield _sse("delta", {"delta": AI_ERROR_REPLY})
+            yield _sse("done", {"reply": "".join(parts)})
+        finally:
+            # 클라이언트가 끊어 취소된 경우에도 그때까지 받은 답변을 기록합니다. (write-behind 이므로 await 없음)
+            if parts:
+                _record_message(user_id, 'BOT', "".join(parts))
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 # --- Main Route ---
 @router.post("")
-def chat_endpoint(req: ChatRequest, db=Depends(get_db)):
+async def chat_endpoint(req: ChatRequest):
     user_id = req.user_id
-    
-    with db.cursor() as cursor:
-        # 1. 유저 질문 저장
-        # 참고: 프론트엔드에서 '입장 신호(예: init_signal)'를 보낼 경우, DB에 저장하지 않도록 처리할 수도 있습니다.
-        # 여기서는 모든 메시지를 저장한다고 가정합니다.
-        save_chat_message(cursor, user_id, 'USER', req.message)
-        db.commit()
-
-        # 2. 데이터 수집
-        today = datetime.date.today()
-        curr_data = get_monthly_summary(cursor, user_id, today.year, today.month)
-        
-        first = today.replace(day=1)
-        last_month = first - datetime.timedelta(days=1)
-        prev_data = get_monthly_summary(cursor, user_id, last_month.year, last_month.month)
-        
-        # 3. 히스토리 조회
-        history = get_chat_history(cursor, user_id)
 
-        # 4. 답변 생성
-        bot_reply = generate_ai_response(req.message, curr_data, prev_data, req.target_budget, history)
-        
-        # 5. 답변 저장
-        save_chat_message(cursor, user_id, 'BOT', bot_reply)
-        db.commit()
+    # 1~3. 데이터/히스토리 수집 + 질문 기록
+    context = await _prepare_chat(user_id, req.message)
+
+    # 4. 프롬프트 조립 (토큰 예산 적용)
+    messages = _build_prompt(req, context)
+
+    if req.stream:
+        return _stream_reply(req, messages)
+
+    # 5. 답변 생성
+    bot_reply = await generate_ai_response(messages)
+
+    # 6. 답변 기록
+    _record_message(user_id, 'BOT', bot_reply)
 
     return {"reply": bot_reply}
@@ -0,0 +1,346 @@
+import os
+import json
+import time
+import datetime
+from typing import List, Optional
+
+import pymysql
+from fastapi import APIRouter, Depends, HTTPException
+
+from database import get_db, db_connection
+
+# numpy / scikit-learn 은 import 비용이 커서(콜드 스타트) 클러스터링이 실제로 돌 때만 함수 안에서 import 합니다.
+
+router = APIRouter(prefix="/api/clustering", tags=["Clustering"])
+
+CLUSTER_COUNT = int(os.getenv("CLUSTER_COUNT", "5"))                    # 소비구간(그룹) 수
+CLUSTER_FEATURE_MONTHS = int(os.getenv("CLUSTER_FEATURE_MONTHS", "3"))  # 특징으로 쓰는 최근 완료 월 수
+CLUSTER_CHUNK_SIZE = int(os.getenv("CLUSTER_CHUNK_SIZE", "10000"))      # 스트리밍 1회당 사용자 수
+CLUSTER_SEED = int(os.getenv("CLUSTER_SEED", "42"))
+CLUSTER_N_INIT = int(os.getenv("CLUSTER_N_INIT", "3"))                  # KMeans 재시작 횟수 (초기 중심점)
+CLUSTER_MAX_EPOCHS = int(os.getenv("CLUSTER_MAX_EPOCHS", "30"))         # 스트리밍 학습 시 전체 데이터 반복 상한
+CLUSTER_TOL = float(os.getenv("CLUSTER_TOL", "0.001"))                  # epoch 간 중심점 최대 이동(표준화 단위)이 이보다 작으면 수렴
+CLUSTER_ASSIGN_BATCH = int(os.getenv("CLUSTER_ASSIGN_BATCH", "1000"))   # 증분 배정 1회당 최대 사용자 수
+
+# =========================================================
+#  [데이터] 사용자별 월 지출 특징 스트리밍
+# =========================================================
+
+def feature_months(today=None, count=CLUSTER_FEATURE_MONTHS):
+    """오늘 기준 최근 완료된 count 개월 ('YYYY-MM', 오래된 달부터)"""
+    today = today or datetime.date.today()
+    months = []
+    cursor_date = today.replace(day=1)
+    for _ in range(count):
+        cursor_date = (cursor_date - datetime.timedelta(days=1)).replace(day=1)
+        months.append(cursor_date.strftime("%Y-%m"))
+    return months[::-1]
+
+def _feature_sql(months):
+    # 사용자 1명 = 1행 (월별 지출 합계를 열로 펼침). 롤업 테이블에서 읽으므로 원본 transactions 를 훑지 않습니다.
+    columns = ",\n".join(
+        f"SUM(CASE WHEN month = %s THEN total_amount ELSE 0 END) AS m{i}" for i in range(len(months))
+    )
+    placeholders = ", ".join(["%s"] * len(months))
+    sql = f"""
+        SELECT user_id,
+        {columns}
+        FROM monthly_category_totals
+        WHERE month IN ({placeholders})
+        GROUP BY user_id
+    """
+    return sql, (*months, *months)
+
+def stream_features(conn, months, chunk_size=CLUSTER_CHUNK_SIZE):
+    """
+    서버 사이드 커서로 (user_ids, 월별 지출 행렬) 을 chunk_size 명씩 내보냅니다.
+    전체 사용자를 메모리에 올리지 않으므로 사용자 수와 무관하게 메모리가 일정합니다.
+    """
+    import numpy as np
+    sql, params = _feature_sql(months)
+    cursor = conn.cursor(pymysql.cursors.SSCursor)
+    try:
+        cursor.execute(sql, params)
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                break
+            data = np.asarray(rows, dtype=np.float64)
+            yield data[:, 0].astype(np.int64), data[:, 1:]
+    finally:
+        cursor.close()
+
+def to_features(amounts):
+    """월별 지출(원) -> 학습용 특징 (지출 규모 차이가 커서 log 스케일 사용)"""
+    import numpy as np
+    return np.log1p(np.clip(amounts, 0, None))
+
+# =========================================================
+#  [로직] 클러스터링 (KMeans / MiniBatchKMeans 다중 epoch 스트리밍)
+# =========================================================
+
+def _fit(conn, months, n_clusters):
+    """
+    사용자가 한 청크(CLUSTER_CHUNK_SIZE) 안에 다 들어오면 메모리에 올려 KMeans.fit 으로 수렴까지 학습하고,
+    넘으면 MiniBatchKMeans.partial_fit 으로 청크를 여러 epoch 돌며 중심점 이동이 CLUSTER_TOL 아래로 내려갈 때까지 학습합니다.
+    """
+    import numpy as np
+    from sklearn.cluster import KMeans, MiniBatchKMeans
+    from sklearn.preprocessing import StandardScaler
+
+    # pass 1: 사용자 수 + 특징 표준화 통계
+    scaler = StandardScaler()
+    n_users = 0
+    for _, amounts in stream_features(conn, months):
+        scaler.partial_fit(to_features(amounts))
+        n_users += len(amounts)
+    if n_users == 0:
+        return None, None, 0
+    n_clusters = min(n_clusters, n_users)
+
+    # pass 2-a: 전부 메모리에 들어오면 일반 KMeans (n_init 번 재시작 중 가장 좋은 결과)
+    if n_users <= CLUSTER_CHUNK_SIZE:
+        features = np.vstack([scaler.transform(to_features(amounts)) for _, amounts in stream_features(conn, months)])
+        kmeans = KMeans(n_clusters=n_clusters, random_state=CLUSTER_SEED, n_init=CLUSTER_N_INIT).fit(features)
+        return scaler, kmeans, n_users
+
+    # pass 2-b: 스트리밍. partial_fit 은 n_init 을 쓰지 않으므로, 첫 청크에 KMeans(n_init) 를 돌려 초기 중심점을 정합니다.
+    kmeans, shift = None, float("inf")
+    for epoch in range(1, CLUSTER_MAX_EPOCHS + 1):
+        previous = None if kmeans is None else kmeans.cluster_centers_.copy()
+        for _, amounts in stream_features(conn, months):
+            features = scaler.transform(to_features(amounts))
+            if kmeans is None:
+                init = KMeans(n_clusters=n_clusters, random_state=CLUSTER_SEED, n_init=CLUSTER_N_INIT).fit(features)
+                kmeans = MiniBatchKMeans(n_clusters=n_clusters, init=init.cluster_centers_, n_init=1,
+                                         random_state=CLUSTER_SEED, batch_size=min(CLUSTER_CHUNK_SIZE, 4096))
+            kmeans.partial_fit(features)
+        if previous is not None:
+            shift = float(np.linalg.norm(kmeans.cluster_centers_ - previous, axis=1).max())
+            if shift < CLUSTER_TOL:
+                print(f"  ... [클러스터링] {epoch} epoch 에서 수렴 (중심점 이동 {shift:.5f})")
+                break
+    else:
+        print(f"⚠️ [클러스터링] {CLUSTER_MAX_EPOCHS} epoch 안에 수렴하지 않았습니다. (중심점 이동 {shift:.5f})")
+    return scaler, kmeans, n_users
+
+def _band_order(kmeans):
+    """지출 규모가 작은 그룹부터 1, 2, ... 번이 되도록 라벨 -> cluster_id 매핑"""
+    import numpy as np
+    order = np.argsort(kmeans.cluster_centers_.mean(axis=1))
+    mapping = np.empty_like(order)
+    mapping[order] = np.arange(1, len(order) + 1)
+    return mapping
+
+def _write_assignments(conn, months, scaler, kmeans, mapping):
+    """
+    pass 3: 배정 결과를 임시 테이블에 executemany 로 넣고, users 는 UPDATE ... JOIN 한 번으로 갱신합니다.
+    읽기(서버 사이드 커서)와 쓰기는 서로 다른 연결을 사용합니다.
+    """
+    import numpy as np
+    k = len(mapping)
+    band_min = np.full(k + 1, np.inf)
+    band_max = np.full(k + 1, -np.inf)
+    band_size = np.zeros(k + 1, dtype=np.int64)
+
+    with db_connection() as writer:
+        with writer.cursor() as wcur:
+            wcur.execute("DROP TEMPORARY TABLE IF EXISTS tmp_cluster_assignments")
+            wcur.execute("""
+                CREATE TEMPORARY TABLE tmp_cluster_assignments (
+                    user_id INT NOT NULL PRIMARY KEY,
+                    cluster_id INT NOT NULL
+                )
+            """)
+            for user_ids, amounts in stream_features(conn, months):
+                labels = mapping[kmeans.predict(scaler.transform(to_features(amounts)))]
+                monthly_avg = amounts.mean(axis=1)
+                np.minimum.at(band_min, labels, monthly_avg)
+                np.maximum.at(band_max, labels, monthly_avg)
+                np.add.at(band_size, labels, 1)
+                wcur.executemany(
+                    "INSERT INTO tmp_cluster_assignments (user_id, cluster_id) VALUES (%s, %s)",
+                    list(zip(user_ids.tolist(), labels.tolist()))
+                )
+
+            wcur.executemany(
+                """
+                INSERT INTO clusters (id, min_amount, max_amount) VALUES (%s, %s, %s)
+                ON DUPLICATE KEY UPDATE min_amount = VALUES(min_amount), max_amount = VALUES(max_amount)
+                """,
+                [(cid, int(band_min[cid]), int(band_max[cid])) for cid in range(1, k + 1) if band_size[cid]]
+            )
+            wcur.execute("""
+                UPDATE users u
+                JOIN tmp_cluster_assignments a ON a.user_id = u.id
+                SET u.cluster_id = a.cluster_id, u.cluster_assigned_at = NOW()
+            """)
+            updated = wcur.rowcount
+            wcur.execute("DROP TEMPORARY TABLE IF EXISTS tmp_cluster_assignments")
+        writer.commit()
+
+    return {
+        "users_changed": updated,
+        "bands": [
+            {"cluster_id": cid, "users": int(band_size[cid]),
+             "min_amount": int(band_min[cid]), "max_amount": int(band_max[cid])}
+            for cid in range(1, k + 1) if band_size[cid]
+        ],
+    }
+
+def logic_clustering(conn, today=None):
+    """
+    최근 CLUSTER_FEATURE_MONTHS 개월 월별 지출로 사용자를 CLUSTER_COUNT 개 소비구간으로 묶고
+    users.cluster_id, clusters.min_amount/max_amount 를 갱신합니다. (매월 1일 스케줄러)
+    """
+    started = time.monotonic()
+    months = feature_months(today)
+    scaler, kmeans, n_users = _fit(conn, months, CLUSTER_COUNT)
+    if kmeans is None:
+        print(f"⚠️ [클러스터링] {months} 기간에 소비 내역이 있는 사용자가 없습니다.")
+        return {"months": months, "users": 0}
+
+    mapping = _band_order(kmeans)
+    result = _write_assignments(conn, months, scaler, kmeans, mapping)
+    result["model_id"] = save_model(conn, months, scaler, kmeans, mapping)
+    result.update({"months": months, "users": n_users, "elapsed_seconds": round(time.monotonic() - started, 1)})
+    print(f"✅ [클러스터링] {n_users}명 -> {len(result['bands'])}개 그룹 ({result['elapsed_seconds']}s)")
+    return result
+
+# =========================================================
+#  [로직] 모델 저장 + 증분 배정 (재학습 없이 가장 가까운 중심점)
+# =========================================================
+
+def save_model(conn, months, scaler, kmeans, mapping):
+    """표준화 값과 중심점(cluster_id 순서)을 cluster_models 에 저장하고 id 반환"""
+    import numpy as np
+    centroids = np.empty_like(kmeans.cluster_centers_)
+    centroids[mapping - 1] = kmeans.cluster_centers_
+    with conn.cursor() as cursor:
+        cursor.execute(
+            "INSERT INTO cluster_models (months, scaler_mean, scaler_scale, centroids) VALUES (%s, %s, %s, %s)",
+            (",".join(months), json.dumps(scaler.mean_.tolist()), json.dumps(scaler.scale_.tolist()),
+             json.dumps(centroids.tolist()))
+        )
+        model_id = cursor.lastrowid
+    conn.commit()
+    return model_id
+
+def load_latest_model(cursor):
+    import numpy as np
+    cursor.execute("SELECT * FROM cluster_models ORDER BY id DESC LIMIT 1")
+    row = cursor.fetchone()
+    if not row:
+        return None
+    return {
+        "id": row['id'],
+        "months": row['months'].split(","),
+        "mean": np.asarray(json.loads(row['scaler_mean'])),
+        "scale": np.asarray(json.loads(row['scaler_scale'])),
+        "centroids": np.asarray(json.loads(row['centroids'])),
+    }
+
+def nearest_clusters(model, amounts):
+    """월별 지출 행렬 -> cluster_id 배열 (|x|^2 - 2x·c + |c|^2 를 한 번의 행렬곱으로 계산)"""
+    x = (to_features(amounts) - model["mean"]) / model["scale"]
+    c = model["centroids"]
+    distances = (x ** 2).sum(axis=1)[:, None] - 2 * x @ c.T + (c ** 2).sum(axis=1)[None, :]
+    return distances.argmin(axis=1) + 1
+
+def _recent_amounts(cursor, user_ids, model_months):
+    """
+    사용자별 월 지출을 모델의 특징 월 순서로 만듭니다.
+    아직 그 달에 활동하지 않은 신규 사용자는 빈 달을 (모델 기간 이후 포함) 지출이 있는 달들의 평균으로 채웁니다.
+    """
+    import numpy as np
+    placeholders = ", ".join(["%s"] * len(user_ids))
+    sql = f"""
+        SELECT user_id, month, SUM(total_amount) AS total
+        FROM monthly_category_totals
+        WHERE user_id IN ({placeholders}) AND month >= %s
+        GROUP BY user_id, month
+    """
+    cursor.execute(sql, (*user_ids, model_months[0]))
+    by_user = {}
+    for row in cursor.fetchall():
+        by_user.setdefault(row['user_id'], {})[row['month']] = float(row['total'])
+
+    known = [uid for uid in user_ids if by_user.get(uid)]
+    amounts = np.zeros((len(known), len(model_months)))
+    for i, uid in enumerate(known):
+        monthly = by_user[uid]
+        fill = sum(monthly.values()) / len(monthly)
+        amounts[i] = [monthly.get(m, fill) for m in model_months]
+    return known, amounts
+
+def assign_users(conn, user_ids=None):
+    """
+    최신 모델로 사용자들을 가장 가까운 그룹에 배정합니다. (재학습 없음)
+    user_ids 를 주지 않으면 모델 기간 이후 소비 이력이 있으면서 아직 그룹이 없거나 배정 뒤에 롤업이 바뀐 사용자를
+    한 번 배정된 적 없는 사용자부터, 그다음은 배정이 오래된 순서로 CLUSTER_ASSIGN_BATCH 명씩 배정합니다.
+    후보와 _recent_amounts 가 같은 기간을 보므로 후보는 모두 배정되고 배정 시각이 갱신되어, 다음 실행에서 다음 사용자로 넘어갑니다.
+    """
+    with conn.cursor() as cursor:
+        model = load_latest_model(cursor)
+        if model is None:
+            return {"assigned": 0, "reason": "no model"}
+
+        if user_ids is None:
+            cursor.execute("""
+                SELECT u.id FROM users u
+                WHERE EXISTS (
+                    SELECT 1 FROM monthly_category_totals r
+                    WHERE r.user_id = u.id AND r.month >= %s
+                      AND (u.cluster_assigned_at IS NULL OR r.updated_at > u.cluster_assigned_at)
+                )
+                ORDER BY u.cluster_assigned_at IS NOT NULL, u.cluster_assigned_at, u.id DESC
+                LIMIT %s
+            """, (model["months"][0], CLUSTER_ASSIGN_BATCH))
+            user_ids = [row['id'] for row in cursor.fetchall()]
+        if not user_ids:
+            return {"assigned": 0, "model_id": model["id"]}
+
+        known, amounts = _recent_amounts(cursor, list(user_ids), model["months"])
+        if not known:
+            return {"assigned": 0, "model_id": model["id"]}
+        labels = nearest_clusters(model, amounts)
+        cursor.executemany(
+            "UPDATE users SET cluster_id = %s, cluster_assigned_at = NOW() WHERE id = %s",
+            list(zip(labels.tolist(), known))
+        )
+    conn.commit()
+    print(f"✅ [그룹 배정] {len(known)}명 배정 (model {model['id']})")
+    return {"assigned": len(known), "model_id": model["id"]}
+
+# =========================================================
+#  [API] 엔드포인트 (관리자용)
+# =========================================================
+
+def _run_job(name, **params):
+    # 스케줄러와 같은 잠금(GET_LOCK)/실행 이력(job_runs)을 거칩니다. jobs 가 이 모듈을 import 하므로 여기서 import
+    import jobs
+    result = jobs.run_job(name, **params)
+    if result is None:
+        raise HTTPException(status_code=409, detail=f"{name} 작업이 다른 곳에서 실행 중이거나 실패했습니다. (python jobs.py history {name})")
+    return result
+
+@router.post("/run")
+def run_clustering():
+    # 스케줄러를 기다리지 않고 수동으로 그룹 갱신
+    return _run_job("clustering")
+
+@router.post("/assign")
+def run_assignment(user_ids: Optional[List[int]] = None):
+    # 지정한 사용자(없으면 그룹 미배정/소비가 바뀐 사용자)를 최신 모델 기준으로 즉시 배정
+    return _run_job("cluster-assign", user_ids=user_ids)
+
+@router.get("/clusters")
+def list_clusters(db=Depends(get_db)):
+    with db.cursor() as cursor:
+        cursor.execute("""
+            SELECT c.id, c.min_amount, c.max_amount, COUNT(u.id) AS users
+            FROM clusters c LEFT JOIN users u ON u.cluster_id = c.id
+            GROUP BY c.id, c.min_amount, c.max_amount
+            ORDER BY c.id
+        """)
+        return cursor.fetchall()
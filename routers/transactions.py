@@ -1,25 +1,29 @@
 import os
+import json
+import asyncio
 import datetime
-from fastapi import APIRouter, Depends, HTTPException
-from openai import OpenAI
-from dotenv import load_dotenv
-from database import get_db
+from typing import List
+from fastapi import APIRouter, HTTPException
+from starlette.concurrency import run_in_threadpool
+import llm
+import metrics
+import rollup
+from database import run_with_db
 from schemas import TransactionRequest
+from category_cache import category_cache, normalize_merchant
+from category_model import category_model
+from chat_session import session_cache
+from categorize_queue import CategorizeQueue, PENDING_CATEGORY, PENDING_SOURCE
 
-load_dotenv()
 # 라우터 설정
 router = APIRouter(prefix="/api/transaction", tags=["Transactions"])
 
 CATEGORY_API_KEY = os.getenv("CATEGORY_API_KEY")
-client = OpenAI(api_key=CATEGORY_API_KEY)
 MODEL_NAME = "gpt-4o"
 
-def classify_category_ai(content):
-    prompt = f"""
-    소비처: "{content}"
-    위 소비처를 아래 [분류 기준]에 맞춰 가장 적절한 카테고리 하나로 분류하세요.
-    설명 없이 오직 카테고리 명만 단답형으로 출력하세요.
+CATEGORIES = ["식비", "교통", "쇼핑", "의료/건강", "문화/여가", "공과금/고정비", "이체", "편의점/마트", "기타"]
 
+CATEGORY_GUIDE = """
     [분류 기준]
     - 식비: 식당, 카페, 배달, 주점, 베이커리
     - 교통: 지하철, 택시, 버스, 기차, 주유소
@@ -31,41 +35,234 @@ def classify_category_ai(content):
     - 편의점/마트: 편의점, 대형마트, 슈퍼마켓
     - 기타: 위 분류에 속하지 않는 것
     """
+
+# 일괄 등록 설정
+BULK_MAX_ROWS = int(os.getenv("BULK_MAX_ROWS", "1000"))
+BULK_CLASSIFY_BATCH = int(os.getenv("BULK_CLASSIFY_BATCH", "50"))    # LLM 프롬프트 1회당 소비처 수
+
+# type 까지 모두 placeholder 로 두어야 pymysql executemany 가 multi-row INSERT 한 문장으로 묶어줍니다.
+# category_source: 카테고리를 붙인 곳 (cache / model / llm / fallback / pending). 로컬 분류 모델은 llm/cache 답만 학습합니다.
+# pending: 캐시/로컬 모델로 바로 분류되지 않아 '미분류'로 먼저 저장된 행 (categorize_queue 가 나중에 채움)
+INSERT_SQL = """
+    INSERT INTO transactions
+    (user_id, amount, original_content, category, category_source, transacted_at, type)
+    VALUES (%s, %s, %s, %s, %s, %s, %s)
+"""
+
+# --- 분류 캐시 DB 헬퍼 (run_with_db 로 스레드풀에서 실행) ---
+@metrics.instrument("sql.lookup_categories")
+def _lookup_categories(conn, contents):
+    """캐시에서 찾은 {소비처: 카테고리} 반환 (메모리 LRU -> category_cache 테이블)"""
+    found = {}
+    with conn.cursor() as cursor:
+        for content in contents:
+            cached = category_cache.get(content, cursor)
+            if cached:
+                found[content] = cached
+    conn.commit()  # hits 카운트 반영
+    return found
+
+@metrics.instrument("sql.store_categories")
+def _store_categories(conn, categories):
+    with conn.cursor() as cursor:
+        for content, category in categories.items():
+            category_cache.put(content, category, cursor)
+    conn.commit()
+
+async def _classify_batch_ai(contents):
+    """소비처 여러 개를 프롬프트 한 번으로 분류합니다. {소비처: 카테고리} 반환 (실패한 항목은 빠짐)"""
+    numbered = "\n".join(f'{i}. "{c}"' for i, c in enumerate(contents, start=1))
+    prompt = f"""
+    아래 소비처 목록의 각 항목을 [분류 기준]에 맞춰 가장 적절한 카테고리 하나로 분류하세요.
+    {CATEGORY_GUIDE}
+    [소비처 목록]
+    {numbered}
+
+    [출력 형식 (JSON Only)]: 항목 번호를 키로, 카테고리 명을 값으로 하는 객체
+    {{"1": "식비", "2": "교통", ...}}
+    """
     try:
-        response = client.chat.completions.create(
+        response = await llm.create_chat_completion(
+            CATEGORY_API_KEY,
+            stage="classify_batch",
             model=MODEL_NAME,
             messages=[{"role": "user", "content": prompt}],
-            max_tokens=20, 
-            temperature=0.3 
+            response_format={"type": "json_object"},
+            temperature=0.3
         )
-        return response.choices[0].message.content.strip()
+        answer = json.loads(response.choices[0].message.content)
     except Exception as e:
-        print(f"AI Error: {e}")
-        return "기타"
+        print(f"AI Error (batch of {len(contents)}): {e}")
+        return {}
+
+    result = {}
+    for i, content in enumerate(contents, start=1):
+        category = str(answer.get(str(i), "")).strip()
+        if category in CATEGORIES:
+            result[content] = category
+    return result
+
+async def classify_categories_local(contents):
+    """캐시 -> 로컬 분류 모델로만 분류합니다. (LLM 호출 없음) 찾은 것만 {소비처: (카테고리, 출처)} 반환"""
+    distinct = list(dict.fromkeys(contents))
+    cached = await run_with_db(_lookup_categories, distinct) if distinct else {}
+    categories = {content: (category, "cache") for content, category in cached.items()}
+    # TF-IDF + predict_proba 는 CPU 작업이라 이벤트 루프를 막지 않도록 스레드풀에서 실행
+    predicted = await run_in_threadpool(category_model.predict, [content for content in distinct if content not in categories])
+    categories.update({content: (category, "model") for content, category in predicted.items()})
+    return categories
+
+async def classify_categories_ai(contents):
+    """
+    여러 소비처를 한꺼번에 분류합니다. {소비처: (카테고리, 출처)} 반환.
+    같은 가맹점(정규화 키 기준)은 한 번만 묻고, 캐시에도 없고 로컬 모델도 확신하지 못한 것만 배치 프롬프트로 LLM 에 보냅니다.
+    """
+    distinct = list(dict.fromkeys(contents))
+    categories = await classify_categories_local(distinct)
+
+    pending = {}  # 정규화 키 -> 대표 소비처 원문
+    for content in distinct:
+        if content not in categories:
+            pending.setdefault(normalize_merchant(content), content)
+
+    misses = list(pending.values())
+    batches = [misses[i:i + BULK_CLASSIFY_BATCH] for i in range(0, len(misses), BULK_CLASSIFY_BATCH)]
+    classified = {}
+    # 배치 프롬프트는 동시에 보내고, 동시 요청 수는 llm 전역 세마포어가 제한합니다.
+    for answer in await asyncio.gather(*(_classify_batch_ai(batch) for batch in batches)):
+        classified.update(answer)
+    if classified:
+        await run_with_db(_store_categories, classified)
+
+    for content in contents:
+        if content not in categories:
+            representative = pending.get(normalize_merchant(content), content)
+            category = classified.get(representative)
+            categories[content] = (category, "llm") if category else ("기타", "fallback")
+    return categories
+
+# 미분류 행을 백그라운드에서 분류하는 큐 (워커는 main.py lifespan 에서 시작)
+categorize_queue = CategorizeQueue(classify_categories_ai)
+
+def _parse_date(date):
+    """
+    ISO 8601 날짜/일시 -> 'YYYY-MM-DD HH:MM:SS' (서버 현지 시각). 'Z'/+09:00 같은 오프셋이 붙으면 현지 시각으로 바꿉니다.
+    비어 있으면 지금 시각, 해석할 수 없으면 ValueError.
+    """
+    if not date:
+        return datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    text = date.strip()
+    if text[-1:] in ("Z", "z"):
+        text = text[:-1] + "+00:00"
+    try:
+        parsed = datetime.datetime.fromisoformat(text)
+    except ValueError:
+        raise ValueError(f"날짜 형식 오류: {date} (YYYY-MM-DD, YYYY-MM-DD HH:MM:SS 또는 ISO 8601)") from None
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone().replace(tzinfo=None)
+    return parsed.strftime("%Y-%m-%d %H:%M:%S")
+
+def _pending_or(categories, content):
+    """로컬 분류 결과가 없으면 '미분류' 대기 행으로 (카테고리, 출처)"""
+    return categories.get(content, (PENDING_CATEGORY, PENDING_SOURCE))
 
 @router.post("")
-def add_transaction(req: TransactionRequest, db=Depends(get_db)):
-    # 날짜 처리
-    date_str = req.date if req.date else datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+async def add_transaction(req: TransactionRequest):
+    # 날짜 처리 (월별 롤업 키를 만들기 위해 형식을 검증합니다)
+    try:
+        date_str = _parse_date(req.date)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
-    # 1. AI 분류
-    category = classify_category_ai(req.content)
+    # 1. 캐시/로컬 모델 분류만 기다리고, 나머지는 '미분류'로 저장한 뒤 백그라운드에서 LLM 분류
+    category, source = _pending_or(await classify_categories_local([req.content]), req.content)
+
+    # 2. DB 저장 (월별 롤업도 같은 트랜잭션에서 갱신. 미분류 금액은 '미분류' 카테고리로 잡혔다가 분류 후 옮겨짐)
+    @metrics.instrument("sql.insert_transactions")
+    def _save(conn):
+        with conn.cursor() as cursor:
+            cursor.execute(INSERT_SQL, (req.user_id, req.amount, req.content, category, source, date_str, 'WITHDRAW'))
+            rollup.apply_transactions(cursor, [(req.user_id, req.amount, category, date_str)])
+        conn.commit()
 
-    # 2. DB 저장
     try:
-        with db.cursor() as cursor:
-            sql = """
-                INSERT INTO transactions 
-                (user_id, amount, original_content, category, transacted_at, type)
-                VALUES (%s, %s, %s, %s, %s, 'WITHDRAW')
-            """
-            cursor.execute(sql, (req.user_id, req.amount, req.content, category, date_str))
-        db.commit()
+        await run_with_db(_save)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+    if source == PENDING_SOURCE:
+        categorize_queue.submit([req.content])
+    # 챗봇 세션에 캐시된 이번 달 요약 무효화
+    session_cache.invalidate_summaries(req.user_id)
 
     return {
-        "status": "success", 
+        "status": "success",
         "category": category,
+        "pending": source == PENDING_SOURCE,
         "content": req.content
     }
+
+@router.post("/bulk")
+async def add_transactions_bulk(reqs: List[TransactionRequest]):
+    """
+    카드/은행 동기화용 일괄 등록. 소비처는 중복 제거 후 캐시/로컬 모델로 분류하고, INSERT 는 한 트랜잭션으로 처리합니다.
+    분류되지 않은 소비처는 '미분류'로 저장하고 백그라운드 분류 큐가 배치로 채웁니다.
+    """
+    if len(reqs) > BULK_MAX_ROWS:
+        raise HTTPException(status_code=413, detail=f"한 번에 최대 {BULK_MAX_ROWS}건까지 등록할 수 있습니다.")
+
+    # 1. 행별 검증 (실패한 행은 건너뛰고 결과에 에러로 표시)
+    results = []
+    valid = []
+    for i, req in enumerate(reqs):
+        result = {"index": i, "content": req.content, "category": None, "pending": False, "error": None}
+        results.append(result)
+        if not req.content.strip():
+            result["error"] = "소비처(content)가 비어 있습니다."
+            continue
+        try:
+            valid.append((result, req, _parse_date(req.date)))
+        except ValueError as e:
+            result["error"] = str(e)
+
+    # 2. 로컬 분류 (LLM 호출 없음)
+    categories = await classify_categories_local([req.content for _, req, _ in valid])
+
+    # 3. 한 번에 INSERT (+ 월별 롤업 갱신, 같은 트랜잭션)
+    rows = []
+    for result, req, date_str in valid:
+        result["category"], source = _pending_or(categories, req.content)
+        result["pending"] = source == PENDING_SOURCE
+        rows.append((req.user_id, req.amount, req.content, result["category"], source, date_str, 'WITHDRAW'))
+
+    @metrics.instrument("sql.insert_transactions")
+    def _save(conn):
+        with conn.cursor() as cursor:
+            cursor.executemany(INSERT_SQL, rows)
+            rollup.apply_transactions(cursor, [(r[0], r[1], r[3], r[5]) for r in rows])
+        conn.commit()
+
+    if rows:
+        try:
+            await run_with_db(_save)
+        except HTTPException:
+            raise
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=str(e))
+        categorize_queue.submit(dict.fromkeys(r[2] for r in rows if r[4] == PENDING_SOURCE))
+        for user_id in {row[0] for row in rows}:
+            session_cache.invalidate_summaries(user_id)
+
+    return {
+        "status": "success",
+        "inserted": len(rows),
+        "pending": sum(1 for r in rows if r[4] == PENDING_SOURCE),
+        "failed": len(results) - len(rows),
+        "results": results
+    }
+
+@router.get("/category-cache")
+def get_category_cache_stats():
+    # 분류 캐시 적중/미스 카운터 + 로컬 분류 모델 사용 현황
+    return {**category_cache.stats(), "model": category_model.stats(), "queue": categorize_queue.stats()}
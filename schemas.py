@@ -17,3 +17,4 @@ class ChatRequest(BaseModel):
     user_id: int
     message: str
     target_budget: int = 0
+    stream: bool = False  # True 면 SSE(text/event-stream)로 토큰 단위 응답
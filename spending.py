@@ -0,0 +1,182 @@
+"""
+소비 데이터 조회 공통 모듈 (chat / analysis 라우터가 함께 사용).
+
+- 날짜 조건은 `transacted_at LIKE 'YYYY-MM%'` 대신 반열린 구간 [월초, 다음달 월초) 으로 걸어
+  (user_id, type, transacted_at) 복합 인덱스를 탈 수 있게 합니다.
+- 여러 달 데이터는 달마다 왕복하지 않고 한 번의 쿼리로 가져옵니다.
+
+    python spending.py explain   # 핫 쿼리들이 인덱스를 타는지 EXPLAIN 으로 확인
+"""
+import sys
+import datetime
+
+import metrics
+import rollup
+from database import db_connection
+
+TRANSACTIONS_INDEX = "idx_transactions_user_type_time"
+
+
+def month_key(year, month):
+    return f"{year}-{month:02d}"
+
+
+def month_range(year, month):
+    """해당 월의 [시작, 다음 달 시작) 문자열 구간"""
+    start = datetime.date(year, month, 1)
+    end = datetime.date(year + month // 12, month % 12 + 1, 1)
+    return start.strftime("%Y-%m-%d 00:00:00"), end.strftime("%Y-%m-%d 00:00:00")
+
+
+def _empty_summary():
+    return {"summary": {}, "total": 0}
+
+
+def _finish(summary):
+    return {"summary": summary, "total": sum(summary.values())}
+
+
+# ---------------------------------------------------------
+# 👤 내 소비 (monthly_category_totals 롤업 기준)
+# ---------------------------------------------------------
+def monthly_summaries_sql(month_count):
+    placeholders = ", ".join(["%s"] * month_count)
+    return f"""
+        SELECT month, category, total_amount
+        FROM monthly_category_totals
+        WHERE user_id = %s AND month IN ({placeholders})
+    """
+
+
+@metrics.instrument()
+def get_monthly_summaries(cursor, user_id, months):
+    """
+    여러 달의 카테고리별 합계를 한 번에 조회합니다.
+    months: [(year, month), ...]  ->  {(year, month): {"summary": {...}, "total": N}}
+    """
+    keys = {month_key(y, m): (y, m) for y, m in months}
+    result = {ym: _empty_summary() for ym in keys.values()}
+    if not keys:
+        return result
+
+    cursor.execute(monthly_summaries_sql(len(keys)), (user_id, *keys))
+    grouped = {ym: {} for ym in keys.values()}
+    for row in cursor.fetchall():
+        grouped[keys[row['month']]][row['category']] = int(row['total_amount'])
+    return {ym: _finish(summary) for ym, summary in grouped.items()}
+
+
+# ---------------------------------------------------------
+# 👥 그룹 비교
+# ---------------------------------------------------------
+# 그룹 1인당 월 지출 (카테고리 합계 / 그룹 인원). 내 월 합계와 같은 단위라서 그대로 비교할 수 있습니다.
+GROUP_AVERAGES_SQL = """
+    SELECT t.category, SUM(t.amount) / m.members AS avg_amount
+    FROM transactions t
+    JOIN users u ON t.user_id = u.id
+    CROSS JOIN (SELECT COUNT(*) AS members FROM users WHERE cluster_id = %s) m
+    WHERE u.cluster_id = %s AND t.type = 'WITHDRAW' AND t.category <> '미분류'
+      AND t.transacted_at >= %s AND t.transacted_at < %s
+    GROUP BY t.category, m.members
+"""
+
+
+CLUSTER_AVERAGES_SQL = """
+    SELECT a.category, a.avg_per_user
+    FROM users u
+    JOIN cluster_month_averages a ON a.cluster_id = u.cluster_id AND a.month = %s
+    WHERE u.id = %s
+"""
+
+USER_CLUSTER_INFO_SQL = """
+    SELECT c.min_amount, c.max_amount
+    FROM users u JOIN clusters c ON u.cluster_id = c.id
+    WHERE u.id = %s
+"""
+
+
+@metrics.instrument()
+def get_group_averages(cursor, user_id, year, month):
+    """
+    내 그룹의 카테고리별 1인당 월 평균 (내 월별 카테고리 합계와 비교하는 값).
+    매월 배치가 계산해 둔 cluster_month_averages 를 한 번 조회하고, 아직 없으면 원본에서 계산합니다.
+    """
+    cursor.execute(CLUSTER_AVERAGES_SQL, (month_key(year, month), user_id))
+    rows = cursor.fetchall()
+    if rows:
+        return _finish({row['category']: int(row['avg_per_user']) for row in rows})
+    return compute_group_averages(cursor, user_id, year, month)
+
+
+@metrics.instrument()
+def compute_group_averages(cursor, user_id, year, month):
+    # 1. 내 cluster_id 찾기
+    cursor.execute("SELECT cluster_id FROM users WHERE id = %s", (user_id,))
+    user = cursor.fetchone()
+    if not user or not user['cluster_id']: return _empty_summary()
+
+    # 2. 그룹 평균 계산
+    cursor.execute(GROUP_AVERAGES_SQL, (user['cluster_id'], user['cluster_id'], *month_range(year, month)))
+    result = cursor.fetchall()
+    summary = {row['category']: int(row['avg_amount']) for row in result}
+    return _finish(summary)
+
+
+@metrics.instrument()
+def get_user_cluster_info(cursor, user_id):
+    cursor.execute(USER_CLUSTER_INFO_SQL, (user_id,))
+    return cursor.fetchone()
+
+
+# ---------------------------------------------------------
+# 🔍 인덱스 사용 확인 (EXPLAIN)
+# ---------------------------------------------------------
+def explain_hot_queries(conn, user_id=1, cluster_id=1):
+    """
+    서비스가 실제로 실행하는 핫 쿼리들(롤업 조회, 리포트 입력, 그룹 평균 계산, 롤업 재계산)을 EXPLAIN 하여
+    테이블마다 기대한 인덱스를 쓰고 풀스캔(type=ALL) 하지 않는지 확인합니다. [(쿼리 이름, 통과 여부, EXPLAIN 행들)] 반환
+    """
+    today = datetime.date.today()
+    start, end = month_range(today.year, today.month)
+    months = [month_key(today.year, today.month), month_key(*_previous_month(today))]
+    # (이름, SQL, 파라미터, {EXPLAIN 의 table(별칭): 기대 인덱스})
+    checks = [
+        ("monthly_summaries", monthly_summaries_sql(len(months)), (user_id, *months),
+         {"monthly_category_totals": "PRIMARY"}),
+        ("cluster_averages", CLUSTER_AVERAGES_SQL, (months[1], user_id),
+         {"u": "PRIMARY", "a": "PRIMARY"}),
+        ("user_cluster_info", USER_CLUSTER_INFO_SQL, (user_id,),
+         {"u": "PRIMARY", "c": "PRIMARY"}),
+        ("group_averages", GROUP_AVERAGES_SQL, (cluster_id, cluster_id, start, end),
+         {"t": TRANSACTIONS_INDEX}),
+        ("rollup_rebuild_user", rollup.REBUILD_USER_SQL, (user_id,),
+         {"transactions": TRANSACTIONS_INDEX}),
+    ]
+
+    report = []
+    with conn.cursor() as cursor:
+        for name, sql, params, expected in checks:
+            cursor.execute("EXPLAIN " + sql, params)
+            rows = cursor.fetchall()
+            checked = [r for r in rows if r['table'] in expected]
+            ok = bool(checked) and all(r['type'] != "ALL" and r['key'] == expected[r['table']] for r in checked)
+            report.append((name, ok, rows))
+    return report
+
+
+def _previous_month(today):
+    last = today.replace(day=1) - datetime.timedelta(days=1)
+    return last.year, last.month
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2 or sys.argv[1] != "explain":
+        print(__doc__)
+        sys.exit(1)
+    with db_connection() as conn:
+        results = explain_hot_queries(conn)
+    for name, ok, rows in results:
+        print(f"{'✅' if ok else '❌'} {name}")
+        for row in rows:
+            print(f"    table={row['table']} type={row['type']} key={row['key']} rows={row['rows']} extra={row.get('Extra')}")
+    sys.exit(0 if all(ok for _, ok, _ in results) else 1)
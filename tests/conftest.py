@@ -0,0 +1,51 @@
+import os
+import sys
+
+# 루트의 평면 모듈들(database, rollup, ...)을 테스트에서 바로 import 하기 위함
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+class FakeCursor:
+    """실행한 SQL/파라미터를 기록하고, 미리 넣어 둔 결과를 순서대로 돌려주는 pymysql DictCursor 대역"""
+
+    def __init__(self, results=()):
+        self.results = list(results)
+        self.executed = []
+        self.executemany_calls = []
+        self.lastrowid = None
+
+    def execute(self, sql, params=None):
+        self.executed.append((sql, params))
+
+    def executemany(self, sql, rows):
+        self.executemany_calls.append((sql, list(rows)))
+
+    def fetchall(self):
+        return self.results.pop(0) if self.results else []
+
+    def fetchone(self):
+        rows = self.fetchall()
+        return rows[0] if rows else None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+class FakeConnection:
+    """cursor() 를 열 때마다 같은 FakeCursor 를 돌려주고 commit 횟수를 세는 pymysql 연결 대역"""
+
+    def __init__(self, cursor=None):
+        self.fake_cursor = cursor if cursor is not None else FakeCursor()
+        self.commits = 0
+
+    def cursor(self, *args):
+        return self.fake_cursor
+
+    def commit(self):
+        self.commits += 1
+
+    def rollback(self):
+        pass
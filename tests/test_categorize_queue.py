@@ -0,0 +1,107 @@
+import asyncio
+
+import pytest
+
+import categorize_queue
+from categorize_queue import CategorizeQueue
+
+
+@pytest.fixture
+def resolved(monkeypatch):
+    """resolve_pending 대신 채운 소비처 목록만 기록 (재시도 대기는 0초)"""
+    calls = []
+
+    async def fake_run_with_db(fn, categories):
+        calls.append(dict(categories))
+        return len(categories), {1}
+
+    monkeypatch.setattr(categorize_queue, "run_with_db", fake_run_with_db)
+    monkeypatch.setattr(categorize_queue, "CATEGORIZE_RETRY_SECONDS", 0)
+    return calls
+
+
+def _classifier(answers):
+    async def classify(contents):
+        return {content: answers[content] for content in contents}
+    return classify
+
+
+def _process(queue, batch):
+    async def main():
+        await queue._process(batch)
+        await asyncio.sleep(0.01)  # 재시도 타이머(call_later) 실행
+    asyncio.run(main())
+
+
+def test_submit_dedupes_queued_inflight_and_retrying():
+    queue = CategorizeQueue(_classifier({}))
+    queue.submit(["스타벅스", "카카오T", "스타벅스"])
+    queue._inflight.add("GS25")
+    queue._retrying.add("쿠팡")
+
+    queue.submit(["GS25", "쿠팡", "카카오T"])
+
+    assert list(queue._queue) == ["스타벅스", "카카오T"]
+    assert queue._resubmit == {"GS25"}   # 분류 중인 소비처에 새 행이 오면 끝나고 한 번 더
+    stats = queue.stats()
+    assert (stats["submitted"], stats["deduped"]) == (2, 4)
+
+
+def test_submit_drops_when_queue_is_full():
+    queue = CategorizeQueue(_classifier({}), max_queue=1)
+    queue.submit(["스타벅스", "카카오T"])
+    assert list(queue._queue) == ["스타벅스"]
+    assert queue.stats()["dropped"] == 1
+
+
+def test_process_resolves_answers_and_retries_fallbacks(resolved):
+    queue = CategorizeQueue(_classifier({"스타벅스": ("식비", "llm"), "알수없음": ("기타", "fallback")}))
+
+    _process(queue, {"스타벅스": 0, "알수없음": 0})
+
+    assert resolved == [{"스타벅스": ("식비", "llm")}]
+    assert dict(queue._queue) == {"알수없음": 1}   # 실패 횟수를 하나 올려 다시 큐에
+    assert queue.stats()["retries"] == 1
+
+
+def test_process_leaves_rows_pending_after_max_attempts(resolved):
+    queue = CategorizeQueue(_classifier({"알수없음": ("기타", "fallback")}))
+
+    _process(queue, {"알수없음": categorize_queue.CATEGORIZE_MAX_ATTEMPTS - 1})
+
+    # '기타'로 확정하지 않고 대기 행으로 남겨 스윕에 맡김
+    assert resolved == []
+    assert not queue._queue and not queue._retrying
+    assert queue.stats()["gave_up"] == 1
+
+
+def test_worker_failure_retries_each_content_up_to_max_attempts(monkeypatch):
+    monkeypatch.setattr(categorize_queue, "CATEGORIZE_RETRY_SECONDS", 0)
+    calls = []
+
+    async def classify(contents):
+        calls.extend(contents)
+        return {"스타벅스": ("식비", "llm"), "알수없음": ("기타", "fallback")}
+
+    async def failing_run_with_db(fn, categories):
+        raise RuntimeError("db down")
+
+    monkeypatch.setattr(categorize_queue, "run_with_db", failing_run_with_db)
+    queue = CategorizeQueue(classify, batch=10)
+
+    async def main():
+        queue._wakeup = asyncio.Event()
+        queue.submit(["스타벅스", "알수없음"])
+        worker = asyncio.create_task(queue._work())
+        await asyncio.sleep(0.05)
+        worker.cancel()
+        await asyncio.gather(worker, return_exceptions=True)
+
+    asyncio.run(main())
+
+    # DB 반영이 실패해도 소비처마다 한 번씩만 재시도 예약 (중복 예약 없이 최대 횟수에서 멈춤)
+    max_attempts = categorize_queue.CATEGORIZE_MAX_ATTEMPTS
+    assert calls.count("스타벅스") == max_attempts
+    assert calls.count("알수없음") == max_attempts
+    assert queue.stats()["gave_up"] == 2
+    assert not queue._queue and not queue._retrying
@@ -0,0 +1,35 @@
+import pytest
+
+from category_cache import normalize_merchant
+
+
+@pytest.mark.parametrize("content, expected", [
+    ("스타벅스 강남점", "스타벅스"),               # 지점 표기 제거
+    ("스타벅스  강남역2호점", "스타벅스"),          # 공백/숫자가 섞인 지점 표기
+    ("STARBUCKS 강남점", "starbucks"),          # 대소문자
+    ("(주)스타벅스코리아", "스타벅스코리아"),        # 법인 표기
+    ("ＧＳ25 역삼점", "gs"),                      # 전각 문자(NFKC) + 숫자
+    ("GS25(역삼)", "gs"),                        # 괄호 안 지점명
+    ("쿠팡 (쿠페이)", "쿠팡"),
+])
+def test_normalize_merchant_groups_branches_of_same_merchant(content, expected):
+    assert normalize_merchant(content) == expected
+
+
+def test_normalize_merchant_keeps_single_token_names():
+    # "편의점" 처럼 지점 표기와 같은 모양의 단독 상호는 지우지 않음
+    assert normalize_merchant("편의점") == "편의점"
+
+
+def test_normalize_merchant_falls_back_to_digits():
+    # 숫자만 있는 소비처는 숫자를 지우면 비므로 원문 기준으로 묶음
+    assert normalize_merchant("12345") == "12345"
+
+
+@pytest.mark.parametrize("content", ["", None])
+def test_normalize_merchant_empty(content):
+    assert normalize_merchant(content) == ""
+
+
+def test_normalize_merchant_truncates_to_index_length():
+    assert len(normalize_merchant("가" * 300)) == 191
@@ -0,0 +1,55 @@
+import numpy as np
+
+from category_model import CategoryModel
+
+
+class FakePipeline:
+    """정규화 키 -> 카테고리별 확률을 미리 정해 둔 predict_proba 대역"""
+    classes_ = np.array(["식비", "교통"])
+
+    def __init__(self, proba):
+        self.proba = proba
+        self.keys = None
+
+    def predict_proba(self, keys):
+        self.keys = keys
+        return np.array([self.proba[key] for key in keys])
+
+
+def _model(pipeline, threshold=0.9):
+    model = CategoryModel(threshold=threshold)
+    model._pipeline = pipeline
+    return model
+
+
+def test_predict_returns_only_confident_answers():
+    pipeline = FakePipeline({"스타벅스": [0.95, 0.05], "애매한가게": [0.6, 0.4], "카카오t": [0.02, 0.98]})
+    model = _model(pipeline)
+
+    assert model.predict(["스타벅스 강남점", "애매한가게", "카카오T"]) == {"스타벅스 강남점": "식비", "카카오T": "교통"}
+    assert pipeline.keys == ["스타벅스", "애매한가게", "카카오t"]   # 정규화한 가맹점 키로 예측
+    stats = model.stats()
+    assert (stats["predicted"], stats["confident"]) == (3, 2)
+
+
+def test_predict_threshold_is_inclusive():
+    model = _model(FakePipeline({"편의점": [0.9, 0.1]}))
+    assert model.predict(["편의점"]) == {"편의점": "식비"}
+    assert _model(FakePipeline({"편의점": [0.9, 0.1]}), threshold=0.95).predict(["편의점"]) == {}
+
+
+def test_predict_without_model_or_usable_keys():
+    assert CategoryModel().predict(["스타벅스"]) == {}
+    pipeline = FakePipeline({})
+    assert _model(pipeline).predict(["(주)", ""]) == {}   # 정규화하면 빈 키인 소비처는 모델에 넘기지 않음
+    assert pipeline.keys is None
+
+
+def test_predict_failure_falls_back_to_llm():
+    class BrokenPipeline(FakePipeline):
+        def predict_proba(self, keys):
+            raise ValueError("feature mismatch")
+
+    model = _model(BrokenPipeline({}))
+    assert model.predict(["스타벅스"]) == {}
+    assert model.stats()["errors"] == 1
@@ -0,0 +1,53 @@
+import asyncio
+
+import pytest
+
+from chat_session import ChatSession, ChatSessionCache
+from routers import chat
+
+
+@pytest.fixture
+def cache(monkeypatch):
+    cache = ChatSessionCache()
+    cache.put(1, ChatSession([], {}, "", compact_pending=4))
+    monkeypatch.setattr(chat, "session_cache", cache)
+    monkeypatch.setattr(chat.message_writer, "flush", lambda: None)
+    return cache
+
+
+def _fake_db(saved, unsummarized):
+    async def run_with_db(fn, *args):
+        if fn is chat.load_unsummarized:
+            return unsummarized
+        saved.append(args)
+    return run_with_db
+
+
+def test_compact_history_saves_summary_with_last_message_id(monkeypatch, cache):
+    saved = []
+    messages = [{"role": "user", "content": "목표는 50만원"}]
+    monkeypatch.setattr(chat, "run_with_db", _fake_db(saved, ("이전 요약", messages, 12)))
+
+    async def summarize(previous, msgs):
+        assert (previous, msgs) == ("이전 요약", messages)
+        return "새 요약"
+
+    monkeypatch.setattr(chat, "summarize_history", summarize)
+    keep, pending = cache.take_for_compaction(1, 4)
+    asyncio.run(chat._compact_history(1, keep, pending))
+
+    assert saved == [(1, "새 요약", 12)]
+    assert cache.get(1).rolling_summary == "새 요약"
+
+
+def test_compact_history_failure_keeps_pending_for_next_chat(monkeypatch, cache):
+    monkeypatch.setattr(chat, "run_with_db", _fake_db([], ("", [{"role": "user", "content": "a"}], 3)))
+
+    async def summarize(previous, msgs):
+        raise RuntimeError("llm down")
+
+    monkeypatch.setattr(chat, "summarize_history", summarize)
+    keep, pending = cache.take_for_compaction(1, 4)
+    asyncio.run(chat._compact_history(1, keep, pending))
+
+    assert cache.take_for_compaction(1, 4) == (0, 4)
@@ -0,0 +1,108 @@
+from contextlib import contextmanager
+
+import chat_session
+from chat_session import CHAT_HISTORY_LIMIT, ChatMessageWriter, ChatSession, ChatSessionCache
+from conftest import FakeConnection, FakeCursor
+
+
+def _messages(n):
+    return [{"role": "user" if i % 2 == 0 else "assistant", "content": f"m{i}"} for i in range(n)]
+
+
+def test_trim_messages_keeps_new_message_when_window_is_full():
+    cache = ChatSessionCache()
+    session = ChatSession(_messages(CHAT_HISTORY_LIMIT), {}, "")
+    cache.put(1, session)
+
+    snapshot = list(session.history)                 # 프롬프트 조립에 쓴 히스토리 (구간이 꽉 찬 상태)
+    cache.append(1, "user", "지금 질문")                 # 가장 오래된 메시지가 구간 밖으로 밀려남
+    dropped = snapshot[:CHAT_HISTORY_LIMIT // 2]     # 토큰 예산 밖으로 밀려난 오래된 메시지들
+    cache.trim_messages(1, dropped)
+
+    assert list(session.history) == snapshot[len(dropped):] + [{"role": "user", "content": "지금 질문"}]
+    # 밀려난 메시지는 롤링 요약 대상으로 한 번씩만 셈 (내용은 요약 시 DB 에서 읽음)
+    assert session.compact_pending == len(dropped)
+
+
+def test_trim_messages_without_session_is_noop():
+    cache = ChatSessionCache()
+    cache.trim_messages(42, _messages(2))
+    assert cache.get(42) is None
+
+
+def test_append_frees_pushed_out_message_and_counts_it():
+    cache = ChatSessionCache()
+    session = ChatSession(_messages(CHAT_HISTORY_LIMIT), {}, "")
+    cache.put(1, session)
+    size = session.size
+
+    cache.append(1, "user", "mX")    # m0 이 밀려나고 크기가 같은 mX 가 들어옴
+
+    assert session.compact_pending == 1
+    assert session.size == size
+    assert cache.stats()["bytes"] == size
+
+
+def test_compaction_failure_restores_pending_count():
+    cache = ChatSessionCache()
+    cache.put(1, ChatSession(_messages(2), {}, "", compact_pending=5))
+
+    assert cache.take_for_compaction(1, 4) == (2, 5)
+    assert cache.take_for_compaction(1, 0) is None        # 압축 중에는 다시 꺼내지 않음
+    cache.finish_compaction(1, failed_pending=5)
+
+    assert cache.take_for_compaction(1, 4) == (2, 5)
+    cache.finish_compaction(1, summary="요약")
+    assert cache.get(1).rolling_summary == "요약"
+    assert cache.take_for_compaction(1, 1) is None
+
+
+def test_load_unsummarized_skips_recent_window_and_returns_watermark():
+    cursor = FakeCursor([
+        [{"summary": "이전 요약", "last_message_id": 10}],
+        # 최신순: 최근 2개(14, 13)는 아직 대화 구간에 있음
+        [{"id": 14, "sender": "BOT", "content": "d"}, {"id": 13, "sender": "USER", "content": "c"},
+         {"id": 12, "sender": "BOT", "content": "b"}, {"id": 11, "sender": "USER", "content": "a"}],
+    ])
+
+    summary, messages, last_id = chat_session.load_unsummarized(FakeConnection(cursor), 1, keep=2, limit=50)
+
+    assert summary == "이전 요약"
+    assert messages == [{"role": "user", "content": "a"}, {"role": "assistant", "content": "b"}]
+    assert last_id == 12
+    assert cursor.executed[1][1] == (1, 10, 52)
+
+
+def test_load_unsummarized_without_old_messages_keeps_watermark():
+    cursor = FakeCursor([[], [{"id": 3, "sender": "USER", "content": "a"}]])
+    assert chat_session.load_unsummarized(FakeConnection(cursor), 1, keep=2) == ("", [], 0)
+
+
+def test_save_rolling_summary_never_moves_watermark_back():
+    conn = FakeConnection()
+    chat_session.save_rolling_summary(conn, 1, "요약", 12)
+
+    sql, params = conn.fake_cursor.executed[0]
+    assert params == (1, "요약", 12)
+    assert "IF(VALUES(last_message_id) > last_message_id" in sql
+    assert "GREATEST(last_message_id, VALUES(last_message_id))" in sql
+    assert conn.commits == 1
+
+
+def test_writer_flushes_synchronously_after_stop(monkeypatch):
+    conn = FakeConnection()
+
+    @contextmanager
+    def fake_db_connection():
+        yield conn
+
+    monkeypatch.setattr(chat_session, "db_connection", fake_db_connection)
+    writer = ChatMessageWriter(interval=0.01)
+    writer.enqueue(1, "USER", "질문")          # 처음 들어올 때 백그라운드 스레드 시작
+    writer.stop()
+
+    writer.enqueue(1, "BOT", "끊긴 답변")        # 종료 뒤: 스레드를 다시 띄우지 않고 바로 저장
+    assert writer._thread is None
+    rows = [row for _, batch in conn.fake_cursor.executemany_calls for row in batch]
+    assert [row[2] for row in rows] == ["질문", "끊긴 답변"]
+    assert writer.stats()["pending"] == 0
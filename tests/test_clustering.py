@@ -0,0 +1,131 @@
+import json
+import datetime
+from types import SimpleNamespace
+
+import numpy as np
+
+from routers import clustering
+from conftest import FakeConnection, FakeCursor
+
+
+def test_feature_months_are_last_complete_months_oldest_first():
+    assert clustering.feature_months(datetime.date(2025, 3, 15), count=3) == ["2024-12", "2025-01", "2025-02"]
+
+
+def test_feature_months_on_first_day_excludes_current_month():
+    assert clustering.feature_months(datetime.date(2025, 1, 1), count=2) == ["2024-11", "2024-12"]
+
+
+def test_feature_sql_pivots_one_column_per_month():
+    sql, params = clustering._feature_sql(["2025-01", "2025-02"])
+    assert "AS m0" in sql and "AS m1" in sql
+    assert params == ("2025-01", "2025-02", "2025-01", "2025-02")
+
+
+def test_to_features_clips_refunds_to_zero():
+    assert clustering.to_features(np.array([[-500.0, 0.0, np.e - 1]])).tolist() == [[0.0, 0.0, 1.0]]
+
+
+def test_band_order_numbers_clusters_by_spend_level():
+    kmeans = SimpleNamespace(cluster_centers_=np.array([[2.0, 2.0], [-1.0, -1.0], [0.5, 0.0]]))
+    # 라벨 0(가장 큼) -> 3, 라벨 1(가장 작음) -> 1, 라벨 2 -> 2
+    assert clustering._band_order(kmeans).tolist() == [3, 1, 2]
+
+
+# ---------------------------------------------------------
+# 증분 배정
+# ---------------------------------------------------------
+MONTHS = ["2025-01", "2025-02", "2025-03"]
+LOW, HIGH = float(np.log1p(1000)), float(np.log1p(100000))
+
+
+def _model(centroids, months=MONTHS):
+    # 표준화는 항등(평균 0, 표준편차 1)으로 두고 중심점만 log 지출 값으로
+    return {"id": 7, "months": months, "mean": np.zeros(len(months)), "scale": np.ones(len(months)),
+            "centroids": np.asarray(centroids, dtype=float)}
+
+
+def _model_row(centroids, months=MONTHS):
+    return {"id": 7, "months": ",".join(months), "scaler_mean": json.dumps([0.0] * len(months)),
+            "scaler_scale": json.dumps([1.0] * len(months)), "centroids": json.dumps(centroids)}
+
+
+def test_nearest_clusters_picks_closest_centroid():
+    model = _model([[LOW] * 3, [HIGH] * 3])
+    amounts = np.array([[900, 1100, 1000], [90000, 120000, 100000], [0, 0, 0]])
+    assert clustering.nearest_clusters(model, amounts).tolist() == [1, 2, 1]
+
+
+def test_nearest_clusters_matches_brute_force_distance():
+    rng = np.random.default_rng(0)
+    model = _model(rng.normal(8, 2, size=(5, 3)))
+    amounts = rng.uniform(0, 200000, size=(50, 3))
+    x = clustering.to_features(amounts)
+    expected = np.linalg.norm(x[:, None, :] - model["centroids"][None, :, :], axis=2).argmin(axis=1) + 1
+    assert clustering.nearest_clusters(model, amounts).tolist() == expected.tolist()
+
+
+def test_recent_amounts_fills_missing_months_with_user_average():
+    cursor = FakeCursor([[
+        {"user_id": 1, "month": "2025-01", "total": 100},
+        {"user_id": 1, "month": "2025-03", "total": 300},
+        {"user_id": 2, "month": "2025-04", "total": 50},   # 모델 기간 이후에만 활동한 신규 사용자
+    ]])
+
+    known, amounts = clustering._recent_amounts(cursor, [1, 2, 3], MONTHS)
+
+    assert known == [1, 2]                                  # 3번은 소비 이력이 없어 제외
+    assert amounts.tolist() == [[100, 200, 300], [50, 50, 50]]
+    sql, params = cursor.executed[0]
+    assert "month >= %s" in sql
+    assert params == (1, 2, 3, "2025-01")
+
+
+def test_assign_users_assigns_unclustered_users_to_nearest_centroid():
+    cursor = FakeCursor([
+        [_model_row([[LOW] * 3, [HIGH] * 3])],             # 최신 모델
+        [{"id": 10}, {"id": 20}],                          # 그룹 미배정 / 배정 뒤 소비한 사용자
+        [{"user_id": 10, "month": "2025-02", "total": 1200},
+         {"user_id": 20, "month": "2025-03", "total": 90000}],
+    ])
+    conn = FakeConnection(cursor)
+
+    assert clustering.assign_users(conn) == {"assigned": 2, "model_id": 7}
+
+    sql, rows = cursor.executemany_calls[0]
+    assert sql.startswith("UPDATE users SET cluster_id")
+    assert rows == [(1, 10), (2, 20)]
+    assert conn.commits == 1
+
+
+def test_assign_users_candidates_are_bounded_to_model_months_and_rotate():
+    cursor = FakeCursor([[_model_row([[LOW] * 3, [HIGH] * 3])], []])
+
+    assert clustering.assign_users(FakeConnection(cursor)) == {"assigned": 0, "model_id": 7}
+
+    sql, params = cursor.executed[1]
+    # 모델 기간 이전에만 소비한 사용자는 후보가 아니라서(배정될 수 없음) 신규 사용자를 밀어내지 않음
+    assert "r.month >= %s" in sql
+    # 배정 뒤 롤업이 바뀐 사용자도 후보, 배정된 적 없는 사용자 -> 배정이 오래된 사용자 순
+    assert "r.updated_at > u.cluster_assigned_at" in sql
+    assert "ORDER BY u.cluster_assigned_at IS NOT NULL, u.cluster_assigned_at" in sql
+    assert params == ("2025-01", clustering.CLUSTER_ASSIGN_BATCH)
+
+
+def test_assign_users_given_ids_skips_candidate_query():
+    cursor = FakeCursor([
+        [_model_row([[LOW] * 3, [HIGH] * 3])],
+        [{"user_id": 5, "month": "2025-01", "total": 150000}],
+    ])
+
+    assert clustering.assign_users(FakeConnection(cursor), [5]) == {"assigned": 1, "model_id": 7}
+    assert not any("FROM users u" in sql for sql, _ in cursor.executed)
+    assert cursor.executemany_calls[0][1] == [(2, 5)]
+
+
+def test_assign_users_without_model_does_nothing():
+    cursor = FakeCursor([[]])
+    conn = FakeConnection(cursor)
+
+    assert clustering.assign_users(conn) == {"assigned": 0, "reason": "no model"}
+    assert cursor.executemany_calls == []
@@ -0,0 +1,129 @@
+import threading
+
+import pytest
+
+import database
+from database import ConnectionPool, PoolTimeout
+
+
+class FakeConnection:
+    def __init__(self):
+        self.open = True
+        self.rollbacks = 0
+        self.pings = 0
+        self.fail_ping = False
+
+    def rollback(self):
+        self.rollbacks += 1
+
+    def ping(self, reconnect=False):
+        self.pings += 1
+        if self.fail_ping:
+            raise ConnectionError("gone")
+
+    def close(self):
+        self.open = False
+
+
+@pytest.fixture
+def connections(monkeypatch):
+    created = []
+
+    def connect(**config):
+        conn = FakeConnection()
+        created.append(conn)
+        return conn
+
+    monkeypatch.setattr(database.pymysql, "connect", connect)
+    return created
+
+
+def _pool(**kwargs):
+    options = {"max_size": 2, "timeout": 0.05, "recycle": 0, "ping_after": None}
+    options.update(kwargs)
+    return ConnectionPool({}, **options)
+
+
+def test_release_rolls_back_and_reuses_connection(connections):
+    pool = _pool()
+    conn = pool.acquire()
+    pool.release(conn)
+
+    assert conn.rollbacks == 1  # 커밋 안 된 트랜잭션이 다음 요청으로 새지 않음
+    assert pool.acquire() is conn
+    assert len(connections) == 1
+    assert pool.stats()["checkouts"] == 2
+
+
+def test_acquire_times_out_when_pool_is_exhausted(connections):
+    pool = _pool(max_size=1)
+    pool.acquire()
+
+    with pytest.raises(PoolTimeout):
+        pool.acquire()
+    stats = pool.stats()
+    assert stats["timeouts"] == 1
+    assert stats["in_use"] == 1
+
+
+def test_waiting_acquire_gets_released_connection(connections):
+    pool = _pool(max_size=1, timeout=2)
+    conn = pool.acquire()
+    got = []
+
+    waiter = threading.Thread(target=lambda: got.append(pool.acquire()))
+    waiter.start()
+    pool.release(conn)
+    waiter.join(timeout=2)
+
+    assert got == [conn]
+
+
+def test_closed_connection_is_discarded_and_slot_freed(connections):
+    pool = _pool(max_size=1)
+    conn = pool.acquire()
+    conn.open = False  # 요청 중에 끊긴 연결
+    pool.release(conn)
+
+    assert pool.stats()["discarded"] == 1
+    replacement = pool.acquire()  # 자리가 반납되어 새 연결을 맺음
+    assert replacement is not conn
+    assert len(connections) == 2
+
+
+def test_failed_ping_replaces_idle_connection(connections):
+    pool = _pool(ping_after=0)
+    conn = pool.acquire()
+    pool.release(conn)
+    conn.fail_ping = True
+
+    replacement = pool.acquire()
+
+    assert replacement is not conn
+    assert not conn.open
+    assert pool.stats()["ping_failures"] == 1
+    assert pool.stats()["size"] == 1
+
+
+def test_failed_connect_frees_reserved_slot(monkeypatch):
+    def connect(**config):
+        raise ConnectionError("db down")
+
+    monkeypatch.setattr(database.pymysql, "connect", connect)
+    pool = _pool(max_size=1)
+
+    with pytest.raises(ConnectionError):
+        pool.acquire()
+    assert pool.stats()["size"] == 0
+
+
+def test_close_all_closes_idle_connections(connections):
+    pool = _pool()
+    a, b = pool.acquire(), pool.acquire()
+    pool.release(a)
+
+    pool.close_all()
+
+    assert not a.open
+    assert b.open  # 대여 중인 연결은 반납될 때 처리
+    assert pool.stats()["size"] == 1
@@ -0,0 +1,104 @@
+from contextlib import contextmanager
+
+import pytest
+
+import jobs
+from conftest import FakeConnection, FakeCursor
+
+
+@pytest.fixture
+def lock_conn(monkeypatch):
+    """run_job 이 잠금/이력 기록에 쓰는 연결. results 에 GET_LOCK 결과를 넣어 씁니다."""
+    conn = FakeConnection(FakeCursor())
+    conn.fake_cursor.lastrowid = 5
+
+    @contextmanager
+    def fake_db_connection():
+        yield conn
+
+    monkeypatch.setattr(jobs, "db_connection", fake_db_connection)
+    return conn
+
+
+def _statements(conn):
+    return [" ".join(sql.split()) for sql, _ in conn.fake_cursor.executed]
+
+
+def test_advisory_lock_uses_prefixed_name_and_releases():
+    cursor = FakeCursor([[{"acquired": 1}]])
+    with jobs.advisory_lock(FakeConnection(cursor), "monthly", wait=3) as acquired:
+        assert acquired
+    assert cursor.executed[0][1] == (jobs.JOB_LOCK_PREFIX + "monthly", 3)
+    assert cursor.executed[-1] == ("SELECT RELEASE_LOCK(%s)", (jobs.JOB_LOCK_PREFIX + "monthly",))
+
+
+def test_run_job_skips_when_another_runner_holds_the_lock(monkeypatch, lock_conn):
+    calls = []
+    monkeypatch.setitem(jobs.JOBS, "test-job", lambda loop=None: calls.append(loop) or {"rows": 1})
+    lock_conn.fake_cursor.results = [[{"acquired": 0}]]
+
+    assert jobs.run_job("test-job") is None
+    assert calls == []
+    # 잠금 시도만 하고 job_runs 기록/RELEASE_LOCK 은 하지 않음
+    assert len(_statements(lock_conn)) == 1
+    assert _statements(lock_conn)[0].startswith("SELECT GET_LOCK")
+
+
+def test_run_job_records_success(monkeypatch, lock_conn):
+    monkeypatch.setitem(jobs.JOBS, "test-job", lambda loop=None: {"rows": 3})
+    lock_conn.fake_cursor.results = [[{"acquired": 1}]]
+
+    assert jobs.run_job("test-job") == {"rows": 3}
+
+    statements = _statements(lock_conn)
+    assert statements[1].startswith("INSERT INTO job_runs")
+    assert statements[2].startswith("UPDATE job_runs")
+    status, _, _, rows, _, run_id = lock_conn.fake_cursor.executed[2][1]
+    assert (status, rows, run_id) == ("success", 3, 5)
+    assert statements[-1].startswith("SELECT RELEASE_LOCK")
+
+
+def test_run_job_records_failure_and_releases_lock(monkeypatch, lock_conn):
+    def boom(loop=None):
+        raise RuntimeError("db down")
+
+    monkeypatch.setitem(jobs.JOBS, "test-job", boom)
+    lock_conn.fake_cursor.results = [[{"acquired": 1}]]
+
+    assert jobs.run_job("test-job") is None
+
+    status, _, _, rows, detail, _ = lock_conn.fake_cursor.executed[2][1]
+    assert (status, rows, detail) == ("failed", None, "db down")
+    assert _statements(lock_conn)[-1].startswith("SELECT RELEASE_LOCK")
+
+
+def test_run_job_passes_params_to_job(monkeypatch, lock_conn):
+    calls = []
+    monkeypatch.setitem(jobs.JOBS, "test-job", lambda loop=None, user_ids=None: calls.append(user_ids) or {"rows": 1})
+    lock_conn.fake_cursor.results = [[{"acquired": 1}]]
+
+    jobs.run_job("test-job", user_ids=[3, 4])
+    assert calls == [[3, 4]]
+
+
+# ---------------------------------------------------------
+# 관리자 엔드포인트도 같은 잠금/이력을 거침
+# ---------------------------------------------------------
+def test_clustering_endpoints_run_through_run_job(monkeypatch):
+    from routers import clustering
+    calls = []
+    monkeypatch.setattr(jobs, "run_job", lambda name, **params: calls.append((name, params)) or {"rows": 0})
+
+    clustering.run_clustering()
+    clustering.run_assignment([7])
+    assert calls == [("clustering", {}), ("cluster-assign", {"user_ids": [7]})]
+
+
+def test_clustering_endpoint_conflicts_when_job_is_skipped(monkeypatch):
+    from fastapi import HTTPException
+    from routers import clustering
+    monkeypatch.setattr(jobs, "run_job", lambda name, **params: None)
+
+    with pytest.raises(HTTPException) as exc:
+        clustering.run_clustering()
+    assert exc.value.status_code == 409
@@ -0,0 +1,136 @@
+import os
+import sys
+import time
+import asyncio
+import subprocess
+from types import SimpleNamespace
+
+import pytest
+
+import llm
+import metrics
+from llm import AsyncRateLimiter
+
+
+def _timed_acquires(limiter, n):
+    async def main():
+        started = time.monotonic()
+        for _ in range(n):
+            await limiter.acquire()
+        return time.monotonic() - started
+
+    return asyncio.run(main())
+
+
+def test_rate_limiter_disabled_when_rate_is_zero():
+    assert _timed_acquires(AsyncRateLimiter(0), 1000) < 0.5
+
+
+def test_rate_limiter_allows_one_second_burst():
+    # 분당 3000회 = 초당 50회 -> 처음 50회는 기다리지 않음
+    assert _timed_acquires(AsyncRateLimiter(3000), 50) < 0.05
+
+
+def test_rate_limiter_throttles_after_burst():
+    # 버스트 50회 + 추가 5회는 초당 50회 속도로 (약 0.1초)
+    elapsed = _timed_acquires(AsyncRateLimiter(3000), 55)
+    assert 0.08 <= elapsed < 1.0
+
+
+def test_rate_limiter_shares_budget_between_concurrent_callers():
+    limiter = AsyncRateLimiter(3000)
+
+    async def main():
+        started = time.monotonic()
+        await asyncio.gather(*(limiter.acquire() for _ in range(55)))
+        return time.monotonic() - started
+
+    assert 0.08 <= asyncio.run(main()) < 1.0
+
+
+def test_import_does_not_load_openai_or_httpx():
+    # 콜드 스타트: openai/httpx 는 첫 LLM 호출 때 import
+    code = "import sys, llm; print('openai' in sys.modules or 'httpx' in sys.modules)"
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    result = subprocess.run([sys.executable, "-c", code], cwd=root, capture_output=True, text=True, check=True)
+    assert result.stdout.strip() == "False"
+
+
+def test_retryable_errors_are_transient_openai_errors():
+    import openai
+    errors = llm._retryable_errors()
+    assert openai.RateLimitError in errors
+    assert openai.AuthenticationError not in errors
+    assert llm._retryable_errors() is errors
+
+
+# ---------------------------------------------------------
+# stream_chat_completion 계측
+# ---------------------------------------------------------
+class _FakeStream:
+    def __init__(self, pieces):
+        self._chunks = [SimpleNamespace(usage=None, choices=[SimpleNamespace(delta=SimpleNamespace(content=p))])
+                        for p in pieces]
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if not self._chunks:
+            raise StopAsyncIteration
+        return self._chunks.pop(0)
+
+
+def _fake_client(monkeypatch, create):
+    client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+
+    async def get_client(api_key):
+        return client
+
+    monkeypatch.setattr(llm, "get_client", get_client)
+
+
+def _stage(stage):
+    hist = metrics._histograms.get(metrics._key("finmate_stage_seconds", {"stage": stage}))
+    return (hist[-1], hist[-2]) if hist else (0, 0.0)
+
+
+def test_stream_stage_time_includes_connecting(monkeypatch):
+    async def create(**kwargs):
+        await asyncio.sleep(0.05)  # 연결 ~ 첫 응답까지
+        return _FakeStream(["안녕", "하세요"])
+
+    _fake_client(monkeypatch, create)
+
+    async def main():
+        return [piece async for piece in llm.stream_chat_completion("key", stage="test_stream")]
+
+    assert asyncio.run(main()) == ["안녕", "하세요"]
+    count, total = _stage("llm.test_stream")
+    assert count == 1 and total >= 0.05
+
+
+def test_stream_connect_failure_is_recorded_once(monkeypatch):
+    import httpx
+    import openai
+
+    async def create(**kwargs):
+        raise openai.APIConnectionError(request=httpx.Request("POST", "https://api.openai.com"))
+
+    _fake_client(monkeypatch, create)
+    monkeypatch.setattr(llm, "LLM_MAX_RETRIES", 0)
+
+    async def main():
+        return [piece async for piece in llm.stream_chat_completion("key", stage="test_stream_fail")]
+
+    with pytest.raises(openai.APIConnectionError):
+        asyncio.run(main())
+    assert _stage("llm.test_stream_fail")[0] == 1
+    key = metrics._key("finmate_stage_errors_total", {"stage": "llm.test_stream_fail", "error": "APIConnectionError"})
+    assert metrics._counters[key] == 1
@@ -0,0 +1,119 @@
+import asyncio
+
+import memo
+from memo import SingleFlight, TTLCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+# ---------------------------------------------------------
+# TTLCache
+# ---------------------------------------------------------
+def test_ttl_cache_hit_and_miss():
+    cache = TTLCache(max_size=10, ttl=60)
+    cache.set("a", 1)
+
+    assert cache.get("a") == 1
+    assert cache.get("b") is None
+    assert cache.stats() == {"hits": 1, "misses": 1, "evictions": 0, "size": 1, "max_size": 10}
+
+
+def test_ttl_cache_expires_entries(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(memo.time, "monotonic", clock)
+    cache = TTLCache(max_size=10, ttl=60)
+    cache.set("a", 1)
+
+    clock.now += 59
+    assert cache.get("a") == 1
+    clock.now += 2
+    assert cache.get("a") is None
+    assert cache.stats()["size"] == 0  # 만료된 항목은 조회 시 지워짐
+
+
+def test_ttl_cache_evicts_least_recently_used():
+    cache = TTLCache(max_size=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")       # a 를 최근 사용으로
+    cache.set("c", 3)    # 가장 오래 안 쓴 b 가 밀려남
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert cache.stats()["evictions"] == 1
+
+
+# ---------------------------------------------------------
+# SingleFlight
+# ---------------------------------------------------------
+def test_single_flight_coalesces_concurrent_calls():
+    flight = SingleFlight()
+    calls = []
+
+    async def work():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return "report"
+
+    async def main():
+        return await asyncio.gather(*(flight.do("key", work) for _ in range(5)))
+
+    assert asyncio.run(main()) == ["report"] * 5
+    assert len(calls) == 1
+    assert flight.stats() == {"started": 1, "joined": 4, "inflight": 0}
+
+
+def test_single_flight_runs_again_after_completion():
+    flight = SingleFlight()
+    calls = []
+
+    async def work():
+        calls.append(1)
+        return len(calls)
+
+    async def main():
+        first = await flight.do("key", work)
+        second = await flight.do("key", work)
+        return first, second
+
+    assert asyncio.run(main()) == (1, 2)
+
+
+def test_single_flight_shares_errors_and_forgets_key():
+    flight = SingleFlight()
+
+    async def fail():
+        await asyncio.sleep(0)
+        raise ValueError("boom")
+
+    async def main():
+        return await asyncio.gather(flight.do("key", fail), flight.do("key", fail), return_exceptions=True)
+
+    results = asyncio.run(main())
+    assert [type(r) for r in results] == [ValueError, ValueError]
+    assert flight.stats()["inflight"] == 0
+
+
+def test_single_flight_cancelled_waiter_does_not_cancel_work():
+    flight = SingleFlight()
+
+    async def work():
+        await asyncio.sleep(0.02)
+        return "done"
+
+    async def main():
+        first = asyncio.create_task(flight.do("key", work))
+        await asyncio.sleep(0)
+        second = asyncio.create_task(flight.do("key", work))
+        await asyncio.sleep(0)
+        first.cancel()  # 먼저 요청한 쪽이 끊겨도
+        return await second
+
+    assert asyncio.run(main()) == "done"
@@ -0,0 +1,52 @@
+import asyncio
+
+import pytest
+
+import metrics
+
+
+def _errors(stage):
+    return {labels: value for (name, labels), value in metrics._counters.items()
+            if name == "finmate_stage_errors_total" and ("stage", stage) in labels}
+
+
+def _count(stage):
+    return metrics._histograms[metrics._key("finmate_stage_seconds", {"stage": stage})][-1]
+
+
+def test_timed_counts_exceptions_as_stage_errors():
+    with pytest.raises(ValueError):
+        with metrics.timed("test.error"):
+            raise ValueError("boom")
+
+    assert _errors("test.error") == {(("error", "ValueError"), ("stage", "test.error")): 1}
+    assert _count("test.error") == 1
+
+
+@pytest.mark.parametrize("exc", [asyncio.CancelledError, GeneratorExit])
+def test_timed_reraises_cancellation_without_counting_error(exc):
+    stage = f"test.{exc.__name__}"
+    with pytest.raises(exc):
+        with metrics.timed(stage):
+            raise exc()
+
+    assert _errors(stage) == {}
+    assert _count(stage) == 1
+
+
+def test_timed_closed_async_generator_is_not_an_error():
+    stage = "test.stream_closed"
+
+    async def stream():
+        with metrics.timed(stage):
+            yield "a"
+            yield "b"
+
+    async def main():
+        gen = stream()
+        await gen.__anext__()
+        await gen.aclose()   # 클라이언트가 끊겨 스트림을 중간에 닫음 -> GeneratorExit
+
+    asyncio.run(main())
+    assert _errors(stage) == {}
+    assert _count(stage) == 1
@@ -0,0 +1,38 @@
+import pytest
+
+import migrate
+from conftest import FakeConnection, FakeCursor
+
+
+def _statements(cursor):
+    return [" ".join(sql.split()) for sql, _ in cursor.executed]
+
+
+def test_split_statements_drops_comments_and_empty_parts():
+    sql = "-- 설명\nALTER TABLE a ADD COLUMN b INT;\n\nUPDATE a SET b = 1;\n"
+    assert migrate._split_statements(sql) == ["ALTER TABLE a ADD COLUMN b INT", "UPDATE a SET b = 1"]
+
+
+def test_migrate_applies_pending_files_under_lock(monkeypatch, tmp_path):
+    (tmp_path / "0001_a.sql").write_text("-- 테스트\nSELECT 1;\n", encoding="utf-8")
+    monkeypatch.setattr(migrate, "MIGRATIONS_DIR", str(tmp_path))
+    cursor = FakeCursor([[{"acquired": 1}], []])   # GET_LOCK, 적용 이력 없음
+    conn = FakeConnection(cursor)
+
+    migrate.migrate(conn)
+
+    statements = _statements(cursor)
+    assert statements[0].startswith("SELECT GET_LOCK")
+    assert "SELECT 1" in statements
+    assert cursor.executed[-2] == ("INSERT INTO schema_migrations (name) VALUES (%s)", ("0001_a.sql",))
+    assert statements[-1].startswith("SELECT RELEASE_LOCK")
+    assert conn.commits == 1
+
+
+def test_migrate_fails_when_lock_is_not_acquired():
+    cursor = FakeCursor([[{"acquired": 0}]])
+
+    with pytest.raises(RuntimeError):
+        migrate.migrate(FakeConnection(cursor))
+    assert len(cursor.executed) == 1   # 적용도 잠금 해제도 하지 않음
+
@@ -0,0 +1,60 @@
+from prompt_budget import compact_summary, fit_history, message_tokens
+
+
+def _messages(n):
+    return [{"role": "user" if i % 2 == 0 else "assistant", "content": f"메시지 {i}"} for i in range(n)]
+
+
+# ---------------------------------------------------------
+# fit_history
+# ---------------------------------------------------------
+def test_fit_history_keeps_most_recent_messages_within_budget():
+    history = _messages(6)
+    budget = sum(message_tokens(m) for m in history[-3:])  # 최근 3개가 딱 들어가는 예산
+
+    kept, dropped = fit_history(history, budget)
+
+    assert kept == history[-3:]
+    assert dropped == history[:3]
+
+
+def test_fit_history_keeps_everything_when_budget_is_enough():
+    history = _messages(4)
+    kept, dropped = fit_history(history, sum(message_tokens(m) for m in history))
+    assert kept == history
+    assert dropped == []
+
+
+def test_fit_history_stops_at_first_message_that_does_not_fit():
+    # 오래된 짧은 메시지가 예산에 들어가더라도, 중간의 긴 메시지에서 끊어 순서를 유지
+    history = [{"role": "user", "content": "짧음"}, {"role": "assistant", "content": "긴 답변 " * 50},
+               {"role": "user", "content": "최근"}]
+    budget = message_tokens(history[0]) + message_tokens(history[2])
+
+    kept, dropped = fit_history(history, budget)
+
+    assert kept == history[2:]
+    assert dropped == history[:2]
+
+
+def test_fit_history_zero_budget_drops_everything():
+    history = _messages(2)
+    assert fit_history(history, 0) == ([], history)
+
+
+# ---------------------------------------------------------
+# compact_summary
+# ---------------------------------------------------------
+def test_compact_summary_sorts_and_keeps_small_summaries():
+    data = {"summary": {"교통": 10000, "식비": 50000}, "total": 60000}
+    assert compact_summary(data, max_categories=3) == {"summary": {"식비": 50000, "교통": 10000}, "total": 60000}
+
+
+def test_compact_summary_folds_smallest_categories_into_others():
+    data = {"summary": {"식비": 50000, "교통": 10000, "쇼핑": 30000, "기타": 5000, "이체": 2000},
+            "total": 97000}
+
+    result = compact_summary(data, max_categories=3)
+
+    assert result == {"summary": {"식비": 50000, "쇼핑": 30000, "그 외": 17000}, "total": 97000}
+    assert sum(result["summary"].values()) == data["total"]
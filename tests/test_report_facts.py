@@ -0,0 +1,94 @@
+import pytest
+
+import report_facts
+import spending
+from conftest import FakeCursor
+
+
+def _data(summary):
+    return {"summary": summary, "total": sum(summary.values())}
+
+
+def test_compute_facts_totals_and_category_deltas():
+    facts = report_facts.compute_facts(
+        _data({"식비": 100000, "교통": 50000}),
+        _data({"식비": 130000, "쇼핑": 20000}),
+        _data({}),
+    )
+    assert facts["total"] == {"prev": 150000.0, "curr": 150000.0, "delta": 0.0, "pct": 0.0}
+    assert facts["has_group"] is False
+
+    rows = {row["category"]: row for row in facts["categories"]}
+    assert rows["식비"]["delta"] == 30000 and rows["식비"]["pct"] == 30.0
+    assert rows["교통"]["delta"] == -50000 and rows["교통"]["pct"] == -100.0
+    assert rows["쇼핑"]["pct"] is None  # 저번 달 0원 -> 증감률 없음 (신규)
+    assert rows["식비"]["group"] is None and rows["식비"]["group_diff"] is None
+
+
+def test_group_comparison_uses_monthly_totals_on_both_sides():
+    # 내 월 합계 vs 그룹 1인당 월 합계. 건당 평균(예: 식비 1만원)과 비교하면 거의 모든 사용자가 과소비로 보입니다.
+    facts = report_facts.compute_facts(
+        _data({"식비": 200000}),
+        _data({"식비": 240000, "교통": 30000}),
+        _data({"식비": 300000, "교통": 20000}),
+    )
+    rows = {row["category"]: row for row in facts["categories"]}
+    assert rows["식비"]["group"] == 300000
+    assert rows["식비"]["group_diff"] == -60000
+    assert rows["식비"]["group_pct"] == -20.0
+    assert rows["교통"]["group_diff"] == 10000
+    assert rows["교통"]["group_pct"] == 50.0
+
+
+def test_get_group_averages_reads_per_user_average():
+    cursor = FakeCursor([[{"category": "식비", "avg_per_user": 300000, "avg_per_txn": 12000}]])
+    result = spending.get_group_averages(cursor, 7, 2025, 10)
+
+    assert result == {"summary": {"식비": 300000}, "total": 300000}
+    sql, params = cursor.executed[0]
+    assert "avg_per_user" in sql and "avg_per_txn" not in sql
+    assert params == ("2025-10", 7)
+
+
+def test_compute_group_averages_fallback_divides_by_group_members():
+    # 배치가 아직 cluster_month_averages 를 채우지 않은 달 -> 원본에서 계산
+    cursor = FakeCursor([[], [{"cluster_id": 3}], [{"category": "식비", "avg_amount": 250000}]])
+    result = spending.get_group_averages(cursor, 7, 2025, 10)
+
+    assert result["summary"] == {"식비": 250000}
+    sql, params = cursor.executed[-1]
+    assert "SUM(t.amount) / m.members" in sql and "AVG(t.amount)" not in sql
+    assert params == (3, 3, "2025-10-01 00:00:00", "2025-11-01 00:00:00")
+
+
+def test_render_sections_uses_computed_numbers():
+    facts = report_facts.compute_facts(
+        _data({"식비": 100000}),
+        _data({"식비": 130000}),
+        _data({"식비": 100000}),
+    )
+    sections = report_facts.render_sections(facts, "10만원~20만원", 10, 9)
+
+    assert sections["section_past_comparison"].startswith("전체 소비는 30,000원(+30.0%) 증가했습니다.")
+    assert "식비 +30,000원(+30.0%)" in sections["section_past_comparison"]
+    assert sections["section_cluster_info"] == "당신은 소비구간 10만원~20만원 구간에 속해 있습니다."
+    assert sections["section_group_comparison"] == "그룹 평균보다 식비(+30,000원)에 더 많이 썼습니다."
+
+
+def test_render_sections_without_previous_month_or_group():
+    facts = report_facts.compute_facts(_data({}), _data({"식비": 5000}), _data({}))
+    sections = report_facts.render_sections(facts, "정보 없음", 10, 9)
+
+    assert "9월 소비 내역이 없어 비교할 수 없습니다" in sections["section_past_comparison"]
+    assert sections["section_group_comparison"] == "그룹 평균 데이터가 없어 비교할 수 없습니다."
+
+
+@pytest.mark.parametrize("diffs, expected", [
+    ({"식비": 10000, "교통": -5000}, "그룹 평균보다 식비(+10,000원)에 더 많이 썼고, 교통(-5,000원)에는 덜 썼습니다."),
+    ({"식비": 0}, "그룹 평균과 비슷하게 소비했습니다."),
+])
+def test_render_group_sentence(diffs, expected):
+    group = {category: 100000 for category in diffs}
+    curr = {category: 100000 + diff for category, diff in diffs.items()}
+    facts = report_facts.compute_facts(_data(curr), _data(curr), _data(group))
+    assert report_facts.render_sections(facts, "-", 10, 9)["section_group_comparison"] == expected
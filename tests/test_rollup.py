@@ -0,0 +1,47 @@
+import datetime
+
+import rollup
+from conftest import FakeCursor
+
+
+def test_move_transactions_moves_amounts_between_categories():
+    cursor = FakeCursor()
+    rollup.move_transactions(cursor, [
+        (1, 12000, "미분류", "식비", "2025-10-03 12:00:00"),
+        (1, 3000, "미분류", "식비", datetime.datetime(2025, 10, 20, 9, 0)),
+        (1, 1500, "미분류", "교통", "2025-11-01 08:00:00"),
+    ])
+
+    (upsert_sql, upserts), (delete_sql, deletes) = cursor.executemany_calls
+    assert upsert_sql == rollup.UPSERT_SQL
+    # 이전 카테고리는 음수로 빼고, 새 카테고리는 더함 (같은 (사용자, 월, 카테고리)는 한 행으로 합침)
+    assert sorted(upserts) == sorted([
+        (1, "2025-10", "미분류", -15000, -2),
+        (1, "2025-10", "식비", 15000, 2),
+        (1, "2025-11", "미분류", -1500, -1),
+        (1, "2025-11", "교통", 1500, 1),
+    ])
+    # 건수가 줄어든 키만 비었는지 확인해서 지움
+    assert delete_sql.startswith("DELETE FROM monthly_category_totals")
+    assert "txn_count <= 0" in delete_sql
+    assert sorted(deletes) == [(1, "2025-10", "미분류"), (1, "2025-11", "미분류")]
+
+
+def test_move_transactions_separates_users():
+    cursor = FakeCursor()
+    rollup.move_transactions(cursor, [
+        (1, 1000, "미분류", "식비", "2025-10-01"),
+        (2, 2000, "미분류", "식비", "2025-10-01"),
+    ])
+
+    (_, upserts), (_, deletes) = cursor.executemany_calls
+    assert (1, "2025-10", "식비", 1000, 1) in upserts
+    assert (2, "2025-10", "식비", 2000, 1) in upserts
+    assert sorted(deletes) == [(1, "2025-10", "미분류"), (2, "2025-10", "미분류")]
+
+
+def test_move_transactions_without_rows_runs_nothing():
+    cursor = FakeCursor()
+    rollup.move_transactions(cursor, [])
+    assert cursor.executemany_calls == []
+    assert cursor.executed == []
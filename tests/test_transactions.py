@@ -0,0 +1,27 @@
+import datetime
+
+import pytest
+
+from routers.transactions import _parse_date
+
+
+@pytest.mark.parametrize("date, expected", [
+    ("2025-01-05", "2025-01-05 00:00:00"),
+    ("2025-01-05 12:30:00", "2025-01-05 12:30:00"),
+    ("2025-01-05T12:30:00", "2025-01-05 12:30:00"),
+    ("2025-01-05T12:30:00.250", "2025-01-05 12:30:00"),
+])
+def test_parse_date_accepts_iso_forms(date, expected):
+    assert _parse_date(date) == expected
+
+
+@pytest.mark.parametrize("date", ["2025-01-05T03:30:00Z", "2025-01-05T12:30:00+09:00"])
+def test_parse_date_converts_offsets_to_local_time(date):
+    instant = datetime.datetime(2025, 1, 5, 3, 30, tzinfo=datetime.timezone.utc)
+    assert _parse_date(date) == instant.astimezone().strftime("%Y-%m-%d %H:%M:%S")
+
+
+@pytest.mark.parametrize("date", ["2025/01/05", "어제", "2025-13-01"])
+def test_parse_date_rejects_unparseable_values(date):
+    with pytest.raises(ValueError):
+        _parse_date(date)